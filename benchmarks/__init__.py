@@ -0,0 +1 @@
+""" Benchmarks and the synthetic files they use """
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Store benchmark results as baselines and compare new runs against them.
+Baselines are kept per python version and machine tag, as timings are only comparable on the
+same interpreter and hardware.
+Run from the repository root: PYTHONPATH=src python3 -m benchmarks.baseline {store,compare}
+"""
+
+import os
+import sys
+import json
+import math
+import platform
+import argparse
+import statistics
+from datetime import datetime, timezone
+
+from benchmarks.bench import add_run_arguments, run_benchmarks
+
+DEFAULT_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+
+def python_tag():
+    """Implementation and major.minor version of the interpreter, e.g. cpython-3.11"""
+    version = ".".join(platform.python_version_tuple()[:2])
+    return f"{platform.python_implementation().lower()}-{version}"
+
+
+def baseline_path(directory, machine):
+    """Path of the baseline for this interpreter and the machine tag"""
+    return os.path.join(directory, f"{python_tag()}-{machine}.json")
+
+
+def store(path, results, params):
+    """Write the results along with what they were run on"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fd:
+        json.dump(
+            {
+                "python": python_tag(),
+                "platform": platform.platform(),
+                "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "params": params,
+                "results": results,
+            },
+            fd,
+            indent=2,
+        )
+
+
+def _stdev(times):
+    return statistics.stdev(times) if len(times) > 1 else 0.0
+
+
+def compare_result(base, new, tolerance, sigmas):
+    """
+    Return the relative slowdown of the new median over the baseline median, and whether it
+    is a regression: the slowdown has to exceed `tolerance` and the difference has to exceed
+    `sigmas` times the combined standard deviation of the two runs, so that noisy stages do
+    not fail on their own variance.
+    """
+    base_median = statistics.median(base["times"])
+    new_median = statistics.median(new["times"])
+    slowdown = new_median / base_median - 1 if base_median > 0 else 0.0
+    noise = math.hypot(_stdev(base["times"]), _stdev(new["times"]))
+    regressed = slowdown > tolerance and new_median - base_median > sigmas * noise
+    return slowdown, regressed
+
+
+def compare(baseline, results, tolerance=0.1, sigmas=3.0, output=None):
+    """Print a line for each stage; returns the number of regressions"""
+    output = sys.stdout if output is None else output
+    base_results = {(r["scenario"], r["stage"]): r for r in baseline["results"]}
+    regressions = 0
+    for new in results:
+        key = (new["scenario"], new["stage"])
+        base = base_results.get(key)
+        if base is None:
+            output.write(f"{key[0]:<10}{key[1]:<16}{'no baseline':>12}\n")
+            continue
+        slowdown, regressed = compare_result(base, new, tolerance, sigmas)
+        regressions += regressed
+        output.write(
+            f"{key[0]:<10}{key[1]:<16}{statistics.median(base['times']):>10.3f}s"
+            f"{statistics.median(new['times']):>10.3f}s{slowdown:>+9.1%}"
+            f"{'  REGRESSION' if regressed else ''}\n"
+        )
+    return regressions
+
+
+def load_or_run(args):
+    """Load the results given with --results, or run the benchmarks"""
+    if args.results:
+        with open(args.results, encoding="utf-8") as fd:
+            results = json.load(fd)
+        # Accept a stored baseline as well as the output of bench --json
+        return results["results"] if isinstance(results, dict) else results
+    return run_benchmarks(
+        args.scenarios, args.scale, args.repeat, args.renderers, args.workdir
+    )
+
+
+def main(argv=None):
+    """Store or compare baselines"""
+    parser = argparse.ArgumentParser(
+        description="Store benchmark baselines per python version and machine, and compare "
+        "new runs against them. compare exits with 1 if any stage regressed."
+    )
+    parser.add_argument("action", choices=["store", "compare"])
+    add_run_arguments(parser)
+    parser.add_argument(
+        "--results",
+        help="Use the results written by bench --json instead of running the benchmarks",
+    )
+    parser.add_argument(
+        "--tag",
+        default=platform.node() or "local",
+        help="Machine tag of the baseline; the host name by default",
+    )
+    parser.add_argument(
+        "--dir",
+        default=DEFAULT_DIR,
+        help="Directory of the baselines; benchmarks/baselines by default",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="Relative slowdown of the median that is tolerated; 0.1 by default",
+    )
+    parser.add_argument(
+        "--sigmas",
+        type=float,
+        default=3.0,
+        help="The slowdown should also exceed these many standard deviations of the "
+        "timings to be a regression; 3 by default",
+    )
+    args = parser.parse_args(argv)
+
+    path = baseline_path(args.dir, args.tag)
+    params = {"scale": args.scale, "repeat": args.repeat}
+    if args.action == "store":
+        store(path, load_or_run(args), params)
+        print(f"Stored {path}")
+        return 0
+
+    if not os.path.exists(path):
+        print(f"No baseline at {path}; run `store` first", file=sys.stderr)
+        return 2
+    with open(path, encoding="utf-8") as fd:
+        baseline = json.load(fd)
+    if not args.results and baseline["params"]["scale"] != args.scale:
+        print(
+            f"The baseline was run with --scale {baseline['params']['scale']}",
+            file=sys.stderr,
+        )
+        return 2
+    regressions = compare(baseline, load_or_run(args), args.tolerance, args.sigmas)
+    print(f"{regressions} regression(s) against {path}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Parse and render synthetic files and report the throughput and peak memory of each stage.
+Run from the repository root: PYTHONPATH=src python3 -m benchmarks.bench
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import tracemalloc
+import contextlib
+from types import SimpleNamespace
+
+from mp4viewer.tree import ArrayWindow
+from mp4viewer.datasource import DataBuffer, FileSource
+from mp4viewer.console import ConsoleRenderer
+from mp4viewer.json_renderer import JsonRenderer
+from mp4viewer.ndjson_renderer import NdjsonRenderer
+from mp4viewer.__main__ import get_tree
+from mp4viewer.isobmff.parser import parse_file
+from mp4viewer.isobmff.samples import get_sample_tables
+
+from benchmarks import synth
+
+# Each scenario stresses a box type; `samples` is per track (and per fragment for trun)
+SCENARIOS = {
+    "stsz": {"samples": 1000000},
+    "stz2": {"samples": 1000000, "stz2_bits": 16},
+    "tracks": {"tracks": 4, "samples": 250000},
+    "trun": {"tracks": 2, "fragments": 1000, "samples": 500},
+    "mdat": {"samples": 1000, "sample_size": 1 << 20},
+}
+
+RENDERERS = ["stdout", "json", "ndjson"]
+
+
+def write_scenario(name, path, scale=1.0):
+    """Write the file for a scenario; returns the number of samples in it"""
+    params = dict(SCENARIOS[name])
+    params["samples"] = max(1, int(params["samples"] * scale))
+    fragments = params.pop("fragments", 0)
+    if fragments:
+        return synth.write_fragmented(path, fragments=fragments, **params)
+    return synth.write_progressive(path, **params)
+
+
+# The DataBuffer stage reads up to these many bytes of the file as 32 bit integers
+READ_LIMIT = 16 << 20
+
+
+def read_ints(path, limit=READ_LIMIT):
+    """Read the start of the file through DataBuffer.readint32"""
+    with open(path, "rb") as fd:
+        buf = DataBuffer(FileSource(fd))
+        for _ in range(min(len(buf), limit) // 4):
+            buf.readint32()
+
+
+def count_boxes(boxes):
+    """Number of boxes in the trees"""
+    return sum(1 + count_boxes(box.split_fields()[1]) for box in boxes)
+
+
+def render(renderer, path, boxes, workdir):
+    """
+    Render the parsed boxes of the file with the given renderer; the output is discarded.
+    The file is not parsed again, so that the formats are compared on rendering alone.
+    """
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        # The console and json renderers print to stdout
+        with contextlib.redirect_stdout(devnull):
+            if renderer == "ndjson":
+                NdjsonRenderer(path, devnull).render(boxes)
+                return
+            args = SimpleNamespace(debug=False, array_window=ArrayWindow())
+            root = get_tree(path, boxes, args)
+            if renderer == "stdout":
+                ConsoleRenderer().render(root)
+            else:
+                JsonRenderer(path, os.path.join(workdir, "out.json")).render(root)
+
+
+def measure(func, repeat):
+    """Call func `repeat` times; returns the list of timings and the peak traced memory"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    # A separate run, as tracing slows down the allocations
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return times, peak
+
+
+def result(scenario, stage, times, peak, counts):
+    """
+    A result record; the rates are computed from the fastest run.
+    `counts` is the (bytes, boxes, samples) of the file.
+    """
+    best = min(times)
+    return {
+        "scenario": scenario,
+        "stage": stage,
+        "times": times,
+        "seconds": best,
+        "median": statistics.median(times),
+        "mb_per_s": counts[0] / best / 1e6,
+        "boxes_per_s": counts[1] / best,
+        "samples_per_s": counts[2] / best,
+        "peak_bytes": peak,
+    }
+
+
+def run_scenario(name, workdir, scale=1.0, repeat=3, renderers=None):
+    """Benchmark the DataBuffer reads, parse, sample table and render stages of a scenario"""
+    path = os.path.join(workdir, f"{name}.mp4")
+    samples = write_scenario(name, path, scale)
+    boxes = parse_file(path)
+    counts = (os.path.getsize(path), count_boxes(boxes), samples)
+    # (stage, function, (bytes, boxes, samples) processed by the stage)
+    stages = [
+        ("databuffer", lambda: read_ints(path), (min(counts[0], READ_LIMIT), 0, 0)),
+        ("parse", lambda: parse_file(path), counts),
+        ("samples", lambda: get_sample_tables(boxes), counts),
+    ] + [
+        (f"render:{r}", lambda r=r: render(r, path, boxes, workdir), counts)
+        for r in (RENDERERS if renderers is None else renderers)
+    ]
+    try:
+        return [
+            result(name, stage, *measure(func, repeat), stage_counts)
+            for stage, func, stage_counts in stages
+        ]
+    finally:
+        os.remove(path)
+
+
+def run_benchmarks(scenarios=None, scale=1.0, repeat=3, renderers=None, workdir=None):
+    """Run the scenarios and return the list of result records"""
+    results = []
+    with tempfile.TemporaryDirectory(dir=workdir) as tmpdir:
+        for name in SCENARIOS if scenarios is None else scenarios:
+            results.extend(run_scenario(name, tmpdir, scale, repeat, renderers))
+    return results
+
+
+def print_results(results, output=None):
+    """Print the results as a table"""
+    output = sys.stdout if output is None else output
+    output.write(
+        f"{'scenario':<10}{'stage':<16}{'seconds':>10}{'MB/s':>10}"
+        f"{'boxes/s':>12}{'samples/s':>14}{'peak MiB':>10}\n"
+    )
+    for r in results:
+        output.write(
+            f"{r['scenario']:<10}{r['stage']:<16}{r['seconds']:>10.3f}"
+            f"{r['mb_per_s']:>10.1f}{r['boxes_per_s']:>12.0f}"
+            f"{r['samples_per_s']:>14.0f}{r['peak_bytes'] / (1 << 20):>10.1f}\n"
+        )
+
+
+def write_results(path, results):
+    """Write the result records as json, for benchmarks.baseline --results"""
+    with open(path, "w", encoding="utf-8") as fd:
+        json.dump(results, fd, indent=2)
+
+
+def add_run_arguments(parser):
+    """Arguments that select what is benchmarked"""
+    parser.add_argument(
+        "-s",
+        "--scenario",
+        action="append",
+        choices=list(SCENARIOS),
+        dest="scenarios",
+        help="Run only this scenario; can be repeated",
+    )
+    parser.add_argument(
+        "-r",
+        "--renderer",
+        action="append",
+        choices=RENDERERS,
+        dest="renderers",
+        help="Benchmark only this renderer; can be repeated",
+    )
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Multiply the sample counts of the scenarios; use a small value for a quick run",
+    )
+    parser.add_argument(
+        "-n", "--repeat", type=int, default=3, help="Timed runs of each stage"
+    )
+    parser.add_argument(
+        "--workdir",
+        help="Directory for the synthetic files; a temporary directory by default",
+    )
+
+
+def main(argv=None):
+    """Run the benchmarks"""
+    parser = argparse.ArgumentParser(description="Benchmark mp4viewer")
+    add_run_arguments(parser)
+    parser.add_argument("--json", dest="json_path", help="Also write the results here")
+    args = parser.parse_args(argv)
+    results = run_benchmarks(
+        args.scenarios, args.scale, args.repeat, args.renderers, args.workdir
+    )
+    print_results(results)
+    if args.json_path:
+        write_results(args.json_path, results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
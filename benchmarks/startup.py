@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Measure the start-up cost of the command line, each run in a new interpreter: importing
+mp4viewer.__main__, and viewing a small file with each output format.
+The results can be stored and compared with benchmarks.baseline --results.
+Run from the repository root: PYTHONPATH=src python3 -m benchmarks.startup
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+from benchmarks import synth
+from benchmarks.bench import write_results
+
+SRC_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"
+)
+
+
+def _environment():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [SRC_DIR, env.get("PYTHONPATH")]))
+    return env
+
+
+def commands(path):
+    """(stage, interpreter arguments) of each measured command"""
+    return [
+        ("import", ["-c", "import mp4viewer.__main__"]),
+        ("run:stdout", ["-m", "mp4viewer", "-c", "off", path]),
+        ("run:json", ["-m", "mp4viewer", "-o", "json", "-j", os.devnull, path]),
+        ("run:ndjson", ["-m", "mp4viewer", "-o", "ndjson", path]),
+    ]
+
+
+def time_command(args, repeat):
+    """Wall clock times of running the interpreter with args"""
+    times = []
+    env = _environment()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, *args], env=env, stdout=subprocess.DEVNULL, check=True
+        )
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def import_times(module="mp4viewer.__main__"):
+    """(cumulative microseconds, module) of the mp4viewer modules, from -X importtime"""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=_environment(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = []
+    for line in process.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip().startswith("mp4viewer"):
+            modules.append((int(fields[1]), fields[2].strip()))
+    return sorted(modules, reverse=True)
+
+
+def run_startup(repeat=10, workdir=None):
+    """Measure the commands; returns result records like those of benchmarks.bench"""
+    results = []
+    with tempfile.TemporaryDirectory(dir=workdir) as tmpdir:
+        path = os.path.join(tmpdir, "small.mp4")
+        synth.write_progressive(path, 1, 100, 100)
+        for stage, args in commands(path):
+            times = time_command(args, repeat)
+            results.append(
+                {
+                    "scenario": "startup",
+                    "stage": stage,
+                    "times": times,
+                    "seconds": min(times),
+                    "median": statistics.median(times),
+                }
+            )
+    return results
+
+
+def main(argv=None):
+    """Run the start-up benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark the start-up of mp4viewer")
+    parser.add_argument(
+        "-n", "--repeat", type=int, default=10, help="Runs of each command"
+    )
+    parser.add_argument("--json", dest="json_path", help="Also write the results here")
+    args = parser.parse_args(argv)
+    results = run_startup(args.repeat)
+    if args.json_path:
+        write_results(args.json_path, results)
+    print(f"{'stage':<16}{'best ms':>10}{'median ms':>12}")
+    for r in results:
+        print(f"{r['stage']:<16}{r['seconds'] * 1e3:>10.1f}{r['median'] * 1e3:>12.1f}")
+    print("\nimport of mp4viewer.__main__, cumulative ms:")
+    for micros, module in import_times():
+        print(f"  {module:<40}{micros / 1e3:>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Writes synthetic mp4 files for the benchmarks.
+The files have valid box structures and sample tables that point in to the mdat; the media
+data itself is zeros, written as a sparse region where the file system allows it.
+"""
+
+import os
+import sys
+import struct
+import argparse
+from array import array
+
+# Media data is written in blocks of this size when it cannot be left sparse
+BLOCK_SIZE = 1 << 20
+
+SAMPLE_DURATION = 1000
+SAMPLES_PER_CHUNK = 10
+TIMESCALE = 30000
+
+# Sample flags of trun: non sync samples have sample_is_non_sync_sample set
+NON_SYNC_SAMPLE_FLAGS = 0x00010000
+
+
+def box(fourcc, payload=b""):
+    """Bytes of a box, with a 64 bit size if required"""
+    if len(payload) + 8 > 0xFFFFFFFF:
+        return struct.pack(">I4sQ", 1, fourcc.encode(), 16 + len(payload)) + payload
+    return struct.pack(">I4s", 8 + len(payload), fourcc.encode()) + payload
+
+
+def full_box(fourcc, payload=b"", version=0, flags=0):
+    """Bytes of a full box"""
+    return box(fourcc, struct.pack(">I", version << 24 | flags) + payload)
+
+
+def big_endian_bytes(values, typecode="I"):
+    """Big endian bytes of the values"""
+    values = array(typecode, values)
+    if sys.byteorder == "little":
+        values.byteswap()
+    return values.tobytes()
+
+
+def sample_sizes(count, sample_size, stz2_bits=None):
+    """Sizes that vary a little around sample_size, so that stsz cannot use a single size"""
+    limit = (1 << stz2_bits) - 1 if stz2_bits else 0xFFFFFFFF
+    return [min(sample_size + (i % 7) - 3, limit) for i in range(count)]
+
+
+def stz2(sizes, field_size):
+    """stz2 box with the sizes packed in field_size bits"""
+    if field_size == 4:
+        padded = sizes + [0] * (len(sizes) % 2)
+        packed = bytes(a << 4 | b for a, b in zip(padded[::2], padded[1::2]))
+    elif field_size == 8:
+        packed = bytes(sizes)
+    else:
+        packed = big_endian_bytes(sizes, "H")
+    payload = struct.pack(">BBBBI", 0, 0, 0, field_size, len(sizes)) + packed
+    return full_box("stz2", payload)
+
+
+def stbl(sizes, chunk_offsets, samples_per_chunk, stz2_bits=None):
+    """Sample table with one sync sample every 30 samples"""
+    count = len(sizes)
+    stsd = full_box(
+        "stsd",
+        struct.pack(">I", 1)
+        + box(
+            "avc1",
+            bytes(6)
+            + struct.pack(">H", 1)
+            + bytes(16)
+            + struct.pack(">HHIIIH", 1920, 1080, 0x00480000, 0x00480000, 0, 1)
+            + bytes(32)
+            + struct.pack(">HH", 24, 0xFFFF),
+        ),
+    )
+    stts = full_box("stts", struct.pack(">III", 1, count, SAMPLE_DURATION))
+    ctts = full_box(
+        "ctts", struct.pack(">I", 1) + struct.pack(">II", count, SAMPLE_DURATION)
+    )
+    if stz2_bits:
+        sizes_box = stz2(sizes, stz2_bits)
+    else:
+        sizes_box = full_box(
+            "stsz", struct.pack(">II", 0, count) + big_endian_bytes(sizes)
+        )
+    stsc = full_box("stsc", struct.pack(">IIII", 1, 1, samples_per_chunk, 1))
+    if chunk_offsets and chunk_offsets[-1] > 0xFFFFFFFF:
+        offsets = full_box(
+            "co64",
+            struct.pack(">I", len(chunk_offsets))
+            + big_endian_bytes(chunk_offsets, "Q"),
+        )
+    else:
+        offsets = full_box(
+            "stco",
+            struct.pack(">I", len(chunk_offsets)) + big_endian_bytes(chunk_offsets),
+        )
+    stss = full_box(
+        "stss",
+        struct.pack(">I", (count + 29) // 30)
+        + big_endian_bytes(range(1, count + 1, 30)),
+    )
+    return box("stbl", stsd + stts + ctts + sizes_box + stsc + offsets + stss)
+
+
+def trak(track_id, duration, stbl_bytes):
+    """Video track with the given sample table"""
+    tkhd = full_box(
+        "tkhd",
+        struct.pack(">IIIII", 0, 0, track_id, 0, duration)
+        + bytes(8 + 8 + 36)
+        + struct.pack(">II", 1920 << 16, 1080 << 16),
+        flags=3,
+    )
+    mdhd = full_box("mdhd", struct.pack(">IIIIHH", 0, 0, TIMESCALE, duration, 0, 0))
+    hdlr = full_box("hdlr", bytes(4) + b"vide" + bytes(12) + b"video\0")
+    vmhd = full_box("vmhd", bytes(8), flags=1)
+    minf = box("minf", vmhd + stbl_bytes)
+    return box("trak", tkhd + box("mdia", mdhd + hdlr + minf))
+
+
+def mvhd(duration, next_track_id):
+    """Movie header"""
+    return full_box(
+        "mvhd",
+        struct.pack(">IIIIIH", 0, 0, TIMESCALE, duration, 0x00010000, 0x0100)
+        + bytes(10 + 36 + 24)
+        + struct.pack(">I", next_track_id),
+    )
+
+
+def ftyp():
+    """File type box"""
+    return box("ftyp", b"isom" + struct.pack(">I", 512) + b"isomiso6mp41")
+
+
+def _write_mdat(fd, payload_size):
+    """mdat header followed by payload_size zero bytes"""
+    if payload_size + 8 > 0xFFFFFFFF:
+        header = struct.pack(">I4sQ", 1, b"mdat", 16 + payload_size)
+    else:
+        header = struct.pack(">I4s", 8 + payload_size, b"mdat")
+    fd.write(header)
+    start = fd.tell()
+    try:
+        fd.truncate(start + payload_size)
+        fd.seek(start + payload_size)
+    except OSError:
+        block = bytes(BLOCK_SIZE)
+        remaining = payload_size
+        while remaining > 0:
+            remaining -= fd.write(block[: min(remaining, BLOCK_SIZE)])
+
+
+def get_chunk_offsets(sizes, start):
+    """Offsets of the chunks of SAMPLES_PER_CHUNK samples stored from `start`"""
+    offsets = []
+    for i in range(0, len(sizes), SAMPLES_PER_CHUNK):
+        offsets.append(start)
+        start += sum(sizes[i : i + SAMPLES_PER_CHUNK])
+    return offsets
+
+
+def write_progressive(path, tracks=1, samples=1000, sample_size=1000, stz2_bits=None):
+    """
+    Write a file with a moov followed by a single mdat that holds the samples of all tracks.
+    Returns the number of samples written.
+    """
+    sizes = sample_sizes(samples, sample_size, stz2_bits)
+    track_bytes = sum(sizes)
+    duration = samples * SAMPLE_DURATION
+
+    def build_moov(mdat_start):
+        traks = b""
+        for track in range(tracks):
+            offsets = get_chunk_offsets(sizes, mdat_start + track * track_bytes)
+            table = stbl(sizes, offsets, SAMPLES_PER_CHUNK, stz2_bits)
+            traks += trak(track + 1, duration, table)
+        return box("moov", mvhd(duration, tracks + 1) + traks)
+
+    head = ftyp()
+    mdat_header_size = 16 if tracks * track_bytes + 8 > 0xFFFFFFFF else 8
+    # The size of the moov does not depend on the offsets unless they need co64
+    moov = build_moov(len(head) + mdat_header_size)
+    moov = build_moov(len(head) + len(moov) + mdat_header_size)
+    with open(path, "wb") as fd:
+        fd.write(head + moov)
+        _write_mdat(fd, tracks * track_bytes)
+    return tracks * samples
+
+
+def moof(sequence_number, tracks, sizes, base_dts):
+    """moof with a traf per track; the samples of each track follow those of the previous one"""
+    mfhd = full_box("mfhd", struct.pack(">I", sequence_number))
+
+    def traf(track_id, data_offset):
+        tfhd = full_box(
+            "tfhd", struct.pack(">II", track_id, SAMPLE_DURATION), flags=0x020008
+        )
+        tfdt = full_box("tfdt", struct.pack(">Q", base_dts), version=1)
+        # data offset, first sample flags (a sync sample) and sample sizes
+        trun = full_box(
+            "trun",
+            struct.pack(">IiI", len(sizes), data_offset, 0) + big_endian_bytes(sizes),
+            flags=0x000205,
+        )
+        return box("traf", tfhd + tfdt + trun)
+
+    moof_size = 8 + len(mfhd) + tracks * len(traf(1, 0))
+    # Data offsets are relative to the moof; the mdat that follows has an 8 byte header
+    return box(
+        "moof",
+        mfhd
+        + b"".join(
+            traf(track + 1, moof_size + 8 + track * sum(sizes))
+            for track in range(tracks)
+        ),
+    )
+
+
+def init_segment(tracks):
+    """ftyp and a moov with a trex for each track and no samples"""
+    empty_stbl = stbl([], [], 1)
+    traks = b"".join(trak(track + 1, 0, empty_stbl) for track in range(tracks))
+    trexs = b"".join(
+        full_box(
+            "trex",
+            struct.pack(
+                ">IIIII", track + 1, 1, SAMPLE_DURATION, 0, NON_SYNC_SAMPLE_FLAGS
+            ),
+        )
+        for track in range(tracks)
+    )
+    return ftyp() + box("moov", mvhd(0, tracks + 1) + traks + box("mvex", trexs))
+
+
+def write_fragmented(path, tracks=1, fragments=100, samples=100, sample_size=1000):
+    """
+    Write an init segment followed by `fragments` moof and mdat pairs, with `samples`
+    samples per track in each fragment. Returns the number of samples written.
+    """
+    sizes = sample_sizes(samples, sample_size)
+    with open(path, "wb") as fd:
+        fd.write(init_segment(tracks))
+        for index in range(fragments):
+            fd.write(moof(index + 1, tracks, sizes, index * samples * SAMPLE_DURATION))
+            _write_mdat(fd, tracks * sum(sizes))
+    return tracks * fragments * samples
+
+
+def write_segments(directory, tracks=1, segments=100, samples=100, sample_size=1000):
+    """
+    Write init.mp4 and `segments` media segments, seg-1.m4s onwards, each with a styp and a
+    single moof and mdat pair, to the directory. Returns the paths of the media segments.
+    """
+    sizes = sample_sizes(samples, sample_size)
+    with open(os.path.join(directory, "init.mp4"), "wb") as fd:
+        fd.write(init_segment(tracks))
+    paths = []
+    for index in range(segments):
+        paths.append(os.path.join(directory, f"seg-{index + 1}.m4s"))
+        with open(paths[-1], "wb") as fd:
+            fd.write(box("styp", b"msdh" + struct.pack(">I", 0) + b"msdhmsix"))
+            fd.write(moof(index + 1, tracks, sizes, index * samples * SAMPLE_DURATION))
+            _write_mdat(fd, tracks * sum(sizes))
+    return paths
+
+
+def main(argv=None):
+    """Write a synthetic file"""
+    parser = argparse.ArgumentParser(description="Write a synthetic mp4 file")
+    parser.add_argument("output", help="Path of the file to write")
+    parser.add_argument("--tracks", type=int, default=1, help="Number of tracks")
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=1000,
+        help="Samples per track, or per track in each fragment if --fragments is set",
+    )
+    parser.add_argument(
+        "--fragments",
+        type=int,
+        default=0,
+        help="Number of fragments; a progressive file is written if this is 0",
+    )
+    parser.add_argument(
+        "--sample-size",
+        type=int,
+        default=1000,
+        help="Average sample size in bytes; this decides the size of the mdat",
+    )
+    parser.add_argument(
+        "--stz2",
+        type=int,
+        choices=[4, 8, 16],
+        help="Write the sample sizes in a stz2 box with this field size instead of stsz",
+    )
+    parser.add_argument(
+        "--segments",
+        action="store_true",
+        help="Write init.mp4 and --fragments media segments in to the output directory "
+        "instead of a single file",
+    )
+    args = parser.parse_args(argv)
+    if args.segments:
+        os.makedirs(args.output, exist_ok=True)
+        paths = write_segments(
+            args.output, args.tracks, args.fragments, args.samples, args.sample_size
+        )
+        count = args.tracks * len(paths) * args.samples
+    elif args.fragments:
+        count = write_fragmented(
+            args.output, args.tracks, args.fragments, args.samples, args.sample_size
+        )
+    else:
+        count = write_progressive(
+            args.output,
+            args.tracks,
+            args.samples,
+            args.sample_size,
+            args.stz2,
+        )
+    print(f"Wrote {count} samples to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
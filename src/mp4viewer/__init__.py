@@ -0,0 +1,24 @@
+""" Parse mp4 files (ISO bmff) and inspect their metadata """
+
+# name -> "module:attribute" of the attributes that are imported on first use, to keep
+# `import mp4viewer` and the start of the command line fast
+_LAZY_ATTRIBUTES = {
+    "aparse": "mp4viewer.aio:aparse",
+    "AsyncParser": "mp4viewer.aio:AsyncParser",
+    "open": "mp4viewer.mp4file:open_file",
+    "Mp4File": "mp4viewer.mp4file:Mp4File",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        # pylint: disable-next=import-outside-toplevel
+        import importlib
+
+        module, _, attribute = _LAZY_ATTRIBUTES[name].partition(":")
+        return getattr(importlib.import_module(module), attribute)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
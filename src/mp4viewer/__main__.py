@@ -3,14 +3,28 @@
 import os
 import sys
 import argparse
+import importlib
+import contextlib
 
-from mp4viewer.tree import Tree, Attr
+from mp4viewer.tree import Tree, Attr, ArrayField, ArrayWindow
 from mp4viewer.datasource import FileSource, DataBuffer
-from mp4viewer.console import ConsoleRenderer
-from mp4viewer.json_renderer import JsonRenderer
 
-from mp4viewer.isobmff.parser import IsobmffParser, getboxdesc
+from mp4viewer.isobmff.parser import IsobmffParser, getboxdesc, parse_file
 from mp4viewer.isobmff.box import Box
+from mp4viewer.isobmff.plugins import load_plugin
+from mp4viewer.isobmff.utils import error_print, non_negative_int
+
+# Commands other than viewing a file; each module has a main(argv) for its own arguments
+COMMANDS = {
+    "samples": "mp4viewer.sample_export",
+    "catalog": "mp4viewer.sqlite_export",
+    "diff": "mp4viewer.diff",
+    "hash": "mp4viewer.box_hash",
+    "serve": "mp4viewer.server",
+    "faststart": "mp4viewer.faststart",
+    "segments": "mp4viewer.segments",
+    "check": "mp4viewer.check",
+}
 
 
 def add_kv_list(node, key, items):
@@ -26,6 +40,56 @@ def add_kv_list(node, key, items):
                 kv_node.add_attr(k, v)
 
 
+def add_array_items(node, value, ranges):
+    """Add the items of an ArrayField in the given ranges as one attribute per item"""
+    position = 0
+    for start, end in ranges:
+        if start > position:
+            node.add_attr("  ...", f"{start - position} items")
+        for index, item in enumerate(value.format_items(start, end), start + 1):
+            node.add_attr(f"  {value.item_name} {index}", item)
+        position = end
+    if position < len(value):
+        node.add_attr("  ...", f"{len(value) - position} items")
+
+
+def add_array_field(node, name, value, window, display_value=None):
+    """
+    Add an array valued field (a list or an ArrayField) to the node.
+    Only the items selected by `window` are formatted; everything is shown if window is None.
+    """
+    length = len(value)
+    ranges = [(0, length)] if window is None else window.ranges(length)
+    is_array_field = isinstance(value, ArrayField)
+    if is_array_field and value.item_name is not None:
+        add_array_items(node, value, ranges)
+        return
+
+    if ranges == [(0, length)]:
+        node.add_attr(
+            name, list(value.items) if is_array_field else value, display_value
+        )
+        return
+
+    ranges = [(start, end) for start, end in ranges if end > start]
+    if not ranges:
+        # a window past the end of the array
+        node.add_attr(name, f"[...] {length} items", display_value)
+        return
+    parts = []
+    for start, end in ranges:
+        if is_array_field:
+            parts.append(",".join(value.format_items(start, end)))
+        else:
+            parts.append(",".join([str(i) for i in value[start:end]]))
+    text = " ... ".join(parts)
+    if ranges[0][0] > 0:
+        text = f"... {text}"
+    if ranges[-1][1] < length:
+        text = f"{text} ..."
+    node.add_attr(name, f"[{text}] {length} items", display_value)
+
+
 def get_box_node(box, args):
     """Get a tree node representing the box"""
     node = Tree(box.boxtype, getboxdesc(box.boxtype))
@@ -37,16 +101,20 @@ def get_box_node(box, args):
             raise TypeError(f"Expected a tuple, got a {type(field)}")
         # generate fields yields a tuple of order (name, value, [formatted_value])
         value = field[1]
+        display_value = field[2] if len(field) == 3 else None
         # Take care of lists of dicts
         if isinstance(value, list) and len(value) > 0 and isinstance(value[0], dict):
             add_kv_list(node, field[0], value)
             continue
 
-        if args.truncate and isinstance(value, list) and len(value) > 16:
-            first3 = ",".join([str(i) for i in value[:3]])
-            last3 = ",".join([str(i) for i in value[-3:]])
-            value = f"[{first3} ... {last3}] {len(value)} items"
-        node.add_attr(field[0], value, field[2] if len(field) == 3 else None)
+        if isinstance(value, (list, ArrayField)):
+            if args.array_window is None and getattr(args, "page_arrays", False):
+                # Kept whole for the gui, which shows long arrays as pages of items
+                node.add_attr(field[0], value, display_value)
+            else:
+                add_array_field(node, field[0], value, args.array_window, display_value)
+            continue
+        node.add_attr(field[0], value, display_value)
     return node
 
 
@@ -58,30 +126,204 @@ def add_box(parent, box, args):
     return box_node
 
 
-def get_tree_from_file(path, args):
-    """Parse the mp4 file and return a tree of boxes"""
-    with open(path, "rb") as fd:
-        # isobmff file parser
-        parser = IsobmffParser(DataBuffer(FileSource(fd)), args.debug)
-        boxes = parser.getboxlist()
+def gui_box_to_node(path, args):
+    """
+    The box_to_node function of GtkRenderer.render_file, which adds each top level box to a
+    tree rooted at the file. Arrays that are shown in full are not expanded in to attributes,
+    as the gui adds their items a page at a time when they are expanded.
+    """
+    root = Tree(os.path.basename(path), "File")
+    args = argparse.Namespace(**vars(args), page_arrays=True)
+    return lambda box: add_box(root, box, args)
+
+
+def get_tree(path, boxes, args):
+    """Return a tree of the parsed boxes of the file"""
     root = Tree(os.path.basename(path), "File")
     for box in boxes:
         add_box(root, box, args)
     return root
 
 
-def main():
+def get_tree_from_file(path, args):
+    """Parse the mp4 file and return a tree of boxes"""
+    return get_tree(path, parse_file(path, args.debug), args)
+
+
+def write_ndjson_from_file(path, args, recorder=None):
+    """Parse the mp4 file and write ndjson records for each top level box as it is parsed"""
+    with open(path, "rb") as fd:
+        if recorder is None:
+            boxes = IsobmffParser(DataBuffer(FileSource(fd)), args.debug).iterboxes()
+        else:
+            boxes = recorder.iterboxes(recorder.parser(fd, args.debug))
+        # pylint: disable-next=import-outside-toplevel
+        from .ndjson_renderer import NdjsonRenderer
+
+        NdjsonRenderer(mp4_path=path).render(boxes)
+
+
+def parse_array_window(text):
+    """argparse type for START[:COUNT]"""
+    parts = text.split(":")
+    try:
+        if len(parts) > 2:
+            raise argparse.ArgumentTypeError(f"Too many values in {text}")
+        values = [non_negative_int(v) for v in parts]
+    except argparse.ArgumentTypeError as e:
+        raise argparse.ArgumentTypeError(f"Invalid window {text}") from e
+    return values[0], values[1] if len(values) == 2 else None
+
+
+def get_array_window(args):
+    """Get the ArrayWindow requested by the command line arguments, or None to show everything"""
+    if not args.truncate:
+        return None
+    if args.array_window is not None:
+        return ArrayWindow(start=args.array_window[0], count=args.array_window[1])
+    return ArrayWindow(head=args.array_head, tail=args.array_tail)
+
+
+def get_renderer(args, output_format=None):
+    """
+    The renderer of the output format, which is imported here so that only the selected
+    renderer is loaded
+    """
+    # pylint: disable=import-outside-toplevel
+    if (output_format or args.output_format) == "stdout":
+        from .console import ConsoleRenderer
+
+        renderer = ConsoleRenderer(latex_md_for_github=args.latex)
+        if args.color == "off":
+            renderer.disable_colors()
+        else:
+            renderer.update_colors()
+        return renderer
+    from .json_renderer import JsonRenderer
+
+    return JsonRenderer(mp4_path=args.input_file, output_path=args.json_path)
+
+
+def write_json_from_file(path, args):
+    """Write the json output for the formats that do not build the whole tree themselves"""
+    get_renderer(args, "json").render(get_tree_from_file(path, args))
+
+
+def _phase(profiler, name):
+    return contextlib.nullcontext() if profiler is None else profiler.phase(name)
+
+
+def render_tree(args, profiler=None, recorder=None):
+    """Parse the file, build the tree and render it to the console or json"""
+    with _phase(profiler, "parse"):
+        if recorder is None:
+            boxes = parse_file(args.input_file, args.debug)
+        else:
+            boxes = recorder.parse_file(args.input_file, args.debug)
+    with _phase(profiler, "tree"):
+        root = get_tree(args.input_file, boxes, args)
+
+    with _phase(profiler, "render"):
+        get_renderer(args).render(root)
+        # Handle the case where json output is required in addition to the requested format
+        if args.json_path is not None and args.output_format != "json":
+            get_renderer(args, "json").render(root)
+
+
+def start_profiler(args, stack):
+    """Start the --profile profiler, which is stopped when the stack is closed"""
+    if not args.profile:
+        return None
+    # pylint: disable=import-outside-toplevel
+    from .profiler import ParseProfiler
+
+    return stack.enter_context(ParseProfiler())
+
+
+def start_io_recorder(args, stack):
+    """The IORecorder for --io-stats and --io-trace; the trace is closed with the stack"""
+    if not (args.io_stats or args.io_trace):
+        return None
+    # pylint: disable=import-outside-toplevel
+    from .iostats import IORecorder
+
+    if args.output_format in ("tui", "gui"):
+        error_print(
+            f"--io-stats and --io-trace are not supported with -o {args.output_format}"
+        )
+        return None
+    trace = None
+    if args.io_trace:
+        # pylint: disable-next=consider-using-with
+        trace = stack.enter_context(open(args.io_trace, "w", encoding="utf-8"))
+    return IORecorder(trace)
+
+
+def write_reports(args, profiler, recorder):
+    """Write the --profile report to --profile-output (or stderr) and the --io-stats report"""
+    if profiler is not None:
+        if args.profile_output is None:
+            profiler.write_report(args.profile_format)
+        else:
+            with open(args.profile_output, "w", encoding="utf-8") as output:
+                profiler.write_report(args.profile_format, output)
+    if recorder is not None and args.io_stats:
+        recorder.write_report(args.io_stats_format)
+
+
+def view(args, profiler=None, recorder=None):
+    """Show the file in the requested output format"""
+    if args.output_format in ("ndjson", "tui", "gui"):
+        with _phase(profiler, "run"):
+            render_incrementally(args, recorder)
+        # These do not keep the whole tree; parse again for json
+        if args.json_path is not None:
+            with _phase(profiler, "json"):
+                write_json_from_file(args.input_file, args)
+    else:
+        render_tree(args, profiler, recorder)
+
+
+def render_incrementally(args, recorder=None):
+    """Handle the output formats that do not build the whole tree up front"""
+    # pylint: disable=import-outside-toplevel
+    if args.output_format == "ndjson":
+        write_ndjson_from_file(args.input_file, args, recorder)
+    elif args.output_format == "tui":
+        from .tui import TuiRenderer
+
+        # Only the top level box headers are read until the boxes are expanded
+        TuiRenderer().render_file(args.input_file, args.debug)
+    elif args.output_format == "gui":
+        from .gui import GtkRenderer
+
+        # The window is shown right away and the file is parsed in the background
+        GtkRenderer().render_file(
+            args.input_file, gui_box_to_node(args.input_file, args), args.debug
+        )
+
+
+def main(argv=None):
     """the main"""
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) > 0 and argv[0] in COMMANDS:
+        return importlib.import_module(COMMANDS[argv[0]]).main(argv[1:])
+
     parser = argparse.ArgumentParser(
         description="Parse mp4 files (ISO bmff) and view the boxes and their contents.  "
-        "The output can be viewed on the console, a window, or saved in to a json file."
+        "The output can be viewed on the console, a window, or saved in to a json file.",
+        epilog=f"Other commands: {', '.join(COMMANDS)}. "
+        "Run `mp4viewer <command> -h` for their arguments.",
     )
     parser.add_argument(
         "-o",
         "--output",
-        choices=["stdout", "gui", "json"],
+        choices=["stdout", "gui", "tui", "json", "ndjson"],
         default="stdout",
-        help="Specify the output format. Please note that pygtk is required for `gui`. ",
+        help="Specify the output format. Please note that pygtk is required for `gui`. "
+        "`tui` browses the file in the terminal, parsing each top level box only when it is "
+        "expanded. `ndjson` writes one json object per box to stdout; long arrays are written "
+        "in full as separate records.",
         dest="output_format",
     )
     parser.add_argument(
@@ -109,42 +351,110 @@ def main():
         help="Do not truncate long arrays",
         dest="truncate",
     )
+    parser.add_argument(
+        "--array-head",
+        type=non_negative_int,
+        default=3,
+        metavar="N",
+        help="Number of items shown from the start of long arrays; 3 by default",
+    )
+    parser.add_argument(
+        "--array-tail",
+        type=non_negative_int,
+        default=3,
+        metavar="N",
+        help="Number of items shown from the end of long arrays; 3 by default",
+    )
+    parser.add_argument(
+        "--array-window",
+        type=parse_array_window,
+        metavar="START[:COUNT]",
+        help="Show COUNT items (or all the remaining items) from the zero based index START "
+        "of long arrays instead of their head and tail",
+    )
     parser.add_argument(
         "--debug", action="store_true", help="Used for internal debugging"
     )
+    parser.add_argument(
+        "--info",
+        action="store_true",
+        help="Print a short summary of the file and its tracks instead of the boxes. Only "
+        "the headers of the moov are parsed, along with the sums of the sample sizes and "
+        "durations.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Report the time, bytes, counts and DataBuffer calls of each box type and the "
+        "time spent building the tree and rendering. The report is written to stderr.",
+    )
+    parser.add_argument(
+        "--profile-format",
+        choices=["table", "json", "collapsed"],
+        default="table",
+        help="Format of the --profile report; a table by default, or collapsed stacks "
+        "for flamegraph tools",
+    )
+    parser.add_argument(
+        "--profile-output",
+        metavar="PATH",
+        help="Write the --profile report to this file instead of stderr",
+    )
+    parser.add_argument(
+        "--io-stats",
+        action="store_true",
+        help="Report the reads, bytes read, seeks, seek distance and buffer refills and "
+        "resets of the run and of each top level box to stderr. Not supported with tui and gui.",
+    )
+    parser.add_argument(
+        "--io-stats-format",
+        choices=["table", "json"],
+        default="table",
+        help="Format of the --io-stats report; a table by default",
+    )
+    parser.add_argument(
+        "--io-trace",
+        metavar="PATH",
+        help="Write a line to this file for each read and seek of the input file",
+    )
+    parser.add_argument(
+        "--plugin",
+        action="append",
+        dest="plugins",
+        metavar="MODULE[:FUNCTION]",
+        help="Import a module (and call the function) that registers extra box types or "
+        "parse callbacks; can be repeated. Plugins of installed packages are loaded anyway.",
+    )
     parser.add_argument(
         "--latex",
         action="store_true",
         help="Generate latex-in-markdown for github README",
     )
     parser.add_argument("input_file", help="Location of the ISO bmff file (mp4)")
-    args = parser.parse_args()
-
-    root = get_tree_from_file(args.input_file, args)
+    args = parser.parse_args(argv)
+    args.array_window = get_array_window(args)
 
-    renderer = None
-    if args.output_format == "stdout":
-        renderer = ConsoleRenderer(latex_md_for_github=args.latex)
-        if args.color == "off":
-            renderer.disable_colors()
-        else:
-            renderer.update_colors()
+    for name in args.plugins or []:
+        try:
+            load_plugin(name)
+        except (ImportError, AttributeError) as e:
+            error_print(f"Failed to load the plugin {name}: {e}")
+            return 1
 
-    if args.output_format == "gui":
+    if args.info:
         # pylint: disable=import-outside-toplevel
-        from .gui import GtkRenderer
-
-        renderer = GtkRenderer()
-
-    if args.output_format == "json":
-        renderer = JsonRenderer(mp4_path=args.input_file, output_path=args.json_path)
-
-    renderer.render(root)
+        from .info import write_info
+        from .mp4file import Mp4File
 
-    # Handle the case where json output is required in addition to the requested format
-    if args.json_path is not None and args.output_format != "json":
-        JsonRenderer(mp4_path=args.input_file, output_path=args.json_path).render(root)
+        with Mp4File(args.input_file, args.debug) as mp4:
+            write_info(mp4)
+        return 0
 
+    with contextlib.ExitStack() as stack:
+        profiler = start_profiler(args, stack)
+        recorder = start_io_recorder(args, stack)
+        view(args, profiler, recorder)
+    write_reports(args, profiler, recorder)
     return 0
 
 
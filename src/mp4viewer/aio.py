@@ -0,0 +1,109 @@
+""" Parse files from an asyncio event loop without blocking it """
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from mp4viewer.datasource import PositionalFileSource, PositionalDataBuffer
+from mp4viewer.isobmff.parser import IsobmffParser
+from mp4viewer.isobmff.plugins import SKIP_BOX
+
+
+def _skeleton_callback(parser):
+    """pre_parse callback that skips the fields of all boxes other than containers"""
+
+    def pre_parse(fourcc, offset, parent):
+        # pylint: disable=unused-argument
+        return None if fourcc in parser.container_boxes else SKIP_BOX
+
+    return pre_parse
+
+
+async def _run(executor, func):
+    """
+    Run func in the executor. A running parse cannot be interrupted; if the caller is
+    cancelled, the current box is finished before the cancellation goes through, so that the
+    file is not closed under the worker thread.
+    """
+    future = asyncio.get_running_loop().run_in_executor(executor, func)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        await asyncio.wait([future])
+        raise
+
+
+class AsyncParser:
+    """
+    Parses files for an event loop. The reads and the parsing of each top level box run in a
+    pool of `workers` threads, and at most `limit` files are parsed at a time; the other
+    callers wait. Cancelling a caller stops the parse before the next top level box.
+    """
+
+    def __init__(self, limit=8, workers=None):
+        self.limit = limit
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers or limit, thread_name_prefix="mp4viewer"
+        )
+        self._loop = None
+        self._semaphore = None
+
+    def _get_semaphore(self):
+        # Semaphores belong to the loop they are used in
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.limit)
+        return self._semaphore
+
+    async def iterboxes(self, path, skeleton=False, debug=False):
+        """
+        Async generator that yields the top level boxes of the file as they are parsed.
+        With skeleton=True only the headers of the boxes are read, except for containers,
+        which give the structure of the file without the fields.
+        """
+        async with self._get_semaphore():
+            with open(path, "rb") as fd:
+                source = PositionalFileSource(fd)
+
+                def start():
+                    parser = IsobmffParser(PositionalDataBuffer(source), debug)
+                    if skeleton:
+                        parser.add_callbacks(pre_parse=_skeleton_callback(parser))
+                    return parser.iterboxes()
+
+                boxes = await _run(self.executor, start)
+                while True:
+                    box = await _run(self.executor, lambda: next(boxes, None))
+                    if box is None:
+                        return
+                    yield box
+
+    async def parse(self, path, skeleton=False, debug=False):
+        """Return the list of the top level boxes of the file"""
+        return [box async for box in self.iterboxes(path, skeleton, debug)]
+
+    def close(self):
+        """Shut down the worker threads once the running parses are done"""
+        self.executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
+
+
+@functools.lru_cache(maxsize=None)
+def default_parser():
+    """The process wide AsyncParser used by aparse()"""
+    return AsyncParser()
+
+
+async def aparse(path, skeleton=False, debug=False):
+    """
+    Parse the file without blocking the event loop and return its top level boxes, like
+    isobmff.parser.parse_file. Uses default_parser(); create an AsyncParser to choose the
+    limits.
+    """
+    return await default_parser().parse(path, skeleton, debug)
@@ -0,0 +1,177 @@
+""" Digests of the raw bytes of each box, to find duplicate boxes across files """
+
+import hashlib
+import argparse
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from mp4viewer.datasource import PositionalFileSource, PositionalDataBuffer
+from mp4viewer.isobmff.parser import IsobmffParser
+from mp4viewer.isobmff.utils import positive_int
+
+# Boxes are read in blocks of this size; hashlib releases the GIL while hashing large blocks
+BLOCK_SIZE = 1 << 20
+# Files that are kept open while their boxes are hashed
+MAX_OPEN_FILES = 16
+
+
+def iter_boxes(boxes, parent_path=""):
+    """Yields (path, box) for each of the boxes and all their descendants, depth first"""
+    for box in boxes:
+        path = f"{parent_path}/{box.boxtype}" if parent_path else box.boxtype
+        yield path, box
+        yield from iter_boxes(box.children, path)
+
+
+def hash_range(source, offset, size, algorithm="blake2b"):
+    """
+    Return the hex digest of `size` bytes from `offset` of a PositionalFileSource.
+    The reads do not use the file position, so a source can be hashed from several threads.
+    """
+    digest = hashlib.new(algorithm)
+    position = offset
+    end = offset + size
+    while position < end:
+        block = source.read_at(position, min(BLOCK_SIZE, end - position))
+        if not block:
+            raise BufferError(f"{source.file.name}: read nothing at {position}")
+        digest.update(block)
+        position += len(block)
+    return digest.hexdigest()
+
+
+class BoxDigest:
+    """Digest of a box, along with where the box was found"""
+
+    # pylint: disable=too-few-public-methods
+    __slots__ = ("file", "path", "fourcc", "offset", "size", "digest")
+
+    def __init__(self, file, path, box, size):
+        self.file = file
+        self.path = path
+        self.fourcc = box.boxtype
+        self.offset = box.buffer_offset
+        self.size = size
+        self.digest = None
+
+    def __str__(self):
+        return (
+            f"{self.digest} {self.offset:>12} {self.size:>12} {self.path} {self.file}"
+        )
+
+
+def _box_digests(file, source, fourccs, debug):
+    """Parse the file and yield a BoxDigest, without the digest, for each box to hash"""
+    boxes = IsobmffParser(PositionalDataBuffer(source), debug).getboxlist()
+    for path, box in iter_boxes(boxes):
+        if fourccs and box.boxtype not in fourccs:
+            continue
+        # Size 0 means the box extends to the end of the file
+        yield BoxDigest(file, path, box, box.size or len(source) - box.buffer_offset)
+
+
+def _close_when_hashed(fd, futures):
+    """Wait for the boxes of a file to be hashed, then close the file"""
+    wait(futures)
+    fd.close()
+
+
+def hash_files(paths, fourccs=None, algorithm="blake2b", jobs=None, debug=False):
+    """
+    Parse each of the files and hash the raw bytes of their boxes in a thread pool.
+    Only the boxes whose type is in `fourccs` are hashed if it is set.
+    Returns the list of BoxDigest objects in file order.
+    """
+    results = []
+    futures = []
+    # (file, futures of its boxes) of the files that are open
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        try:
+            # Parsing continues in this thread while the boxes of earlier files are hashed.
+            # The parser and the hashing threads share the descriptor of a file, which is
+            # closed once its boxes are hashed, so that at most MAX_OPEN_FILES are open.
+            for file in paths:
+                if len(pending) == MAX_OPEN_FILES:
+                    _close_when_hashed(*pending.popleft())
+                fd = open(file, "rb")  # pylint: disable=consider-using-with
+                pending.append((fd, []))
+                source = PositionalFileSource(fd)
+                for result in _box_digests(file, source, fourccs, debug):
+                    results.append(result)
+                    futures.append(
+                        executor.submit(
+                            hash_range, source, result.offset, result.size, algorithm
+                        )
+                    )
+                    pending[-1][1].append(futures[-1])
+        finally:
+            while pending:
+                _close_when_hashed(*pending.popleft())
+    for result, future in zip(results, futures):
+        result.digest = future.result()
+    return results
+
+
+def find_duplicates(results):
+    """Return a list of lists of BoxDigests with the same box type and digest"""
+    groups = defaultdict(list)
+    for result in results:
+        groups[(result.fourcc, result.digest)].append(result)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def main(argv):
+    """the `hash` command"""
+    parser = argparse.ArgumentParser(
+        prog="mp4viewer hash",
+        description="Compute a digest of the raw bytes of each box and list the boxes that "
+        "are identical across the given files.",
+    )
+    parser.add_argument(
+        "-t",
+        "--type",
+        action="append",
+        dest="fourccs",
+        metavar="FOURCC",
+        help="Only hash boxes of this type; can be repeated. All boxes are hashed by default.",
+    )
+    parser.add_argument(
+        "-a",
+        "--algorithm",
+        default="blake2b",
+        # shake digests need a length, so they are left out
+        choices=sorted(
+            a for a in hashlib.algorithms_guaranteed if not a.startswith("shake")
+        ),
+        help="hashlib algorithm; blake2b by default",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=positive_int,
+        default=None,
+        help="Number of hashing threads; defaults to the ThreadPoolExecutor default",
+    )
+    parser.add_argument(
+        "--duplicates-only",
+        action="store_true",
+        help="Only print the groups of identical boxes",
+    )
+    parser.add_argument(
+        "--debug", action="store_true", help="Used for internal debugging"
+    )
+    parser.add_argument("input_files", nargs="+", help="ISO bmff files (mp4)")
+    args = parser.parse_args(argv)
+
+    results = hash_files(
+        args.input_files, args.fourccs, args.algorithm, args.jobs, args.debug
+    )
+    if not args.duplicates_only:
+        for result in results:
+            print(result)
+    for group in find_duplicates(results):
+        print(f"\n{len(group)} identical {group[0].fourcc} boxes ({group[0].digest}):")
+        for result in group:
+            print(f"    {result.file} @ {result.offset} ({result.path})")
+    return 0
@@ -0,0 +1,341 @@
+""" Check the timelines of fragmented files and segmented streams for gaps and misalignment """
+
+import math
+import bisect
+import argparse
+from collections import namedtuple
+from itertools import accumulate, compress
+from operator import sub
+
+from mp4viewer.isobmff.parser import parse_file
+from mp4viewer.isobmff.samples import get_sample_tables
+from mp4viewer.isobmff.utils import error_print, positive_int
+from mp4viewer.segments import expand_segment_paths, load_segments
+
+# A problem in the timeline of a track. `fragment` is the index of the fragment (or of the
+# segment for the alignment checks) and `time` is its decode time in seconds.
+Issue = namedtuple(
+    "Issue", ["kind", "rendition", "track_id", "fragment", "time", "detail"]
+)
+
+
+class Rendition:
+    """
+    The sample tables of a fragmented file, or of an init segment and its media segments,
+    with the index of the first sample of each segment of each track. The fragments of a
+    single file are its segments.
+    """
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, name, tables, boundaries):
+        self.name = name
+        self.tables = tables
+        self.boundaries = boundaries
+
+    def first_tables(self):
+        """handler -> the SampleTable of the first track with that handler"""
+        tables = {}
+        for _, table in sorted(self.tables.items()):
+            tables.setdefault(table.handler, table)
+        return tables
+
+
+def load_file(path, debug=False):
+    """A Rendition from a fragmented file"""
+    tables = get_sample_tables(parse_file(path, debug))
+    boundaries = {
+        track_id: [fragment.first_sample for fragment in table.fragments]
+        for track_id, table in tables.items()
+    }
+    return Rendition(path, tables, boundaries)
+
+
+def load_stream(init_path, segment_paths, jobs=None, debug=False):
+    """A Rendition from an init segment and its media segments"""
+    timeline = load_segments(init_path, segment_paths, jobs, debug)
+    boundaries = {
+        track_id: [segment.first_sample for segment in segments]
+        for track_id, segments in timeline.segments.items()
+    }
+    return Rendition(init_path, timeline.tables, boundaries)
+
+
+def _ticks(milliseconds, timescale):
+    return milliseconds * timescale / 1000
+
+
+def _seconds(ticks, timescale):
+    return ticks / timescale if timescale else 0.0
+
+
+def check_continuity(rendition, table, tolerance=1.0, max_drift=10.0):
+    """
+    Compare the decode time of each fragment (its tfdt) with the end of the previous
+    fragment, which is its decode time plus the sum of its trun durations. Differences of
+    more than `tolerance` milliseconds are gaps or overlaps; the smaller differences add up,
+    and the first fragment where they reach more than `max_drift` milliseconds is reported.
+    """
+    fragments = table.fragments
+    timescale = table.timescale
+    ends = [fragment.decode_time + fragment.duration for fragment in fragments]
+    deltas = list(map(sub, (fragment.decode_time for fragment in fragments[1:]), ends))
+    tolerance = _ticks(tolerance, timescale)
+    issues = []
+    for index, delta in enumerate(deltas, 1):
+        if abs(delta) <= tolerance:
+            continue
+        issues.append(
+            Issue(
+                "gap" if delta > 0 else "overlap",
+                rendition.name,
+                table.track_id,
+                index,
+                _seconds(fragments[index].decode_time, timescale),
+                f"{abs(delta)} ticks ({_seconds(abs(delta), timescale) * 1000:.3f} ms) "
+                f"{'after' if delta > 0 else 'before'} the end of the previous fragment",
+            )
+        )
+    drift = accumulate(delta if abs(delta) <= tolerance else 0 for delta in deltas)
+    for index, value in enumerate(drift, 1):
+        if abs(value) > _ticks(max_drift, timescale):
+            issues.append(
+                Issue(
+                    "drift",
+                    rendition.name,
+                    table.track_id,
+                    index,
+                    _seconds(fragments[index].decode_time, timescale),
+                    f"the tfdt is {value} ticks from the summed trun durations",
+                )
+            )
+            break
+    return issues
+
+
+def check_sync_starts(rendition, table):
+    """Fragments whose first sample is not a sync sample, going by the trun sample flags"""
+    return [
+        Issue(
+            "non-sync-start",
+            rendition.name,
+            table.track_id,
+            index,
+            _seconds(fragment.decode_time, table.timescale),
+            f"the first sample ({fragment.first_sample}) is not a sync sample",
+        )
+        for index, fragment in enumerate(table.fragments)
+        if fragment.sample_count and not table.sync[fragment.first_sample]
+    ]
+
+
+def _unmatched(times, reference, tolerance):
+    """Indices of the sorted times that are more than `tolerance` away from all references"""
+    unmatched = []
+    for index, time in enumerate(times):
+        position = bisect.bisect_left(reference, time - tolerance)
+        if position == len(reference) or reference[position] > time + tolerance:
+            unmatched.append(index)
+    return unmatched
+
+
+def _common_scales(expected, table):
+    """
+    The least common multiple of the timescales of the tracks, so that their times can be
+    compared exactly, and the factors that convert the times of each track to it
+    """
+    common = expected.timescale * table.timescale
+    common //= math.gcd(expected.timescale, table.timescale)
+    return common, common // expected.timescale, common // table.timescale
+
+
+def _segment_starts(rendition, table, scale):
+    """
+    Decode times of the first samples of the segments of a track, multiplied by `scale`.
+    Segments without samples, such as a trailing fragment with an empty trun, are left out.
+    """
+    boundaries = rendition.boundaries[table.track_id]
+    ends = boundaries[1:] + [len(table)]
+    return [
+        table.dts[first] * scale
+        for first, end in zip(boundaries, ends)
+        if first < min(end, len(table))
+    ]
+
+
+def _segment_alignment(reference, rendition, expected, table, tolerance):
+    """Segments of `table` that start at a different time than those of `expected`"""
+    common, expected_scale, scale = _common_scales(expected, table)
+    starts = _segment_starts(rendition, table, scale)
+    expected_starts = _segment_starts(reference, expected, expected_scale)
+    issues = []
+    if len(starts) != len(expected_starts):
+        issues.append(
+            Issue(
+                "segment-count",
+                rendition.name,
+                table.track_id,
+                None,
+                0.0,
+                f"{len(starts)} segments, {len(expected_starts)} in {reference.name}",
+            )
+        )
+    tolerance = _ticks(tolerance, common)
+    for index, (start, expected_start) in enumerate(zip(starts, expected_starts)):
+        if abs(start - expected_start) > tolerance:
+            issues.append(
+                Issue(
+                    "misaligned-segment",
+                    rendition.name,
+                    table.track_id,
+                    index,
+                    _seconds(start, common),
+                    f"starts {_seconds(start - expected_start, common) * 1000:+.3f} ms "
+                    f"from segment {index} of {reference.name}",
+                )
+            )
+    return issues
+
+
+def _keyframe_alignment(reference, rendition, expected, table, tolerance):
+    """Keyframes of `table` that `expected` does not have, and the other way around"""
+    common, expected_scale, scale = _common_scales(expected, table)
+    keyframes = [dts * scale for dts in compress(table.dts, table.sync)]
+    expected_keyframes = [
+        dts * expected_scale for dts in compress(expected.dts, expected.sync)
+    ]
+    tolerance = _ticks(tolerance, common)
+    return [
+        Issue(
+            "misaligned-keyframe",
+            rendition.name,
+            table.track_id,
+            None,
+            _seconds(keyframes[index], common),
+            f"no keyframe at this time in {reference.name}",
+        )
+        for index in _unmatched(keyframes, expected_keyframes, tolerance)
+    ] + [
+        Issue(
+            "missing-keyframe",
+            rendition.name,
+            table.track_id,
+            None,
+            _seconds(expected_keyframes[index], common),
+            f"{reference.name} has a keyframe at this time",
+        )
+        for index in _unmatched(expected_keyframes, keyframes, tolerance)
+    ]
+
+
+def check_alignment(reference, rendition, tolerance=1.0):
+    """
+    Compare the segment start times, and the keyframe times of video tracks, of the first
+    track of each handler with the same track of the reference rendition
+    """
+    issues = []
+    tables = rendition.first_tables()
+    for handler, expected in reference.first_tables().items():
+        table = tables.get(handler)
+        if table is None or not expected.timescale or not table.timescale:
+            continue
+        issues.extend(
+            _segment_alignment(reference, rendition, expected, table, tolerance)
+        )
+        if handler == "vide":
+            issues.extend(
+                _keyframe_alignment(reference, rendition, expected, table, tolerance)
+            )
+    return issues
+
+
+def check_renditions(renditions, tolerance=1.0, max_drift=10.0):
+    """
+    Check the continuity and fragment starts of each track of each rendition, and the
+    alignment of the other renditions with the first one. Returns a list of Issues.
+    """
+    issues = []
+    for rendition in renditions:
+        for _, table in sorted(rendition.tables.items()):
+            issues.extend(check_continuity(rendition, table, tolerance, max_drift))
+            issues.extend(check_sync_starts(rendition, table))
+    for rendition in renditions[1:]:
+        issues.extend(check_alignment(renditions[0], rendition, tolerance))
+    return issues
+
+
+def main(argv):
+    """the `check` command"""
+    parser = argparse.ArgumentParser(
+        prog="mp4viewer check",
+        description="Check that the fragments of each track follow each other without "
+        "gaps, overlaps or drift and start with sync samples, and that the segments and "
+        "keyframes of the renditions of a stream are aligned. The first rendition given "
+        "with -s, or the first file if there are none, is the reference for the alignment.",
+    )
+    parser.add_argument(
+        "-s",
+        "--segments",
+        nargs="+",
+        action="append",
+        default=[],
+        metavar="PATH",
+        help="An init segment followed by its media segments, or glob patterns of them; "
+        "can be repeated, once for each rendition. Put the fragmented files before the "
+        "first -s, or after --",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.0,
+        metavar="MS",
+        help="Differences of up to this many milliseconds are not gaps, overlaps or "
+        "misalignments; 1 by default",
+    )
+    parser.add_argument(
+        "--max-drift",
+        type=float,
+        default=10.0,
+        metavar="MS",
+        help="Report the fragment where the differences within the tolerance add up to "
+        "more than this many milliseconds; 10 by default",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=positive_int,
+        help="Processes that parse the media segments",
+    )
+    parser.add_argument(
+        "--debug", action="store_true", help="Used for internal debugging"
+    )
+    parser.add_argument("input_files", nargs="*", help="Fragmented files (mp4)")
+    args = parser.parse_args(argv)
+    if not args.segments and not args.input_files:
+        parser.error("no files or segments to check")
+
+    try:
+        renditions = [
+            load_stream(
+                paths[0], expand_segment_paths(paths[1:]), args.jobs, args.debug
+            )
+            for paths in args.segments
+        ]
+        renditions += [load_file(path, args.debug) for path in args.input_files]
+    except OSError as e:
+        error_print(str(e))
+        return 1
+    issues = check_renditions(renditions, args.tolerance, args.max_drift)
+    for issue in issues:
+        fragment = "" if issue.fragment is None else f" fragment {issue.fragment}"
+        print(
+            f"{issue.rendition} track {issue.track_id}{fragment} at {issue.time:.3f} s: "
+            f"{issue.kind}: {issue.detail}"
+        )
+    fragments = sum(
+        len(table.fragments)
+        for rendition in renditions
+        for table in rendition.tables.values()
+    )
+    print(f"{len(issues)} issues in {fragments} track fragments")
+    return 1 if issues else 0
@@ -1,6 +1,8 @@
 """ Defines data buffer related classes """
 
 import os
+import mmap
+import threading
 from typing import BinaryIO
 
 
@@ -23,17 +25,151 @@ class FileSource:
         return self.size
 
 
+class PositionalFileSource:
+    """
+    Read isobmff data from a file with os.pread, which does not use or move the file position.
+    A source can be shared by any number of PositionalDataBuffers, in any number of threads.
+    """
+
+    def __init__(self, f: BinaryIO):
+        self.file = f
+        self.size = os.fstat(f.fileno()).st_size
+        # Without pread, the reads have to seek the shared file position under a lock
+        self.has_pread = hasattr(os, "pread")
+        self.lock = threading.Lock()
+
+    def read_at(self, offset, req_bytes):
+        """read up to req_bytes from offset"""
+        if self.has_pread:
+            return os.pread(self.file.fileno(), req_bytes, offset)
+        with self.lock:
+            self.file.seek(offset, os.SEEK_SET)
+            return self.file.read(req_bytes)
+
+    def __len__(self):
+        return self.size
+
+
+class MmapSource:
+    """Read isobmff data from a memory mapped file; only the pages that are read are loaded"""
+
+    def __init__(self, f: BinaryIO):
+        self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def read(self, req_bytes):
+        """read up to req_bytes"""
+        return self.map.read(req_bytes)
+
+    def seek(self, count, pos):
+        """wrapper around mmap.seek"""
+        return self.map.seek(count, pos)
+
+    def close(self):
+        """unmap the file"""
+        self.map.close()
+
+    def __len__(self):
+        return len(self.map)
+
+
+class IOStats:
+    """
+    Counters of the I/O done through a CountingSource and the DataBuffer that reads from it.
+    If `trace` is a text file, a line is written to it for each read and seek of the source.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    FIELDS = (
+        "reads",
+        "bytes_read",
+        "seeks",
+        "seek_distance",
+        "refills",
+        "tail_join_bytes",
+        "resets",
+    )
+
+    def __init__(self, trace=None):
+        self.trace = trace
+        self.reads = 0
+        self.bytes_read = 0
+        self.seeks = 0
+        # sum of the distances between the positions before and after each seek
+        self.seek_distance = 0
+        # calls to DataBuffer.readmore, and the unread bytes it copied to the new buffer
+        self.refills = 0
+        self.tail_join_bytes = 0
+        # buffers discarded by DataBuffer.seekto
+        self.resets = 0
+
+    def snapshot(self):
+        """Return the counters as a dict"""
+        return {name: getattr(self, name) for name in IOStats.FIELDS}
+
+    def since(self, snapshot):
+        """Return the change in each counter since the snapshot"""
+        return {name: getattr(self, name) - snapshot[name] for name in IOStats.FIELDS}
+
+    def log(self, line):
+        """Write a line to the trace, if there is one"""
+        if self.trace is not None:
+            self.trace.write(line + "\n")
+
+
+class CountingSource:
+    """Wraps another source and counts its reads and seeks in an IOStats"""
+
+    def __init__(self, source, stats: IOStats):
+        self.source = source
+        self.stats = stats
+        # The sources are used from the start of the file
+        self.position = 0
+
+    def read(self, req_bytes):
+        """read up to req_bytes"""
+        data = self.source.read(req_bytes)
+        self.stats.reads += 1
+        self.stats.bytes_read += len(data)
+        self.stats.log(f"read {self.position} {req_bytes} {len(data)}")
+        self.position += len(data)
+        return data
+
+    def seek(self, count, pos):
+        """seek the source and record the distance moved"""
+        result = self.source.seek(count, pos)
+        if pos == os.SEEK_SET:
+            position = count
+        elif pos == os.SEEK_CUR:
+            position = self.position + count
+        else:
+            position = len(self.source) + count
+        self.stats.seeks += 1
+        self.stats.seek_distance += abs(position - self.position)
+        self.stats.log(f"seek {self.position} {position}")
+        self.position = position
+        return result
+
+    def __len__(self):
+        return len(self.source)
+
+
 class DataBuffer:
     """
     Class represending a data buffer.
     Provides helper functions to read uint32, UTF8 strings etc from the buffer.
     """
 
+    # pylint: disable=too-many-public-methods
+
     CHUNK_SIZE = 16384
 
     def __init__(self, source):
         self.source = source
 
+        # IOStats of a CountingSource, updated with the refills and resets of the buffer
+        self.stats = getattr(source, "stats", None)
+
         # Chunk of bytes loaded from the source stream for convenience.
         # This is a sub-sequence of the byte stream managed by self.source.
         self.data = b""
@@ -55,9 +191,16 @@ class DataBuffer:
 
     def reset(self):
         """reset everything"""
-        self.source.seek(0, os.SEEK_SET)
+        self._seek(0, os.SEEK_SET)
         self._reset()
 
+    def _read(self, req_bytes):
+        """read from the source; subclasses can read without the source position"""
+        return self.source.read(req_bytes)
+
+    def _seek(self, count, pos):
+        self.source.seek(count, pos)
+
     def _reset(self):
         """reset internal offsets, doesn't touch the source"""
         self.bit_position = 0
@@ -90,8 +233,12 @@ class DataBuffer:
         If minimum is set, this will try to read at least that many bytes
         """
         req_bytes = max(minimum, DataBuffer.CHUNK_SIZE)
-        data = self.source.read(req_bytes)
+        data = self._read(req_bytes)
         remaining_bytes = self.buf_size - self.read_ptr
+        if self.stats is not None:
+            self.stats.refills += 1
+            if len(data):
+                self.stats.tail_join_bytes += remaining_bytes
         if len(data):
             # print(f"Read {len(data)}")
             self.data = b"".join([self.data[self.read_ptr :], data])
@@ -146,6 +293,13 @@ class DataBuffer:
             self.data[self.read_ptr + offset : self.read_ptr + offset + length], "utf-8"
         )
 
+    def peekbytes(self, length, offset=0):
+        """read `length` bytes at `offset` from the current position without consuming them"""
+        self.checkbuffer(length + offset)
+        if self.bit_position:
+            raise AssertionError(f"Not aligned: {self.bit_position}")
+        return self.data[self.read_ptr + offset : self.read_ptr + offset + length]
+
     def readstr(self, length):
         """read a string of `length` bytes and update the buffer pointer"""
         s = self.peekstr(length)
@@ -269,17 +423,47 @@ class DataBuffer:
                 f"bytes would cause overflow {overflow} available={available_to_skip}"
             )
 
-        self.source.seek(count - unread_loaded_bytes, os.SEEK_CUR)
+        self._seek(count - unread_loaded_bytes, os.SEEK_CUR)
         new_stream_offset = self.stream_offset + self.read_ptr + count
         self._reset()
         self.stream_offset = new_stream_offset
 
     def seekto(self, pos):
         """Move the read pointer to to `pos`, relative to the start of stream"""
-        self.source.seek(pos, os.SEEK_SET)
+        self._seek(pos, os.SEEK_SET)
+        if self.stats is not None:
+            self.stats.resets += 1
+            self.stats.log(f"reset {pos}")
         self._reset()
         self.stream_offset = pos
         self.readmore()
 
     def __len__(self):
         return len(self.source)
+
+
+class PositionalDataBuffer(DataBuffer):
+    """
+    DataBuffer over a PositionalFileSource that keeps its own offset in the file instead of
+    using the file position, so that several buffers can read the same descriptor
+    concurrently without locking or reopening the file.
+    """
+
+    def __init__(self, source: PositionalFileSource, offset=0):
+        # Offset in the file of the next read from the source
+        self.file_position = offset
+        super().__init__(source)
+        self.stream_offset = offset
+
+    def _read(self, req_bytes):
+        data = self.source.read_at(self.file_position, req_bytes)
+        self.file_position += len(data)
+        return data
+
+    def _seek(self, count, pos):
+        if pos == os.SEEK_SET:
+            self.file_position = count
+        elif pos == os.SEEK_CUR:
+            self.file_position += count
+        else:
+            self.file_position = len(self.source) + count
@@ -0,0 +1,189 @@
+""" Structural diff of two mp4 files """
+
+import sys
+import hashlib
+import argparse
+from collections import Counter
+from itertools import zip_longest
+
+from mp4viewer.tree import plain_value
+from mp4viewer.isobmff.parser import parse_file
+from mp4viewer.isobmff.samples import SampleTable, get_sample_tables
+
+
+def get_fields_and_children(box):
+    """Return the list of (name, raw value) fields of the box, and the list of its children"""
+    fields, children = box.split_fields()
+    return [(field[0], plain_value(field[1])) for field in fields], children
+
+
+def first_difference(a, b):
+    """
+    Return the index of the first item that differs between the two sequences, or None if they
+    are equal. Uses a binary search over slice comparisons, which run in C for lists and arrays.
+    """
+    if a == b:
+        return None
+    low, high = 0, min(len(a), len(b))
+    if a[:high] == b[:high]:
+        return high
+    # The prefix of length `low` is equal and the prefix of length `high` is not
+    while high - low > 1:
+        mid = (low + high) // 2
+        if a[:mid] == b[:mid]:
+            low = mid
+        else:
+            high = mid
+    return low
+
+
+class BoxHasher:
+    # pylint: disable=too-few-public-methods
+    """
+    Computes a merkle hash of each box: the digest of its fourcc, its fields and the digests
+    of its children. Boxes with equal digests have identical subtrees.
+    """
+
+    def __init__(self):
+        self.digests = {}
+
+    def digest(self, box):
+        """Get the digest of the box, computing it (and those of its children) if required"""
+        key = id(box)
+        if key not in self.digests:
+            fields, children = get_fields_and_children(box)
+            h = hashlib.blake2b(digest_size=16)
+            h.update(box.boxtype.encode("utf-8", "replace"))
+            h.update(repr(fields).encode())
+            for child in children:
+                h.update(self.digest(child))
+            self.digests[key] = h.digest()
+        return self.digests[key]
+
+
+def _child_paths(parent_path, boxes):
+    """Name each box by its path; repeated fourccs get a 1 based index among their siblings"""
+    counts = Counter(box.boxtype for box in boxes)
+    seen = Counter()
+    named = {}
+    for box in boxes:
+        seen[box.boxtype] += 1
+        name = box.boxtype
+        if counts[box.boxtype] > 1:
+            name = f"{name}[{seen[box.boxtype]}]"
+        named[name] = box
+    prefix = f"{parent_path}/" if parent_path else ""
+    return {f"{prefix}{name}": box for name, box in named.items()}
+
+
+def _format_value_difference(value_a, value_b):
+    if isinstance(value_a, list) and isinstance(value_b, list):
+        index = first_difference(value_a, value_b)
+        if index < min(len(value_a), len(value_b)):
+            return (
+                f"first difference at index {index}: {value_a[index]} != {value_b[index]}"
+                f" ({len(value_a)} vs {len(value_b)} items)"
+            )
+        return f"{len(value_a)} vs {len(value_b)} items"
+    return f"{value_a} != {value_b}"
+
+
+class BoxTreeDiff:
+    """Compares the box trees of two files, only descending in to subtrees that differ"""
+
+    def __init__(self, output=None):
+        self.hasher = BoxHasher()
+        self.output = sys.stdout if output is None else output
+        self.difference_count = 0
+
+    def report(self, line):
+        """Print a difference"""
+        self.difference_count += 1
+        self.output.write(f"{line}\n")
+
+    def compare_lists(self, boxes_a, boxes_b, parent_path=""):
+        """Compare two lists of sibling boxes"""
+        named_a = _child_paths(parent_path, boxes_a)
+        named_b = _child_paths(parent_path, boxes_b)
+        for path, box_a in named_a.items():
+            box_b = named_b.get(path)
+            if box_b is None:
+                self.report(f"- {path}: only in the first file")
+            elif self.hasher.digest(box_a) != self.hasher.digest(box_b):
+                self.compare_boxes(box_a, box_b, path)
+        for path in named_b:
+            if path not in named_a:
+                self.report(f"+ {path}: only in the second file")
+
+    def compare_boxes(self, box_a, box_b, path):
+        """Compare the fields of two boxes and then their children"""
+        fields_a, children_a = get_fields_and_children(box_a)
+        fields_b, children_b = get_fields_and_children(box_b)
+        for field_a, field_b in zip_longest(fields_a, fields_b):
+            if field_a == field_b:
+                continue
+            if field_a is None or field_b is None or field_a[0] != field_b[0]:
+                self.report(f"! {path}: fields differ: {field_a} != {field_b}")
+                break
+            self.report(
+                f"! {path}: {field_a[0]}: "
+                f"{_format_value_difference(field_a[1], field_b[1])}"
+            )
+        self.compare_lists(children_a, children_b, path)
+
+    def compare_sample_tables(self, tables_a, tables_b):
+        """Compare the sample tables column by column, reporting the first divergence"""
+        for track_id in sorted(set(tables_a) | set(tables_b)):
+            if track_id not in tables_b:
+                self.report(f"- track {track_id}: only in the first file")
+                continue
+            if track_id not in tables_a:
+                self.report(f"+ track {track_id}: only in the second file")
+                continue
+            table_a = tables_a[track_id]
+            table_b = tables_b[track_id]
+            if len(table_a) != len(table_b):
+                self.report(
+                    f"! track {track_id}: {len(table_a)} vs {len(table_b)} samples"
+                )
+            for name in SampleTable.COLUMNS[1:]:
+                column_a = table_a.column(name)
+                column_b = table_b.column(name)
+                index = first_difference(column_a, column_b)
+                if index is not None and index < min(len(column_a), len(column_b)):
+                    self.report(
+                        f"! track {track_id}: {name} differs from sample {index}: "
+                        f"{column_a[index]} != {column_b[index]}"
+                    )
+
+
+def main(argv):
+    """the `diff` command"""
+    parser = argparse.ArgumentParser(
+        prog="mp4viewer diff",
+        description="Compare the boxes and sample tables of two mp4 files. Subtrees with "
+        "identical hashes are skipped; only the branches that differ are compared. "
+        "The exit status is 1 if the files differ.",
+    )
+    parser.add_argument(
+        "--no-samples",
+        action="store_false",
+        dest="samples",
+        help="Do not compare the sample tables",
+    )
+    parser.add_argument(
+        "--debug", action="store_true", help="Used for internal debugging"
+    )
+    parser.add_argument("file_a", help="First file")
+    parser.add_argument("file_b", help="Second file")
+    args = parser.parse_args(argv)
+
+    boxes_a = parse_file(args.file_a, args.debug)
+    boxes_b = parse_file(args.file_b, args.debug)
+    diff = BoxTreeDiff()
+    diff.compare_lists(boxes_a, boxes_b)
+    if args.samples:
+        diff.compare_sample_tables(
+            get_sample_tables(boxes_a), get_sample_tables(boxes_b)
+        )
+    return 1 if diff.difference_count else 0
@@ -0,0 +1,203 @@
+""" Patch the metadata of a file in place, without rewriting the media data """
+
+import os
+import struct
+
+from mp4viewer.datasource import DataBuffer, FileSource
+from mp4viewer.isobmff.parser import IsobmffParser
+from mp4viewer.isobmff.utils import encode_iso639_2_15bit
+
+# tkhd flags
+TRACK_ENABLED = 0x000001
+TRACK_IN_MOVIE = 0x000002
+TRACK_IN_PREVIEW = 0x000004
+
+# Boxes whose contents can be overwritten to make room for a neighbour
+PADDING_BOXES = ("free", "skip")
+
+
+def header_size(box):
+    """Size of the box header, excluding the version and flags of full boxes"""
+    return 8 + (8 if box.islarge else 0) + (16 if box.boxtype == "uuid" else 0)
+
+
+def _set_header_size(data, size):
+    """Update the size of a box header in data, keeping the 32 or 64 bit size field"""
+    if struct.unpack_from(">I", data)[0] == 1:
+        struct.pack_into(">Q", data, 8, size)
+    else:
+        struct.pack_into(">I", data, 0, size)
+
+
+class BoxEditor:
+    """
+    Parses a file and patches the fields of its boxes in place.
+    Each change is written with pwrite at the offset recorded in `buffer_offset` of the box,
+    so the cost depends on the size of the change rather than the size of the file.
+    The parsed boxes are updated along with the file, except after replace_box().
+    """
+
+    def __init__(self, path, debug=False):
+        self.path = path
+        self.debug = debug
+        # Unbuffered, so that the writes are not mixed with buffered reads of the parser
+        self.fd = open(path, "r+b", buffering=0)  # pylint: disable=consider-using-with
+        self.boxes = self._parse()
+
+    def _parse(self):
+        self.fd.seek(0)
+        return IsobmffParser(DataBuffer(FileSource(self.fd)), self.debug).getboxlist()
+
+    def close(self):
+        """close the file"""
+        self.fd.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def find(self, boxtype):
+        """Return the list of all boxes of this type, in file order"""
+        found = []
+
+        def visit(boxes):
+            for box in boxes:
+                if box.boxtype == boxtype:
+                    found.append(box)
+                visit(box.children)
+
+        visit(self.boxes)
+        return found
+
+    def _pwrite(self, offset, data):
+        if hasattr(os, "pwrite"):
+            written = os.pwrite(self.fd.fileno(), data, offset)
+        else:
+            self.fd.seek(offset)
+            written = self.fd.write(data)
+        if written != len(data):
+            raise OSError(f"Short write at {offset}: {written} of {len(data)} bytes")
+
+    def patch(self, box, offset, data):
+        """Overwrite the bytes at `offset` from the start of the box"""
+        if offset < 0 or offset + len(data) > box.size:
+            raise ValueError(f"{box}: cannot write {len(data)} bytes at {offset}")
+        self._pwrite(box.buffer_offset + offset, data)
+
+    def _payload_offset(self, box):
+        """Offset of the fields after the version and flags of a full box"""
+        return header_size(box) + 4
+
+    def set_flags(self, box, flags):
+        """Set the 24 bit flags of a full box"""
+        self.patch(box, header_size(box) + 1, struct.pack(">I", flags)[1:])
+        box.flags = flags
+
+    def set_track_flags(self, tkhd, enabled=None, in_movie=None, in_preview=None):
+        """Set or clear the tkhd flags; flags that are None are left unchanged"""
+        flags = tkhd.flags
+        for value, mask in (
+            (enabled, TRACK_ENABLED),
+            (in_movie, TRACK_IN_MOVIE),
+            (in_preview, TRACK_IN_PREVIEW),
+        ):
+            if value is not None:
+                flags = flags | mask if value else flags & ~mask
+        self.set_flags(tkhd, flags)
+
+    def set_language(self, mdhd, code):
+        """Set the iso-639-2 language code (e.g. "eng") of a media header"""
+        language = encode_iso639_2_15bit(code)
+        # creation and modification times, timescale and duration come before the language
+        offset = self._payload_offset(mdhd) + (28 if mdhd.version == 1 else 16)
+        self.patch(mdhd, offset, struct.pack(">H", language))
+        mdhd.language = language
+
+    def set_timescale(self, header, timescale, duration=None):
+        """
+        Set the timescale of a mvhd or mdhd, and the duration if given.
+        The durations in the other boxes are in the movie timescale and are not rescaled.
+        """
+        offset = self._payload_offset(header) + (16 if header.version == 1 else 8)
+        self.patch(header, offset, struct.pack(">I", timescale))
+        header.timescale = timescale
+        if duration is not None:
+            fmt = ">Q" if header.version == 1 else ">I"
+            self.patch(header, offset + 4, struct.pack(fmt, duration))
+            header.duration = duration
+
+    def set_edit(self, elst, index, **values):
+        """
+        Update the entry `index` of an edit list. The keyword arguments are the keys of the
+        entries: segment_duration, media_time, media_rate_integer and media_rate_fraction.
+        """
+        entry = elst.entries[index]
+        unknown = set(values) - set(entry)
+        if unknown:
+            raise ValueError(f"Unknown edit list fields {sorted(unknown)}")
+        entry.update(values)
+        if elst.version == 1:
+            fmt, entry_size, mask = ">QQHH", 20, 0xFFFFFFFFFFFFFFFF
+        else:
+            fmt, entry_size, mask = ">IIHH", 12, 0xFFFFFFFF
+        # media_time is signed; -1 marks an empty edit
+        data = struct.pack(
+            fmt,
+            entry["segment_duration"],
+            entry["media_time"] & mask,
+            entry["media_rate_integer"] & 0xFFFF,
+            entry["media_rate_fraction"],
+        )
+        offset = self._payload_offset(elst) + 4 + index * entry_size
+        self.patch(elst, offset, data)
+
+    def _siblings(self, box):
+        return self.boxes if box.parent is None else box.parent.children
+
+    def replace_box(self, box, data):
+        """
+        Replace the box with `data`, the complete bytes of the new box, which can be larger or
+        smaller than the box. The difference is taken from (or given to) a free or skip box
+        right after or right before it, so that no other box moves and the sizes of the
+        ancestors do not change. The file is parsed again afterwards; boxes obtained earlier
+        are stale.
+        """
+        siblings = self._siblings(box)
+        index = next(i for i, sibling in enumerate(siblings) if sibling is box)
+        delta = len(data) - box.size
+        box_end = box.buffer_offset + box.size
+        if delta == 0:
+            self._pwrite(box.buffer_offset, data)
+        elif index + 1 < len(siblings) and self._can_absorb(siblings[index + 1], delta):
+            padding = siblings[index + 1]
+            assert padding.buffer_offset == box_end
+            self._pwrite(box.buffer_offset, data + self._padding_header(padding, delta))
+        elif index > 0 and self._can_absorb(siblings[index - 1], delta):
+            padding = siblings[index - 1]
+            assert padding.buffer_offset + padding.size == box.buffer_offset
+            self._pwrite(
+                padding.buffer_offset, self._padding_header(padding, delta) + data
+            )
+        else:
+            raise ValueError(
+                f"{box} needs {delta} more bytes, but it has no adjacent free box that can "
+                "absorb the difference"
+            )
+        self.boxes = self._parse()
+
+    @staticmethod
+    def _can_absorb(padding, delta):
+        """The padding box has to remain a valid box after shrinking by delta bytes"""
+        return (
+            padding.boxtype in PADDING_BOXES
+            and padding.size != 0
+            and padding.size - delta >= header_size(padding)
+        )
+
+    def _padding_header(self, padding, delta):
+        self.fd.seek(padding.buffer_offset)
+        header = bytearray(self.fd.read(header_size(padding)))
+        _set_header_size(header, padding.size - delta)
+        return bytes(header)
@@ -0,0 +1,269 @@
+""" Move the moov box in front of the media data so that playback can start while downloading """
+
+import os
+import sys
+import errno
+import struct
+import argparse
+from array import array
+from bisect import bisect_right
+
+from mp4viewer.datasource import DataBuffer, FileSource
+from mp4viewer.isobmff.parser import IsobmffParser
+from mp4viewer.isobmff.utils import error_print
+
+# Chunk offsets above this need a co64 box
+MAX_STCO_OFFSET = 0xFFFFFFFF
+
+# Bytes copied by each system call
+COPY_CHUNK_SIZE = 1 << 30
+
+# Errors that mean the kernel cannot copy between these files; the next method is tried
+_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+    errno.EBADF,
+}
+
+
+def _copy_file_range(src, dst, offset, count):
+    return os.copy_file_range(src.fileno(), dst.fileno(), count, offset)
+
+
+def _sendfile(src, dst, offset, count):
+    return os.sendfile(dst.fileno(), src.fileno(), offset, count)
+
+
+def _read_write(src, dst, offset, count):
+    src.seek(offset)
+    data = src.read(min(count, 1 << 20))
+    dst.write(data)
+    return len(data)
+
+
+def copy_range(src, dst, offset, count):
+    """
+    Copy `count` bytes from `offset` of src to the current position of dst, which should be
+    opened without buffering. The copy is done in the kernel with copy_file_range or sendfile
+    where they are available, falling back to reads and writes.
+    """
+    methods = [
+        method
+        for name, method in (
+            ("copy_file_range", _copy_file_range),
+            ("sendfile", _sendfile),
+        )
+        if hasattr(os, name)
+    ] + [_read_write]
+    while count > 0:
+        try:
+            copied = methods[0](src, dst, offset, min(count, COPY_CHUNK_SIZE))
+        except OSError as e:
+            if len(methods) == 1 or e.errno not in _UNSUPPORTED_ERRNOS:
+                raise
+            methods.pop(0)
+            continue
+        if copied == 0:
+            raise BufferError(f"Unexpected end of file at {offset}")
+        offset += copied
+        count -= copied
+
+
+def _chunk_offset_boxes(box):
+    """The stco and co64 boxes under the box"""
+    for child in box.children:
+        if child.boxtype in ("stco", "co64"):
+            yield child
+        else:
+            yield from _chunk_offset_boxes(child)
+
+
+class _Relocation:
+    """Maps the offsets of the old file to those of the new one"""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, moves):
+        # (old start, old end, new start) of each box that is copied, sorted by old start
+        self.moves = sorted(moves)
+        self.starts = [move[0] for move in self.moves]
+
+    def __call__(self, offset):
+        index = bisect_right(self.starts, offset) - 1
+        if index >= 0:
+            old_start, old_end, new_start = self.moves[index]
+            if offset < old_end:
+                return offset - old_start + new_start
+        error_print(
+            f"Chunk offset {offset} is not in a top level box; it is not changed"
+        )
+        return offset
+
+
+def _set_size(data, size):
+    """Update the size field of the box header at the start of data"""
+    if struct.unpack_from(">I", data)[0] == 1:
+        struct.pack_into(">Q", data, 8, size)
+    elif size > 0xFFFFFFFF:
+        raise ValueError(f"{data[4:8]} box is too large for a 32 bit size")
+    else:
+        struct.pack_into(">I", data, 0, size)
+
+
+def _chunk_offset_bytes(raw, box, base, offsets, large):
+    """A stco (or co64 if large) box with the same version and flags as box"""
+    start = box.buffer_offset - base
+    values = array("Q" if large else "I", offsets)
+    if sys.byteorder == "little":
+        values.byteswap()
+    payload = raw[start + 8 : start + 12] + struct.pack(">I", len(offsets))
+    payload += values.tobytes()
+    boxtype = b"co64" if large else b"stco"
+    return struct.pack(">I4s", 8 + len(payload), boxtype) + payload
+
+
+def _rebuild(raw, base, box, replacements):
+    """
+    Bytes of the box with the boxes in `replacements` (id to bytes) replaced. `raw` holds the
+    bytes of the top level box that starts at file offset `base`.
+    """
+    if id(box) in replacements:
+        return replacements[id(box)]
+    start = box.buffer_offset - base
+    end = start + (box.size or len(raw) - start)
+    if not box.children:
+        return raw[start:end]
+    parts = []
+    position = start
+    for child in sorted(box.children, key=lambda c: c.buffer_offset):
+        child_start = child.buffer_offset - base
+        parts.append(raw[position:child_start])
+        parts.append(_rebuild(raw, base, child, replacements))
+        position = child_start + child.size
+    parts.append(raw[position:end])
+    data = bytearray(b"".join(parts))
+    _set_size(data, len(data))
+    return bytes(data)
+
+
+class Faststart:
+    """Works out the new layout of a file with the moov in front of the first mdat"""
+
+    def __init__(self, src, debug=False):
+        self.src = src
+        parser = IsobmffParser(DataBuffer(FileSource(src)), debug)
+        self.headers = list(parser.iterboxheaders())
+        fourccs = [header.boxtype for header in self.headers]
+        if "moov" not in fourccs:
+            raise ValueError("There is no moov box")
+        if "moof" in fourccs:
+            raise ValueError("Fragmented files are not supported")
+        self.moov_header = self.headers[fourccs.index("moov")]
+        self.moov = parser.parse_box_at(self.moov_header.buffer_offset)
+        # The other boxes keep their order; the moov goes in front of the first mdat
+        self.order = [h for h in self.headers if h is not self.moov_header]
+        mdats = [i for i, h in enumerate(self.order) if h.boxtype == "mdat"]
+        position = fourccs.index("moov")
+        if mdats and mdats[0] < position:
+            position = mdats[0]
+        self.order.insert(position, self.moov_header)
+        self.is_faststart = self.order == self.headers
+
+    def _relocation(self, moov_size):
+        moves = []
+        position = 0
+        for header in self.order:
+            if header is self.moov_header:
+                position += moov_size
+                continue
+            moves.append(
+                (header.buffer_offset, header.buffer_offset + header.size, position)
+            )
+            position += header.size
+        return _Relocation(moves)
+
+    def new_moov(self):
+        """
+        Return the bytes of the moov with the chunk offsets moved by the change in layout.
+        Tables with offsets beyond 32 bits are upgraded to co64, which makes the moov larger
+        and moves the media further; this is repeated until no more tables need upgrading.
+        """
+        boxes = list(_chunk_offset_boxes(self.moov))
+        large = {id(box): box.boxtype == "co64" for box in boxes}
+        while True:
+            growth = sum(
+                4 * len(box.entries)
+                for box in boxes
+                if large[id(box)] and box.boxtype == "stco"
+            )
+            relocate = self._relocation(self.moov_header.size + growth)
+            offsets = {id(box): [relocate(o) for o in box.entries] for box in boxes}
+            upgrades = [
+                box
+                for box in boxes
+                if not large[id(box)]
+                and max(offsets[id(box)], default=0) > MAX_STCO_OFFSET
+            ]
+            if not upgrades:
+                break
+            for box in upgrades:
+                large[id(box)] = True
+
+        self.src.seek(self.moov_header.buffer_offset)
+        raw = self.src.read(self.moov_header.size)
+        base = self.moov_header.buffer_offset
+        replacements = {
+            id(box): _chunk_offset_bytes(
+                raw, box, base, offsets[id(box)], large[id(box)]
+            )
+            for box in boxes
+        }
+        return _rebuild(raw, base, self.moov, replacements)
+
+    def write(self, dst):
+        """Write the new file to dst, which should be opened without buffering"""
+        moov = self.new_moov()
+        for header in self.order:
+            if header is self.moov_header:
+                dst.write(moov)
+            else:
+                copy_range(self.src, dst, header.buffer_offset, header.size)
+
+
+def faststart(input_path, output_path, debug=False):
+    """Write a copy of the input file with the moov in front of the media data"""
+    with open(input_path, "rb") as src:
+        layout = Faststart(src, debug)
+        if layout.is_faststart:
+            error_print(f"{input_path}: the moov is already in front of the media data")
+        with open(output_path, "wb", buffering=0) as dst:
+            layout.write(dst)
+        return layout
+
+
+def main(argv):
+    """the `faststart` command"""
+    parser = argparse.ArgumentParser(
+        prog="mp4viewer faststart",
+        description="Write a copy of the file with the moov box in front of the mdat, so "
+        "that players can start playback before the whole file is downloaded. The chunk "
+        "offsets in stco boxes are updated, and are upgraded to co64 boxes where required.",
+    )
+    parser.add_argument(
+        "--debug", action="store_true", help="Used for internal debugging"
+    )
+    parser.add_argument("input_file", help="ISO bmff file (mp4)")
+    parser.add_argument("output_file", help="Location of the new file")
+    args = parser.parse_args(argv)
+    if os.path.abspath(args.input_file) == os.path.abspath(args.output_file):
+        error_print("The output file should be different from the input file")
+        return 1
+    try:
+        faststart(args.input_file, args.output_file, args.debug)
+    except ValueError as e:
+        error_print(f"{args.input_file}: {e}")
+        return 1
+    return 0
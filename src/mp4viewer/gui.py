@@ -1,15 +1,35 @@
 """ GTK based renderer """
 
 # pylint: disable=import-error,wrong-import-position
+import os
+import threading
 import xml.etree.ElementTree as ET
 import gi
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk  # noqa: E402
+from gi.repository import GLib, Gtk  # noqa: E402
+
+from mp4viewer.datasource import DataBuffer, FileSource  # noqa: E402
+from mp4viewer.tree import ArrayField, ArrayPage  # noqa: E402
+from mp4viewer.isobmff.parser import IsobmffParser  # noqa: E402
+
+
+# Marks the dummy child of a row whose children are yet to be added
+_PLACEHOLDER = object()
 
 
 class GtkRenderer:
-    """GTK based renderer"""
+    """
+    GTK based renderer.
+    Rows are added to the tree store only when their parent row is expanded for the first time,
+    so that large files can be opened without adding every box and attribute up front.
+    """
+
+    # Maximum number of items (or sub-pages) shown under a row of a long array
+    PAGE_SIZE = 100
+
+    # How often the progress bar is updated while the file is parsed in the background
+    PROGRESS_INTERVAL_MS = 100
 
     def __init__(self):
         w = Gtk.Window(title="MP4 Viewer")
@@ -19,6 +39,10 @@ class GtkRenderer:
         self.window = w
         self.treestore = None
         self.treeview = None
+        self.progressbar = None
+        # DataBuffer used by the worker thread; the main thread only reads its position
+        self.buf = None
+        self.parse_done = False
 
     def on_delete(self, widget, event, data=None):
         # pylint: disable=unused-argument,missing-function-docstring
@@ -54,40 +78,148 @@ class GtkRenderer:
         return ET.tostring(root).decode()
 
     def populate(self, datanode, parent=None):
-        """Add entries for each attribute of the current node and its children (recursive)"""
+        """
+        Add a row for the node; its attributes and children are added when the row is expanded.
+        """
         treenode = self.treestore.append(
             parent,
             [
                 self.format_node(
                     datanode.name, datanode.desc, istitle=datanode.is_atom()
-                )
+                ),
+                datanode,
             ],
         )
+        if len(datanode.attrs) or len(datanode.children):
+            self._add_placeholder(treenode)
+
+    def _add_placeholder(self, treenode):
+        """Dummy child row that makes the row expandable until its real children are added"""
+        self.treestore.append(treenode, ["", _PLACEHOLDER])
+
+    def _populate_attrs(self, datanode, treenode):
         for attr in datanode.attrs:
-            self.treestore.append(
-                treenode, [self.format_node(attr.name, attr.value, attr.display_value)]
-            )
-        for child in datanode.children:
-            self.populate(child, treenode)
+            value = attr.value
+            if isinstance(value, ArrayField) and value.item_name is None:
+                if len(value) <= GtkRenderer.PAGE_SIZE:
+                    value = f"[{', '.join(value.format_items(0, len(value)))}]"
+            if isinstance(value, ArrayField) or (
+                isinstance(value, list) and len(value) > GtkRenderer.PAGE_SIZE
+            ):
+                # Long arrays, and arrays of named items, are shown as pages of items that
+                # are added on expansion
+                self._append_page(
+                    treenode, attr.name, ArrayPage(value), attr.display_value
+                )
+            else:
+                self.treestore.append(
+                    treenode,
+                    [self.format_node(attr.name, value, attr.display_value), None],
+                )
 
-    def render(self, data):
-        """render the tree"""
-        self.treestore = Gtk.TreeStore(str)
+    def _append_page(self, treenode, name, page, display_value=None):
+        row = self.treestore.append(
+            treenode,
+            [self.format_node(name, f"[{len(page)} items]", display_value), page],
+        )
+        self._add_placeholder(row)
+
+    def _populate_page(self, page, treenode):
+        """Add the items of the page, or sub-pages if there are too many of them"""
+        pages = page.pages(GtkRenderer.PAGE_SIZE)
+        for sub in pages:
+            self._append_page(treenode, f"[{sub.start} - {sub.end - 1}]", sub)
+        if not pages:
+            for label, item in page.items():
+                self.treestore.append(treenode, [self.format_node(label, item), None])
+
+    def on_test_expand_row(self, treeview, treeiter, path):
+        """Replace the placeholder with the actual contents of the row that is being expanded"""
+        # pylint: disable=unused-argument
+        child = self.treestore.iter_children(treeiter)
+        if child is None or self.treestore[child][1] is not _PLACEHOLDER:
+            return False
+        self.treestore.remove(child)
+        data = self.treestore[treeiter][1]
+        if isinstance(data, ArrayPage):
+            self._populate_page(data, treeiter)
+        else:
+            self._populate_attrs(data, treeiter)
+            for datanode in data.children:
+                self.populate(datanode, treeiter)
+        # Returning False lets the expansion go ahead
+        return False
+
+    def _create_view(self, title):
+        """Create the tree view and return the scrolled window holding it"""
+        # The second column holds the Tree or ArrayPage that the row represents
+        self.treestore = Gtk.TreeStore(str, object)
         self.treeview = Gtk.TreeView(model=self.treestore)
+        self.treeview.connect("test-expand-row", self.on_test_expand_row)
 
-        col = Gtk.TreeViewColumn(data.name)
+        col = Gtk.TreeViewColumn(title)
         cell = Gtk.CellRendererText()
         col.pack_start(cell, True)
         col.add_attribute(cell, "markup", 0)
         self.treeview.append_column(col)
 
-        for child in data.children:
-            self.populate(child)
-
         sw = Gtk.ScrolledWindow()
         sw.set_vexpand(True)
         sw.add(self.treeview)
+        return sw
+
+    def render(self, data):
+        """render the tree"""
+        sw = self._create_view(data.name)
+        for child in data.children:
+            self.populate(child)
         self.window.add(sw)
-        self.treeview.expand_all()
         self.window.show_all()
         Gtk.main()
+
+    def render_file(self, path, box_to_node, debug=False):
+        """
+        Show the window right away and parse the file in a worker thread.
+        Top level boxes are added to the view as they are parsed; `box_to_node` converts
+        a box to a Tree node.
+        """
+        vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
+        self.progressbar = Gtk.ProgressBar(show_text=True)
+        vbox.pack_start(self.progressbar, False, False, 0)
+        vbox.pack_start(self._create_view(os.path.basename(path)), True, True, 0)
+        self.window.add(vbox)
+
+        worker = threading.Thread(
+            target=self._parse, args=(path, box_to_node, debug), daemon=True
+        )
+        worker.start()
+        GLib.timeout_add(GtkRenderer.PROGRESS_INTERVAL_MS, self._update_progress)
+        self.window.show_all()
+        Gtk.main()
+
+    def _parse(self, path, box_to_node, debug):
+        """Runs in the worker thread; all changes to the view go through GLib.idle_add"""
+        try:
+            with open(path, "rb") as fd:
+                self.buf = DataBuffer(FileSource(fd))
+                parser = IsobmffParser(self.buf, debug)
+                for box in parser.iterboxes():
+                    GLib.idle_add(self.populate, box_to_node(box))
+        finally:
+            GLib.idle_add(self._on_parse_done)
+
+    def _update_progress(self):
+        """Called from a GLib timer; returns False to stop the timer once parsing is done"""
+        if self.parse_done:
+            return False
+        if self.buf is not None and len(self.buf) > 0:
+            position = self.buf.current_position()
+            self.progressbar.set_fraction(position / len(self.buf))
+            self.progressbar.set_text(f"Parsing: {position} of {len(self.buf)} bytes")
+        return True
+
+    def _on_parse_done(self):
+        self.parse_done = True
+        self.progressbar.set_fraction(1.0)
+        size = len(self.buf) if self.buf is not None else 0
+        self.progressbar.set_text(f"Parsed {size} bytes")
@@ -0,0 +1,48 @@
+""" A short summary of a file and its tracks, for --info """
+
+import sys
+
+from mp4viewer.isobmff.utils import stringify_duration
+
+
+def _track_line(track):
+    parts = [f"Track {track.track_id}: {track.handler or '?'} {track.codec or '?'}"]
+    if track.width and track.height:
+        parts.append(f"{track.width}x{track.height}")
+    if track.sample_rate:
+        channels = f", {track.channel_count} ch" if track.channel_count else ""
+        parts.append(f"{track.sample_rate} Hz{channels}")
+    parts.append(f"timescale {track.timescale}")
+    if track.duration:
+        parts.append(f"{track.duration:.3f} s")
+    # The samples of fragmented files are in the moof boxes, which are not parsed
+    if track.sample_count:
+        parts.append(f"{track.sample_count} samples")
+    if track.bitrate:
+        parts.append(f"{track.bitrate / 1000:.0f} kb/s")
+    if track.language:
+        parts.append(track.language)
+    return ", ".join(parts)
+
+
+def write_info(mp4, output=None):
+    """Write the summary of an Mp4File"""
+    output = sys.stdout if output is None else output
+    output.write(f"File: {mp4.path}\n")
+    if mp4.ftyp is not None:
+        output.write(
+            f"  brand: {mp4.ftyp.major_brand} (minor {mp4.ftyp.minor_version}), "
+            f"compatible: {','.join(mp4.ftyp.brands)}\n"
+        )
+    duration = mp4.duration
+    if duration:
+        output.write(f"  duration: {stringify_duration(duration)} ({duration:.3f} s)\n")
+    fragments = sum(header.boxtype == "moof" for header in mp4.headers)
+    layout = (
+        f"fragmented, {fragments} fragments" if mp4.is_fragmented else "progressive"
+    )
+    if not mp4.is_fragmented:
+        layout += ", faststart" if mp4.is_faststart else ", moov after mdat"
+    output.write(f"  layout: {layout}\n")
+    for track in mp4.tracks:
+        output.write(f"  {_track_line(track)}\n")
@@ -0,0 +1,72 @@
+""" Reads and seeks done while parsing each top level box, for --io-stats """
+
+import sys
+import json
+
+from mp4viewer.datasource import DataBuffer, FileSource, CountingSource, IOStats
+from mp4viewer.isobmff.parser import IsobmffParser
+
+
+class IORecorder:
+    """
+    Parses files through a CountingSource and records the change in the counters for each top
+    level box. The counters of the whole run are in `stats`.
+    """
+
+    def __init__(self, trace=None):
+        self.stats = IOStats(trace)
+        # (fourcc, offset, size, counters) of each top level box
+        self.boxes = []
+        self._snapshot = self.stats.snapshot()
+
+    def parser(self, fd, debug=False):
+        """An IsobmffParser that reads the file through a CountingSource"""
+        # The first refill of the buffer is counted against the first box
+        self._snapshot = self.stats.snapshot()
+        return IsobmffParser(
+            DataBuffer(CountingSource(FileSource(fd), self.stats)), debug
+        )
+
+    def iterboxes(self, parser):
+        """Wrap parser.iterboxes() to record the I/O done for each box"""
+        for box in parser.iterboxes():
+            self.boxes.append(
+                (
+                    box.boxtype,
+                    box.buffer_offset,
+                    box.size,
+                    self.stats.since(self._snapshot),
+                )
+            )
+            self._snapshot = self.stats.snapshot()
+            yield box
+
+    def parse_file(self, path, debug=False):
+        """Parse the file and return the list of its top level boxes"""
+        with open(path, "rb") as fd:
+            return list(self.iterboxes(self.parser(fd, debug)))
+
+    def to_dict(self):
+        """The report as a json serialisable dict"""
+        return {
+            "total": self.stats.snapshot(),
+            "boxes": [
+                {"fourcc": fourcc, "offset": offset, "size": size, **counters}
+                for fourcc, offset, size, counters in self.boxes
+            ],
+        }
+
+    def write_report(self, report_format="table", output=None):
+        """Write the counters of each top level box and of the whole run"""
+        output = sys.stderr if output is None else output
+        if report_format == "json":
+            json.dump(self.to_dict(), output, indent=2)
+            output.write("\n")
+            return
+        output.write(f"{'fourcc':<8}{'offset':>14}{'size':>14}")
+        output.write("".join(f"{name:>16}" for name in IOStats.FIELDS) + "\n")
+        rows = [(f, str(o), str(s), c) for f, o, s, c in self.boxes]
+        rows.append(("total", "", "", self.stats.snapshot()))
+        for fourcc, offset, size, counters in rows:
+            output.write(f"{fourcc:<8}{offset:>14}{size:>14}")
+            output.write("".join(f"{counters[n]:>16}" for n in IOStats.FIELDS) + "\n")
@@ -8,6 +8,34 @@ from collections import deque
 from .utils import error_print
 
 
+class BoxHeader:
+    """
+    The size and type of a box, read without parsing its contents.
+    The read pointer of `buf` is left at the end of the header.
+    """
+
+    # pylint: disable=too-few-public-methods
+    __slots__ = ("buffer_offset", "size", "boxtype", "header_size")
+
+    def __init__(self, buf):
+        self.buffer_offset = buf.current_position()
+        self.size = buf.readint32()
+        self.boxtype = buf.readstr(4)
+        self.header_size = 8
+        if self.size == 1:
+            self.size = buf.readint64()
+            self.header_size += 8
+        elif self.size == 0:
+            # The box extends to the end of the file
+            self.size = len(buf) - self.buffer_offset
+        if self.boxtype == "uuid":
+            buf.skipbytes(16)
+            self.header_size += 16
+
+    def __str__(self):
+        return f"<BoxHeader: {self.boxtype}, {self.size} bytes at {self.buffer_offset}>"
+
+
 class Box:
     """
     Base class for all boxes.
@@ -17,6 +45,8 @@ class Box:
 
     # Avoid printing parsing errors for known data boxes
     data_boxes = ["mdat", "udta"]
+    # Set by subclasses that leave their contents to be skipped on purpose
+    warn_unparsed_bytes = True
 
     def __init__(self, parser, parent=None, is_container=False):
         self.parent = parent
@@ -30,7 +60,7 @@ class Box:
         if self.has_children:
             self.parse_children(parser)
         if self.remaining_bytes() > 0:
-            if self.boxtype not in Box.data_boxes:
+            if self.warn_unparsed_bytes and self.boxtype not in Box.data_boxes:
                 error_print(
                     f"Skipping tailing bytes: Possible parse error (or unhandled box)"
                     f" in {self}: consumed {self.consumed_bytes}, skip {self.remaining_bytes()} "
@@ -116,6 +146,7 @@ class Box:
         self.children = []
         # usertype
         if boxtype == "uuid":
+            self.usertype = buf.peekbytes(16).hex()
             buf.skipbytes(16)
             self.consumed_bytes += 16
 
@@ -192,10 +223,30 @@ class Box:
         """
         yield ("size", self.size)
 
+    def split_fields(self):
+        """
+        Return the list of field tuples yielded by generate_fields(), and the list of all child
+        boxes, including any boxes yielded by generate_fields().
+        """
+        fields = []
+        boxes = []
+        for field in self.generate_fields():
+            if isinstance(field, Box):
+                boxes.append(field)
+            else:
+                fields.append(field)
+        return fields, boxes + self.children
+
     def __str__(self):
         return f"<Box: {self.boxtype}, {self.size} bytes>"
 
 
+class OpaqueBox(Box):
+    """A box whose contents are skipped without being parsed"""
+
+    warn_unparsed_bytes = False
+
+
 class FullBox(Box):
     """base class for boxes with version and flags"""
 
@@ -241,3 +292,8 @@ class FileType(Box):
             len(self.brands),
             ",".join(self.brands),
         )
+
+
+boxmap = {
+    "ftyp": FileType,
+}
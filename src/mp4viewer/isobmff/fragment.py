@@ -2,6 +2,7 @@
 
 # pylint: disable=too-many-instance-attributes
 
+from mp4viewer.tree import ArrayField
 from . import box
 
 
@@ -95,19 +96,19 @@ class TrackFragmentRun(box.FullBox):
             yield ("Data offset", self.data_offset)
         if self.flags & 0x000004:
             yield ("First sample flags", f"{self.first_sample_flags:08x}")
-        i = 0
-        for s in self.samples:
-            i += 1
-            vals = []
-            if self.flags & 0x000100:
-                vals.append(f"duration={s[0]}")
-            if self.flags & 0x000200:
-                vals.append(f"size={s[1]}")
-            if self.flags & 0x000400:
-                vals.append(f"flags=0x{s[2]:08x}")
-            if self.flags & 0x000800:
-                vals.append(f"compositional time offset={s[3]}")
-            yield (f"  Sample {i}", ", ".join(vals))
+        yield ("Samples", ArrayField(self.samples, self._format_sample, "Sample"))
+
+    def _format_sample(self, s):
+        vals = []
+        if self.flags & 0x000100:
+            vals.append(f"duration={s[0]}")
+        if self.flags & 0x000200:
+            vals.append(f"size={s[1]}")
+        if self.flags & 0x000400:
+            vals.append(f"flags=0x{s[2]:08x}")
+        if self.flags & 0x000800:
+            vals.append(f"compositional time offset={s[3]}")
+        return ", ".join(vals)
 
 
 class SampleAuxInfoSizes(box.FullBox):
@@ -134,8 +135,10 @@ class SampleAuxInfoSizes(box.FullBox):
         if self.default_sample_info_size:
             yield ("Default sample info size", self.default_sample_info_size)
         else:
-            for sample in self.samples:
-                yield ("  Sample info size", sample)
+            yield (
+                "Sample info sizes",
+                ArrayField(self.samples, item_name="Sample info size"),
+            )
 
 
 class SampleAuxInfoOffsets(box.FullBox):
@@ -162,8 +165,7 @@ class SampleAuxInfoOffsets(box.FullBox):
             yield ("Aux info type", self.aux_info_type)
             yield ("Aux info type parameter", self.aux_info_type_parameter)
         yield ("Entry Count", self.entry_count)
-        for offset in self.offsets:
-            yield ("  Offset", offset)
+        yield ("Offsets", ArrayField(self.offsets, item_name="Offset"))
 
 
 class TrackFragmentDecodeTime(box.FullBox):
@@ -234,14 +236,15 @@ class SegmentIndexBox(box.FullBox):
         yield ("Earliest presentation time", self.earliest_presentation_time)
         yield ("First offset", self.first_offset)
         yield ("Reference count", self.reference_count)
-        i = 0
-        for ref in self.references:
-            i += 1
-            yield (
-                f"  Reference {i}",
-                f"type={ref[0]}, size={ref[1]}, duration={ref[2]}, "
+        yield (
+            "References",
+            ArrayField(
+                self.references,
+                lambda ref: f"type={ref[0]}, size={ref[1]}, duration={ref[2]}, "
                 f"starts with SAP={ref[3]}, SAP type={ref[4]}, SAP delta time={ref[5]}",
-            )
+                "Reference",
+            ),
+        )
 
 
 boxmap = {
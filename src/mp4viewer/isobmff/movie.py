@@ -1,9 +1,11 @@
 """ Movie and track related boxes """
 
 # pylint: disable=too-many-instance-attributes
-from mp4viewer.tree import Attr
+from functools import partial
+
+from mp4viewer.tree import Attr, ArrayField
 from . import box
-from .utils import get_utc_from_seconds_since_1904
+from .utils import ctime_since_1904
 from .utils import parse_iso639_2_15bit
 from .utils import stringify_duration
 from .utils import error_print
@@ -37,18 +39,18 @@ class MovieHeader(box.FullBox):
         yield (
             "creation time",
             self.creation_time,
-            get_utc_from_seconds_since_1904(self.creation_time).ctime(),
+            partial(ctime_since_1904, self.creation_time),
         )
         yield (
             "modification time",
             self.creation_time,
-            get_utc_from_seconds_since_1904(self.modification_time).ctime(),
+            partial(ctime_since_1904, self.modification_time),
         )
         yield ("timescale", self.timescale)
         yield (
             "duration",
             self.duration,
-            stringify_duration(self.duration / self.timescale),
+            partial(stringify_duration, self.duration / self.timescale),
         )
         yield ("rate", f"0x{self.rate:08X}")
         yield ("volume", f"0x{self.volume:04X}")
@@ -88,12 +90,12 @@ class TrackHeader(box.FullBox):
         yield (
             "creation time",
             self.creation_time,
-            get_utc_from_seconds_since_1904(self.creation_time).ctime(),
+            partial(ctime_since_1904, self.creation_time),
         )
         yield (
             "modification time",
             self.modification_time,
-            get_utc_from_seconds_since_1904(self.modification_time).ctime(),
+            partial(ctime_since_1904, self.modification_time),
         )
         yield ("track id", self.track_id)
         mvhd = self.find_descendant_of_ancestor("moov", "mvhd")
@@ -104,7 +106,7 @@ class TrackHeader(box.FullBox):
             yield (
                 "duration",
                 self.duration,
-                stringify_duration(self.duration / mvhd.timescale),
+                partial(stringify_duration, self.duration / mvhd.timescale),
             )
         yield ("layer", f"0x{self.layer:04X}")
         yield ("alternate group", f"0x{self.altgroup:04X}")
@@ -151,7 +153,7 @@ class EditList(box.FullBox):
             if mvhd is None:
                 str_duration = None
             else:
-                str_duration = stringify_duration(duration / mvhd.timescale)
+                str_duration = partial(stringify_duration, duration / mvhd.timescale)
             dup["segment_duration"] = Attr("segment_duration", duration, str_duration)
             entries.append(dup)
         yield ("entries", entries)
@@ -181,20 +183,20 @@ class MediaHeader(box.FullBox):
         yield (
             "creation time",
             self.creation_time,
-            get_utc_from_seconds_since_1904(self.creation_time).ctime(),
+            partial(ctime_since_1904, self.creation_time),
         )
         yield (
             "modification time",
             self.modification_time,
-            get_utc_from_seconds_since_1904(self.modification_time).ctime(),
+            partial(ctime_since_1904, self.modification_time),
         )
         yield ("timescale", self.timescale)
         yield (
             "duration",
             self.duration,
-            stringify_duration(self.duration / self.timescale),
+            partial(stringify_duration, self.duration / self.timescale),
         )
-        yield ("language", self.language, parse_iso639_2_15bit(self.language))
+        yield ("language", self.language, partial(parse_iso639_2_15bit, self.language))
 
 
 class VideoMediaHeader(box.FullBox):
@@ -445,9 +447,37 @@ class TimeToSampleBox(box.FullBox):
     def generate_fields(self):
         yield from super().generate_fields()
         yield ("entry count", self.entry_count)
-        for entry in self.entries:
-            yield ("sample count", entry[0])
-            yield ("sample delta", entry[1])
+        yield (
+            "entries",
+            ArrayField(
+                self.entries,
+                lambda entry: f"sample count={entry[0]}, sample delta={entry[1]}",
+                "entry",
+            ),
+        )
+
+
+class CompositionOffsetBox(box.FullBox):
+    """ctts"""
+
+    def parse(self, parse_ctx):
+        buf = parse_ctx.buf
+        super().parse(parse_ctx)
+        self.entry_count = buf.readint32()
+        self.entries = []
+        for _ in range(self.entry_count):
+            count = buf.readint32()
+            offset = buf.readint32()
+            # version 1 uses signed offsets, so do the two's complement
+            if self.version == 1 and offset & 0x80000000:
+                offset -= 0x100000000
+            self.entries.append((count, offset))
+
+    def generate_fields(self):
+        yield from super().generate_fields()
+        yield ("entry count", self.entry_count)
+        yield ("sample counts", [entry[0] for entry in self.entries])
+        yield ("sample offsets", [entry[1] for entry in self.entries])
 
 
 class SampleToChunkBox(box.FullBox):
@@ -467,16 +497,15 @@ class SampleToChunkBox(box.FullBox):
     def generate_fields(self):
         yield from super().generate_fields()
         yield ("entry count", self.entry_count)
-        if self.entry_count > 10:
-            yield (
-                "chunk data hidden",
-                f"{self.entry_count} entries can be toggled in movies.py/SampleToChunkBox",
-            )
-        else:
-            for entry in self.entries:
-                yield ("first chunk", entry[0])
-                yield ("samples per chunk", entry[1])
-                yield ("sample description index", entry[2])
+        yield (
+            "entries",
+            ArrayField(
+                self.entries,
+                lambda entry: f"first chunk={entry[0]}, samples per chunk={entry[1]}, "
+                f"sample description index={entry[2]}",
+                "entry",
+            ),
+        )
 
 
 class ChunkOffsetBox(box.FullBox):
@@ -494,6 +523,17 @@ class ChunkOffsetBox(box.FullBox):
         yield ("chunk offsets", self.entries)
 
 
+class ChunkLargeOffsetBox(ChunkOffsetBox):
+    """co64"""
+
+    def parse(self, parse_ctx):
+        buf = parse_ctx.buf
+        # Skip ChunkOffsetBox.parse, the entries are 64 bit here
+        box.FullBox.parse(self, parse_ctx)
+        self.entry_count = buf.readint32()
+        self.entries = [buf.readint64() for i in range(self.entry_count)]
+
+
 class SyncSampleBox(box.FullBox):
     """stss"""
 
@@ -664,7 +704,9 @@ boxmap = {
     "dref": DataReferenceBox,
     "stts": TimeToSampleBox,
     "stsc": SampleToChunkBox,
+    "ctts": CompositionOffsetBox,
     "stco": ChunkOffsetBox,
+    "co64": ChunkLargeOffsetBox,
     "stss": SyncSampleBox,
     "stsz": SampleSizeBox,
     "stz2": CompactSampleSizeBox,
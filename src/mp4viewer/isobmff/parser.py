@@ -1,9 +1,11 @@
 """ isobmff parser public interface """
 
 import traceback
+from collections import ChainMap
 
-from mp4viewer.datasource import DataBuffer
-from . import box, movie, fragment, flv, cenc
+from mp4viewer.datasource import DataBuffer, FileSource
+from . import box, plugins, registry
+from .plugins import StopParsing, SKIP_BOX
 from .utils import error_print
 
 
@@ -30,38 +32,98 @@ class IsobmffParser:
     ]
 
     def __init__(self, buf: DataBuffer, debug=False):
-        boxmap = {
-            "ftyp": box.FileType,
-        }
-        boxmap.update(movie.boxmap)
-        boxmap.update(fragment.boxmap)
-        boxmap.update(flv.boxmap)
-        boxmap.update(cenc.boxmap)
-        self.boxmap = boxmap
+        plugins.load_entry_points()
+        self.boxmap = registry.boxmap
+        self.container_boxes = IsobmffParser.container_boxes
+        if plugins.boxes:
+            self.boxmap = ChainMap(plugins.boxes, registry.boxmap)
+        if plugins.containers:
+            self.container_boxes = self.container_boxes + sorted(plugins.containers)
+        # uuid boxes are looked up by their usertype only if there are classes for them
+        self.has_uuid_boxes = any(k.startswith("uuid:") for k in plugins.boxes)
+        self.pre_parse_callbacks = list(plugins.pre_parse_callbacks)
+        self.post_parse_callbacks = list(plugins.post_parse_callbacks)
         self.buf = buf
         self.debug = debug
 
+    def add_callbacks(self, pre_parse=None, post_parse=None):
+        """Add callbacks for this parser only; see the plugins module"""
+        if pre_parse is not None:
+            self.pre_parse_callbacks.append(pre_parse)
+        if post_parse is not None:
+            self.post_parse_callbacks.append(post_parse)
+
     def getboxlist(self):
         """returns a list of all boxes in the input stream"""
-        boxes = []
+        return list(self.iterboxes())
+
+    def iterboxes(self):
+        """
+        Generator that yields the top level boxes of the input stream as they are parsed.
+        Callers that process one box at a time need not hold the whole file in memory.
+        A parse callback can stop the iteration by raising StopParsing.
+        """
         try:
             while self.buf.hasmore():
-                next_box = self.getnextbox(None)
-                boxes.append(next_box)
+                yield self.getnextbox(None)
+        except StopParsing:
+            return
         except (AssertionError, TypeError):
             error_print(traceback.format_exc())
-        return boxes
+
+    def iterboxheaders(self):
+        """
+        Generator that yields a BoxHeader for each top level box without parsing the contents.
+        Use parse_box_at() to parse the boxes that are actually needed.
+        """
+        while self.buf.hasmore():
+            header = box.BoxHeader(self.buf)
+            if header.size < header.header_size:
+                error_print(f"{header} is smaller than its header; stopping the scan")
+                return
+            try:
+                self.buf.skipbytes(header.size - header.header_size)
+            except BufferError:
+                error_print(f"{header} overflows the file; stopping the scan")
+                yield header
+                return
+            yield header
+
+    def parse_box_at(self, offset, parent=None):
+        """Parse the box at `offset` of the stream"""
+        self.buf.seekto(offset)
+        return self.getnextbox(parent)
 
     def getnextbox(self, parent: box.Box):
         """returns the next box in the stream"""
         fourcc = self.buf.peekstr(4, 4)
-        if fourcc in self.boxmap:
+        if self.pre_parse_callbacks and self._pre_parse(fourcc, parent):
+            next_box = box.OpaqueBox(self, parent)
+        elif fourcc == "uuid" and self.has_uuid_boxes:
+            next_box = self._uuid_box_class()(self, parent)
+        elif fourcc in self.boxmap:
             next_box = self.boxmap[fourcc](self, parent)
         else:
             is_container = fourcc in self.container_boxes
             next_box = box.Box(self, parent, is_container)
+        for callback in self.post_parse_callbacks:
+            callback(next_box)
         return next_box
 
+    def _pre_parse(self, fourcc, parent):
+        """Run the pre-parse callbacks; returns True if the box should be skipped"""
+        offset = self.buf.current_position()
+        skip = False
+        for callback in self.pre_parse_callbacks:
+            skip |= callback(fourcc, offset, parent) is SKIP_BOX
+        return skip
+
+    def _uuid_box_class(self):
+        # The usertype follows the 32 or 64 bit size
+        offset = 16 if self.buf.peekint(4) == 1 else 8
+        usertype = self.buf.peekbytes(16, offset).hex()
+        return self.boxmap.get(f"uuid:{usertype}", box.Box)
+
     def dump_remaining_fourccs(self):
         """
         Scan through the bytestream and print potential box types and their sizes.
@@ -109,6 +171,12 @@ class IsobmffParser:
                 buf.skipbytes(1)
 
 
+def parse_file(path, debug=False):
+    """Parse the file at `path` and return the list of its top level boxes"""
+    with open(path, "rb") as fd:
+        return IsobmffParser(DataBuffer(FileSource(fd)), debug).getboxlist()
+
+
 # fourcc -> human readable description map
 box_names = {
     # iso bmff box types
@@ -141,6 +209,7 @@ box_names = {
     "stts": "Time-to-sample box",
     "stsc": "Sample-to-chunk box",
     "stco": "Chunk offset box",
+    "co64": "Chunk large offset box",
     "stss": "Sync sample box",
     "stsz": "Sample size box",
     "stz2": "Compact sample size box",
@@ -177,4 +246,6 @@ box_names = {
 
 def getboxdesc(name):
     """get box description for the given fourcc"""
-    return box_names[name] if name in box_names else name.upper()
+    if name in box_names:
+        return box_names[name]
+    return plugins.descriptions.get(name, name.upper())
@@ -0,0 +1,135 @@
+"""
+Extend the parser without changing it: register classes for extra box types, mark extra box
+types as containers, and add callbacks that run before and after each box is parsed.
+
+A plugin is a module, or a function given as "module:function", that calls the register
+functions below when it is loaded. Plugins are loaded with load_plugin(), with the --plugin
+option of the command line, or from the "mp4viewer.plugins" entry point group of installed
+packages, which is read when the first parser is created:
+
+    [project.entry-points."mp4viewer.plugins"]
+    acme = "acme_mp4.boxes:register"
+
+Classes for uuid boxes are registered with the usertype instead of the fourcc, as
+"uuid:" followed by the 32 lowercase hex digits of the usertype.
+
+Callbacks:
+    pre_parse(fourcc, offset, parent) is called before a box is parsed. Returning SKIP_BOX
+    skips the contents of the box; it is added to the tree as an OpaqueBox with no fields.
+    post_parse(box) is called after a box and its children are parsed.
+Either can raise StopParsing to stop parsing the file. IsobmffParser.iterboxes() then stops
+without yielding the top level box that was being parsed; callbacks that want a box or a
+field should keep it themselves before raising.
+"""
+
+import os
+import sys
+import importlib
+
+from .utils import error_print
+
+ENTRY_POINT_GROUP = "mp4viewer.plugins"
+
+# Returned by a pre_parse callback to skip the contents of a box
+SKIP_BOX = object()
+
+# fourcc (or "uuid:" + usertype) -> Box subclass
+boxes = {}
+# fourccs of the boxes that only hold other boxes
+containers = set()
+# fourcc -> description shown next to the fourcc in the outputs
+descriptions = {}
+pre_parse_callbacks = []
+post_parse_callbacks = []
+
+_loaded = set()
+
+
+class StopParsing(Exception):
+    """Raised by a parse callback to stop parsing the file"""
+
+
+def register_box(fourcc, box_class, description=None):
+    """Parse boxes of this type (or uuid usertype) with box_class, a subclass of Box"""
+    boxes[fourcc] = box_class
+    if description is not None:
+        descriptions[fourcc] = description
+
+
+def register_container(fourcc, description=None):
+    """Parse the contents of boxes of this type as a list of child boxes"""
+    containers.add(fourcc)
+    if description is not None:
+        descriptions[fourcc] = description
+
+
+def register_callbacks(pre_parse=None, post_parse=None):
+    """Add callbacks that are used by all parsers created afterwards"""
+    if pre_parse is not None:
+        pre_parse_callbacks.append(pre_parse)
+    if post_parse is not None:
+        post_parse_callbacks.append(post_parse)
+
+
+def load_plugin(name):
+    """Import a plugin module, or import "module:function" and call the function"""
+    if name in _loaded:
+        return
+    module_name, _, function = name.partition(":")
+    module = importlib.import_module(module_name)
+    if function:
+        getattr(module, function)()
+    _loaded.add(name)
+
+
+def _entry_points_declared():
+    """
+    Whether an installed distribution declares the entry point group. Importing
+    importlib.metadata takes tens of milliseconds, which is a large part of the run time of
+    the command line on small files, so it is only imported if this finds the group.
+    """
+    marker = f"[{ENTRY_POINT_GROUP}]"
+    for path in sys.path:
+        try:
+            names = os.listdir(path or ".")
+        except OSError:
+            continue
+        for name in names:
+            if not name.endswith((".dist-info", ".egg-info")):
+                continue
+            try:
+                with open(
+                    os.path.join(path or ".", name, "entry_points.txt"),
+                    encoding="utf-8",
+                ) as fd:
+                    if marker in fd.read():
+                        return True
+            except OSError:
+                pass
+    return False
+
+
+def load_entry_points():
+    """Load the plugins of installed packages; only the first call does anything"""
+    if ENTRY_POINT_GROUP in _loaded:
+        return
+    _loaded.add(ENTRY_POINT_GROUP)
+    if not _entry_points_declared():
+        return
+    # pylint: disable=import-outside-toplevel
+    from importlib import metadata
+
+    try:
+        entry_points = metadata.entry_points(group=ENTRY_POINT_GROUP)
+    except TypeError:
+        # python < 3.10
+        entry_points = metadata.entry_points().get(ENTRY_POINT_GROUP, [])
+    for entry_point in entry_points:
+        try:
+            if entry_point.value not in _loaded:
+                register = entry_point.load()
+                if callable(register):
+                    register()
+                _loaded.add(entry_point.value)
+        except Exception as e:  # pylint: disable=broad-except
+            error_print(f"Failed to load the plugin {entry_point.name}: {e}")
@@ -0,0 +1,76 @@
+""" The box classes of each fourcc, with the box modules imported on first use """
+
+import importlib
+from collections.abc import Mapping
+
+# The fourccs of the boxmap of each box module in mp4viewer.isobmff. The classes themselves
+# are only in the boxmaps; a fourcc is looked up in the boxmap of its module when it is first
+# used. tests/test_registry.py checks that these lists match the boxmaps.
+MODULE_FOURCCS = {
+    "box": ["ftyp"],
+    "movie": [
+        "mvhd",
+        "tkhd",
+        "elst",
+        "mdhd",
+        "vmhd",
+        "smhd",
+        "hmhd",
+        "hdlr",
+        "stsd",
+        "dref",
+        "stts",
+        "stsc",
+        "ctts",
+        "stco",
+        "co64",
+        "stss",
+        "stsz",
+        "stz2",
+        "url ",
+        "urn ",
+        "mehd",
+        "trex",
+        "avcC",
+    ],
+    "fragment": ["mfhd", "tfhd", "trun", "saiz", "saio", "tfdt", "styp", "sidx"],
+    "flv": ["afra", "abst", "asrt", "afrt"],
+    "cenc": ["tenc", "pssh", "schm", "frma"],
+}
+
+
+class LazyBoxMap(Mapping):
+    """
+    Maps fourccs to box classes, importing the module of a class the first time it is looked
+    up, so that a parser only imports the modules of the boxes in the file.
+    """
+
+    def __init__(self, module_fourccs):
+        self.modules = {
+            fourcc: module
+            for module, fourccs in module_fourccs.items()
+            for fourcc in fourccs
+        }
+        self.classes = {}
+
+    def __getitem__(self, fourcc):
+        cls = self.classes.get(fourcc)
+        if cls is None:
+            module = importlib.import_module(
+                f"mp4viewer.isobmff.{self.modules[fourcc]}"
+            )
+            cls = self.classes[fourcc] = module.boxmap[fourcc]
+        return cls
+
+    def __contains__(self, fourcc):
+        return fourcc in self.modules
+
+    def __iter__(self):
+        return iter(self.modules)
+
+    def __len__(self):
+        return len(self.modules)
+
+
+# The dispatch table of the built-in boxes, shared by all parsers of the process
+boxmap = LazyBoxMap(MODULE_FOURCCS)
@@ -0,0 +1,330 @@
+""" Per track sample tables built from the sample table boxes and the track fragment runs """
+
+# pylint: disable=too-many-instance-attributes
+
+from array import array
+from collections import namedtuple
+from itertools import accumulate, chain, islice, repeat
+from operator import add
+
+# sample_is_non_sync_sample bit of the sample flags used in trex, tfhd and trun
+SAMPLE_IS_NON_SYNC_SAMPLE = 0x00010000
+
+# One entry of SampleTable.fragments for each track fragment that added samples to the table.
+# `offset` is the offset of the moof, `tfdt` is the base media decode time from the tfdt box
+# (None if there wasn't one) and `decode_time` is the decode time that was actually used.
+Fragment = namedtuple(
+    "Fragment",
+    [
+        "offset",
+        "sequence_number",
+        "first_sample",
+        "sample_count",
+        "decode_time",
+        "tfdt",
+        "duration",
+    ],
+)
+
+
+class TrackContext:
+    # pylint: disable=too-few-public-methods
+    """
+    Track level values from the moov box that are required to resolve the samples of a track.
+    Track fragments fall back to the trex defaults when tfhd and trun do not carry them.
+    """
+
+    def __init__(self, track_id, timescale=0, handler=None):
+        self.track_id = track_id
+        self.timescale = timescale
+        self.handler = handler
+        self.default_sample_duration = 0
+        self.default_sample_size = 0
+        self.default_sample_flags = 0
+
+
+class SampleTable:
+    """
+    Column oriented sample table of a single track.
+    Each column is an array with one item per sample, in decode order.
+    """
+
+    COLUMNS = ("index", "dts", "cts", "size", "offset", "sync", "chunk")
+
+    def __init__(self, track_id, timescale=0, handler=None):
+        self.track_id = track_id
+        self.timescale = timescale
+        self.handler = handler
+        self.dts = array("q")
+        self.cts = array("q")
+        self.size = array("q")
+        self.offset = array("q")
+        self.sync = array("B")
+        self.chunk = array("q")
+        self.fragments = []
+        # decode time of the sample that would follow the last sample in the table
+        self.next_dts = 0
+        # number of chunks (or track fragment runs) added so far
+        self.chunk_count = 0
+
+    def __len__(self):
+        return len(self.dts)
+
+    def column(self, name):
+        """Get the column with the given name as an array"""
+        if name not in SampleTable.COLUMNS:
+            raise KeyError(f"Unknown column {name}")
+        if name == "index":
+            return array("q", range(len(self)))
+        return getattr(self, name)
+
+    def add_stbl(self, stbl):
+        """Add the samples described by a sample table box"""
+        stsz = stbl.find_child("stsz") or stbl.find_child("stz2")
+        if stsz is None:
+            return
+        count = stsz.sample_count
+        if stsz.entries or count == 0:
+            sizes = array("q", stsz.entries)
+        else:
+            sizes = array("q", [stsz.sample_size]) * count
+        first_sample = len(self)
+        self.size.extend(sizes)
+        self._add_stbl_times(stbl, count)
+        self._add_stbl_sync(stbl, count)
+        self._add_stbl_chunks(stbl, sizes)
+        # Keep the columns aligned even if the chunk boxes do not cover all the samples
+        missing = first_sample + count - len(self.offset)
+        if missing > 0:
+            self.offset.extend(repeat(-1, missing))
+            self.chunk.extend(repeat(-1, missing))
+
+    def _add_stbl_times(self, stbl, count):
+        stts = stbl.find_child("stts")
+        deltas = chain.from_iterable(
+            repeat(delta, sample_count)
+            for sample_count, delta in (stts.entries if stts else [])
+        )
+        # Samples that are not covered by stts get a duration of zero
+        dts = array(
+            "q",
+            islice(
+                accumulate(chain(deltas, repeat(0)), initial=self.next_dts), count + 1
+            ),
+        )
+        self.next_dts = dts.pop()
+        ctts = stbl.find_child("ctts")
+        offsets = chain.from_iterable(
+            repeat(offset, sample_count)
+            for sample_count, offset in (ctts.entries if ctts else [])
+        )
+        self.dts.extend(dts)
+        self.cts.extend(map(add, dts, chain(offsets, repeat(0))))
+
+    def _add_stbl_sync(self, stbl, count):
+        stss = stbl.find_child("stss")
+        if stss is None:
+            # Every sample is a sync sample if there is no sync sample box
+            self.sync.extend(repeat(1, count))
+            return
+        sync = array("B", bytes(count))
+        for sample_number in stss.entries:
+            if 0 < sample_number <= count:
+                sync[sample_number - 1] = 1
+        self.sync.extend(sync)
+
+    def _add_stbl_chunks(self, stbl, sizes):
+        stsc = stbl.find_child("stsc")
+        stco = stbl.find_child("stco") or stbl.find_child("co64")
+        if stsc is None or stco is None:
+            return
+        chunk_offsets = stco.entries
+        runs = stsc.entries
+        sample = 0
+        for i, (first_chunk, samples_per_chunk, _) in enumerate(runs):
+            last_chunk = runs[i + 1][0] - 1 if i + 1 < len(runs) else len(chunk_offsets)
+            for chunk in range(first_chunk, min(last_chunk, len(chunk_offsets)) + 1):
+                n = min(samples_per_chunk, len(sizes) - sample)
+                if n <= 0:
+                    break
+                self.offset.extend(
+                    accumulate(
+                        sizes[sample : sample + n - 1], initial=chunk_offsets[chunk - 1]
+                    )
+                )
+                self.chunk.extend(repeat(self.chunk_count + chunk - 1, n))
+                sample += n
+        self.chunk_count += len(chunk_offsets)
+
+    def add_traf(self, traf, moof, context):
+        """
+        Add the samples of the track fragment runs in `traf`.
+        `moof` is the parent movie fragment, and `context` is the TrackContext of the track.
+        """
+        tfhd = traf.find_child("tfhd")
+        tfdt = traf.find_child("tfdt")
+        mfhd = moof.find_child("mfhd")
+        decode_time = tfdt.decode_time if tfdt is not None else self.next_dts
+        fragment_start = len(self)
+        self.next_dts = decode_time
+        # Without an explicit base offset, the data offsets are relative to the moof.
+        # Strictly, that is only true for the first traf unless default-base-is-moof is set.
+        data_offset = tfhd.base_data_offset if tfhd.flags & 0x000001 else None
+        base_offset = moof.buffer_offset if data_offset is None else data_offset
+        for trun in traf.children:
+            if trun.boxtype != "trun":
+                continue
+            if trun.flags & 0x000001:
+                data_offset = base_offset + trun.data_offset
+            elif data_offset is None:
+                data_offset = base_offset
+            data_offset = self._add_trun(trun, tfhd, context, data_offset)
+        self.fragments.append(
+            Fragment(
+                offset=moof.buffer_offset,
+                sequence_number=mfhd.sequence_number if mfhd is not None else None,
+                first_sample=fragment_start,
+                sample_count=len(self) - fragment_start,
+                decode_time=decode_time,
+                tfdt=tfdt.decode_time if tfdt is not None else None,
+                duration=self.next_dts - decode_time,
+            )
+        )
+
+    def _add_trun(self, trun, tfhd, context, data_offset):
+        """Add the samples of `trun` and return the offset of the byte following its data"""
+        samples = trun.samples
+        n = len(samples)
+        if trun.flags & 0x000100:
+            durations = [s[0] for s in samples]
+        else:
+            default = getattr(
+                tfhd, "default_sample_duration", context.default_sample_duration
+            )
+            durations = [default] * n
+        if trun.flags & 0x000200:
+            sizes = [s[1] for s in samples]
+        else:
+            default = getattr(tfhd, "default_sample_size", context.default_sample_size)
+            sizes = [default] * n
+        if trun.flags & 0x000400:
+            flags = [s[2] for s in samples]
+        else:
+            default = getattr(
+                tfhd, "default_sample_flags", context.default_sample_flags
+            )
+            flags = [default] * n
+        if trun.flags & 0x000004 and n > 0:
+            flags[0] = trun.first_sample_flags
+        dts = list(accumulate(durations, initial=self.next_dts))
+        self.next_dts = dts.pop()
+        self.dts.extend(dts)
+        if trun.flags & 0x000800:
+            self.cts.extend(map(add, dts, (s[3] for s in samples)))
+        else:
+            self.cts.extend(dts)
+        self.size.extend(sizes)
+        if n > 0:
+            self.offset.extend(accumulate(sizes[:-1], initial=data_offset))
+        self.sync.extend(0 if f & SAMPLE_IS_NON_SYNC_SAMPLE else 1 for f in flags)
+        self.chunk.extend(repeat(self.chunk_count, n))
+        self.chunk_count += 1
+        return data_offset + sum(sizes)
+
+    def extend(self, other):
+        """
+        Append the samples of another table of the same track, e.g. one built from a later
+        media segment. If the first fragment of `other` had no tfdt, its decode times started
+        from zero; they are moved to follow the samples of this table.
+        """
+        shift = 0
+        if other.fragments and other.fragments[0].tfdt is None:
+            shift = self.next_dts
+        first_sample = len(self)
+        if shift:
+            self.dts.extend(dts + shift for dts in other.dts)
+            self.cts.extend(cts + shift for cts in other.cts)
+        else:
+            self.dts.extend(other.dts)
+            self.cts.extend(other.cts)
+        self.size.extend(other.size)
+        self.offset.extend(other.offset)
+        self.sync.extend(other.sync)
+        self.chunk.extend(chunk + self.chunk_count for chunk in other.chunk)
+        self.fragments.extend(
+            fragment._replace(
+                first_sample=fragment.first_sample + first_sample,
+                decode_time=fragment.decode_time + shift,
+            )
+            for fragment in other.fragments
+        )
+        self.next_dts = other.next_dts + shift
+        self.chunk_count += other.chunk_count
+
+
+def get_track_contexts(boxes):
+    """Get a dict of track id -> TrackContext from the moov in the list of top level boxes"""
+    contexts = {}
+    for moov in boxes:
+        if moov.boxtype != "moov":
+            continue
+        for trak in moov.children:
+            tkhd = trak.find_child("tkhd")
+            if trak.boxtype != "trak" or tkhd is None:
+                continue
+            mdhd = trak.find_descendant("mdhd")
+            hdlr = trak.find_descendant("hdlr")
+            contexts[tkhd.track_id] = TrackContext(
+                tkhd.track_id,
+                mdhd.timescale if mdhd is not None else 0,
+                hdlr.handler if hdlr is not None else None,
+            )
+        mvex = moov.find_child("mvex")
+        for trex in mvex.children if mvex is not None else []:
+            if trex.boxtype != "trex":
+                continue
+            context = contexts.setdefault(trex.track_id, TrackContext(trex.track_id))
+            context.default_sample_duration = trex.default_sample_duration
+            context.default_sample_size = trex.default_sample_size
+            context.default_sample_flags = trex.default_sample_flags
+    return contexts
+
+
+def _add_moov_samples(moov, get_table):
+    for trak in moov.children:
+        tkhd = trak.find_child("tkhd")
+        stbl = trak.find_descendant("stbl")
+        if tkhd is not None and stbl is not None:
+            get_table(tkhd.track_id).add_stbl(stbl)
+
+
+def _add_moof_samples(moof, get_table, contexts):
+    for traf in moof.children:
+        tfhd = traf.find_child("tfhd")
+        if traf.boxtype == "traf" and tfhd is not None:
+            context = contexts.get(tfhd.track_id, TrackContext(tfhd.track_id))
+            get_table(tfhd.track_id).add_traf(traf, moof, context)
+
+
+def get_sample_tables(boxes, contexts=None):
+    """
+    Build a dict of track id -> SampleTable from the list of top level boxes of a file.
+    The samples of the stbl of each track come first, followed by those from the movie
+    fragments in file order. Pass `contexts` if the boxes do not include the moov box.
+    """
+    if contexts is None:
+        contexts = get_track_contexts(boxes)
+    tables = {}
+
+    def get_table(track_id):
+        if track_id not in tables:
+            context = contexts.get(track_id, TrackContext(track_id))
+            tables[track_id] = SampleTable(track_id, context.timescale, context.handler)
+        return tables[track_id]
+
+    for top_level_box in boxes:
+        if top_level_box.boxtype == "moov":
+            _add_moov_samples(top_level_box, get_table)
+        elif top_level_box.boxtype == "moof":
+            _add_moof_samples(top_level_box, get_table, contexts)
+    return tables
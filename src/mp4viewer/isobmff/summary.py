@@ -0,0 +1,116 @@
+"""
+Variants of the sample table boxes that keep only the counts and sums of their entries.
+They are used in place of the regular classes when only a summary of the tracks is needed,
+as the entries are summed a block at a time without creating an object for each sample.
+"""
+
+import sys
+from array import array
+
+from . import box
+
+# Bytes of the entries summed at a time
+BLOCK_SIZE = 1 << 16
+
+# Sum of the two 4 bit values in each byte
+_NIBBLE_SUMS = bytes((b >> 4) + (b & 0xF) for b in range(256))
+
+
+def _blocks(buf, size):
+    """Yield the next `size` bytes of the buffer in blocks"""
+    while size > 0:
+        count = min(size, BLOCK_SIZE)
+        block = buf.peekbytes(count)
+        buf.skipbytes(count)
+        size -= count
+        yield block
+
+
+def _values(block, typecode):
+    """The big endian integers in the block"""
+    values = array(typecode, block)
+    if sys.byteorder == "little":
+        values.byteswap()
+    return values
+
+
+class SampleSizeSum(box.FullBox):
+    """stsz with the total size of the samples instead of the entries"""
+
+    def parse(self, parse_ctx):
+        buf = parse_ctx.buf
+        super().parse(parse_ctx)
+        self.sample_size = buf.readint32()
+        self.sample_count = buf.readint32()
+        if self.sample_size:
+            self.total_size = self.sample_size * self.sample_count
+        else:
+            self.total_size = sum(
+                sum(_values(block, "I"))
+                for block in _blocks(buf, 4 * self.sample_count)
+            )
+
+    def generate_fields(self):
+        yield from super().generate_fields()
+        yield ("sample size", self.sample_size)
+        yield ("sample count", self.sample_count)
+        yield ("total size", self.total_size)
+
+
+class CompactSampleSizeSum(box.FullBox):
+    """stz2 with the total size of the samples instead of the entries"""
+
+    def parse(self, parse_ctx):
+        buf = parse_ctx.buf
+        super().parse(parse_ctx)
+        # 24 reserved bits in front of the 8 bit field size
+        self.field_size = buf.readint32() & 0xFF
+        self.sample_count = buf.readint32()
+        # The padding of an odd number of 4 bit fields is zero
+        size = (self.field_size * self.sample_count + 7) // 8
+        if self.field_size == 4:
+            total = sum(
+                sum(block.translate(_NIBBLE_SUMS)) for block in _blocks(buf, size)
+            )
+        elif self.field_size == 8:
+            total = sum(sum(block) for block in _blocks(buf, size))
+        else:
+            total = sum(sum(_values(block, "H")) for block in _blocks(buf, size))
+        self.total_size = total
+
+    def generate_fields(self):
+        yield from super().generate_fields()
+        yield ("field size", self.field_size)
+        yield ("sample count", self.sample_count)
+        yield ("total size", self.total_size)
+
+
+class TimeToSampleSum(box.FullBox):
+    """stts with the number of samples and their total duration instead of the entries"""
+
+    def parse(self, parse_ctx):
+        buf = parse_ctx.buf
+        super().parse(parse_ctx)
+        self.entry_count = buf.readint32()
+        self.sample_count = 0
+        self.total_duration = 0
+        # 8 byte entries, so the blocks do not split them
+        for block in _blocks(buf, 8 * self.entry_count):
+            values = _values(block, "I")
+            counts = values[0::2]
+            self.sample_count += sum(counts)
+            self.total_duration += sum(map(int.__mul__, counts, values[1::2]))
+
+    def generate_fields(self):
+        yield from super().generate_fields()
+        yield ("entry count", self.entry_count)
+        yield ("sample count", self.sample_count)
+        yield ("total duration", self.total_duration)
+
+
+# Used instead of the classes in movie.boxmap by parsers that only need the sums
+summary_boxmap = {
+    "stsz": SampleSizeSum,
+    "stz2": CompactSampleSizeSum,
+    "stts": TimeToSampleSum,
+}
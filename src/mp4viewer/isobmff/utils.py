@@ -1,6 +1,7 @@
 """ helper functions """
 
 import sys
+import argparse
 from datetime import datetime, timedelta
 
 
@@ -14,6 +15,25 @@ def error_print(s: str):
     print(f"{color_red}{s}{endcol}", file=sys.stderr)
 
 
+def non_negative_int(text):
+    """argparse type for integers that are zero or more"""
+    try:
+        value = int(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"Invalid number {text}") from e
+    if value < 0:
+        raise argparse.ArgumentTypeError(f"{text} should not be negative")
+    return value
+
+
+def positive_int(text):
+    """argparse type for counts, such as the number of worker threads, that are one or more"""
+    value = non_negative_int(text)
+    if value == 0:
+        raise argparse.ArgumentTypeError(f"{text} should be more than zero")
+    return value
+
+
 def parse_iso639_2_15bit(value):
     """
     The iso-639-2 three letter language code is encoded as three 5 bit values
@@ -25,6 +45,16 @@ def parse_iso639_2_15bit(value):
     return s
 
 
+def encode_iso639_2_15bit(code):
+    """Inverse of parse_iso639_2_15bit: pack a three letter language code in to 15 bits"""
+    if len(code) != 3 or not all("a" <= c <= "z" for c in code):
+        raise ValueError(f"Invalid iso-639-2 language code {code!r}")
+    value = 0
+    for c in code:
+        value = value << 5 | (ord(c) - ord("a") + 1)
+    return value
+
+
 def get_utc_from_seconds_since_1904(seconds):
     """Time in various boxes are represented as seconds since 1904"""
     return datetime(1904, 1, 1) + timedelta(
@@ -32,6 +62,11 @@ def get_utc_from_seconds_since_1904(seconds):
     )
 
 
+def ctime_since_1904(seconds):
+    """ctime() string of a time represented as seconds since 1904"""
+    return get_utc_from_seconds_since_1904(seconds).ctime()
+
+
 def stringify_duration(total_seconds):
     """seconds to xxh xxm xxs"""
     value = int(total_seconds)
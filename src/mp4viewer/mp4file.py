@@ -0,0 +1,192 @@
+""" Typed properties of a file, each of which parses only the boxes it needs """
+
+import builtins
+from collections import ChainMap
+from functools import cached_property
+
+from mp4viewer.datasource import PositionalFileSource, PositionalDataBuffer
+from mp4viewer.isobmff.parser import IsobmffParser
+from mp4viewer.isobmff.plugins import SKIP_BOX
+from mp4viewer.isobmff.summary import summary_boxmap
+from mp4viewer.isobmff.utils import parse_iso639_2_15bit
+
+# Only the counts and sums of the stts, stsz and stz2 boxes are needed for the properties of
+# the tracks; the contents of the other sample tables are skipped while parsing the moov,
+# which leaves them as OpaqueBoxes with a size
+SKIPPED_BOXES = ("ctts", "stsc", "stco", "co64", "stss")
+
+
+def _skip_sample_tables(fourcc, offset, parent):
+    # pylint: disable=unused-argument
+    return SKIP_BOX if fourcc in SKIPPED_BOXES else None
+
+
+class Track:
+    """
+    The properties of a track, from its tkhd, mdhd, hdlr, the first stsd entry and the sums
+    of its stts and stsz (or stz2) boxes
+    """
+
+    # pylint: disable=too-few-public-methods,too-many-instance-attributes
+
+    def __init__(self, trak):
+        tkhd = trak.find_child("tkhd")
+        mdhd = trak.find_descendant("mdhd")
+        hdlr = trak.find_descendant("hdlr")
+        stsd = trak.find_descendant("stsd")
+        entry = stsd.children[0] if stsd is not None and stsd.children else None
+        self.trak = trak
+        self.track_id = tkhd.track_id if tkhd is not None else None
+        self.handler = hdlr.handler if hdlr is not None else None
+        # fourcc of the sample entry, e.g. avc1 or mp4a
+        self.codec = entry.boxtype if entry is not None else None
+        self.timescale = mdhd.timescale if mdhd is not None else None
+        # seconds
+        self.duration = (
+            mdhd.duration / mdhd.timescale
+            if mdhd is not None and mdhd.timescale
+            else None
+        )
+        self.language = (
+            parse_iso639_2_15bit(mdhd.language)
+            if mdhd is not None and mdhd.language
+            else None
+        )
+        # presentation size from the 16.16 fixed point values of tkhd
+        self.width = tkhd.width >> 16 if tkhd is not None and tkhd.width else None
+        self.height = tkhd.height >> 16 if tkhd is not None and tkhd.height else None
+        self.sample_rate = getattr(entry, "sample_rate", 0) >> 16 or None
+        self.channel_count = getattr(entry, "channel_count", None)
+        sizes = trak.find_descendant("stsz") or trak.find_descendant("stz2")
+        stts = trak.find_descendant("stts")
+        # The sums of the summary variants of the sample tables
+        self.sample_count = getattr(sizes or stts, "sample_count", 0)
+        self.sample_bytes = getattr(sizes, "total_size", 0)
+        if not self.duration and self.timescale and stts is not None:
+            self.duration = stts.total_duration / self.timescale or None
+
+    @property
+    def bitrate(self):
+        """Average bits per second of the samples in the moov, or None"""
+        if not self.duration or not self.sample_bytes:
+            return None
+        return self.sample_bytes * 8 / self.duration
+
+    def __repr__(self):
+        return (
+            f"<Track {self.track_id} {self.handler} {self.codec} "
+            f"timescale={self.timescale} duration={self.duration}>"
+        )
+
+
+class Mp4File:
+    """
+    A file opened for its properties. The first access of a property parses the boxes it
+    needs and the value is kept: the top level box headers are scanned for is_fragmented and
+    is_faststart, the moov is parsed with only the sums of its sample tables for the tracks,
+    codecs and duration, and the moof boxes are parsed for the fragments.
+    """
+
+    def __init__(self, path, debug=False):
+        self.path = path
+        self.debug = debug
+        self.file = builtins.open(path, "rb")  # pylint: disable=consider-using-with
+        self.source = PositionalFileSource(self.file)
+
+    def close(self):
+        """close the file"""
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _parse_box(self, header, summary=False):
+        parser = IsobmffParser(
+            PositionalDataBuffer(self.source, header.buffer_offset), self.debug
+        )
+        if summary:
+            parser.boxmap = ChainMap(summary_boxmap, parser.boxmap)
+            parser.add_callbacks(pre_parse=_skip_sample_tables)
+        return parser.getnextbox(None)
+
+    def _first(self, fourccs, summary=False):
+        """Parse the first top level box of one of these types; None if there is none"""
+        for header in self.headers:
+            if header.boxtype in fourccs:
+                return self._parse_box(header, summary)
+        return None
+
+    @cached_property
+    def headers(self):
+        """BoxHeaders of the top level boxes"""
+        parser = IsobmffParser(PositionalDataBuffer(self.source), self.debug)
+        return list(parser.iterboxheaders())
+
+    @cached_property
+    def ftyp(self):
+        """The ftyp box, or the styp box of a media segment; None if there is neither"""
+        return self._first(("ftyp", "styp"))
+
+    @cached_property
+    def moov(self):
+        """
+        The moov box, with the sums of the stts, stsz and stz2 boxes in place of their
+        entries and the contents of the other sample tables skipped; None if there is no moov
+        """
+        return self._first(("moov",), summary=True)
+
+    @cached_property
+    def tracks(self):
+        """The list of Tracks"""
+        if self.moov is None:
+            return []
+        return [Track(trak) for trak in self.moov.children if trak.boxtype == "trak"]
+
+    @property
+    def codecs(self):
+        """The sample entry fourcc of each track that has one"""
+        return [track.codec for track in self.tracks if track.codec]
+
+    @cached_property
+    def duration(self):
+        """Duration in seconds from the mvhd, or the mehd of fragmented files; None if unknown"""
+        mvhd = self.moov.find_child("mvhd") if self.moov is not None else None
+        if mvhd is None or not mvhd.timescale:
+            return None
+        duration = mvhd.duration
+        mehd = self.moov.find_descendant("mehd")
+        if not duration and mehd is not None:
+            duration = mehd.fragment_duration
+        return duration / mvhd.timescale if duration else None
+
+    @cached_property
+    def is_fragmented(self):
+        """Whether the file has moof boxes, or is an init segment with a mvex box"""
+        if any(header.boxtype == "moof" for header in self.headers):
+            return True
+        return self.moov is not None and self.moov.find_child("mvex") is not None
+
+    @cached_property
+    def is_faststart(self):
+        """Whether the moov is in front of the first mdat"""
+        fourccs = [header.boxtype for header in self.headers]
+        if "moov" not in fourccs:
+            return False
+        return "mdat" not in fourccs or fourccs.index("moov") < fourccs.index("mdat")
+
+    @cached_property
+    def fragments(self):
+        """The parsed moof boxes, in file order"""
+        return [
+            self._parse_box(header)
+            for header in self.headers
+            if header.boxtype == "moof"
+        ]
+
+
+def open_file(path, debug=False):
+    """Open a file for its properties; exported as mp4viewer.open"""
+    return Mp4File(path, debug)
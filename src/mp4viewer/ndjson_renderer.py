@@ -0,0 +1,98 @@
+""" newline delimited json renderer """
+
+import sys
+import json
+
+from mp4viewer.tree import plain_value, resolve_display_value
+from mp4viewer.isobmff.box import Box
+from mp4viewer.isobmff.parser import getboxdesc
+
+
+class NdjsonRenderer:
+    """
+    Write one json object per line for each box, so that the output can be streamed and split.
+    Each box record carries the path, offset, size and fourcc of the box along with its fields.
+    Long arrays are written as separate records of type "array" that refer to the box offset.
+    """
+
+    # Arrays longer than this are written as their own records
+    ARRAY_RECORD_THRESHOLD = 16
+
+    def __init__(self, mp4_path, output=None):
+        self.mp4_path = mp4_path
+        self.output = sys.stdout if output is None else output
+
+    def _write(self, record):
+        self.output.write(json.dumps(record, separators=(",", ":"), default=str))
+        self.output.write("\n")
+
+    def render(self, boxes):
+        """Write records for each of the boxes; `boxes` can be a generator"""
+        for box in boxes:
+            self.add_box(box, None, "")
+
+    @staticmethod
+    def _add_field(fields, name, value):
+        if name in fields:
+            # Some boxes repeat a field name for each entry of a table
+            if not isinstance(fields[name], list):
+                fields[name] = [fields[name]]
+            fields[name].append(value)
+        else:
+            fields[name] = value
+
+    def _array_record(self, box, path, name, values):
+        record = {
+            "type": "array",
+            "file": self.mp4_path,
+            "path": path,
+            "offset": box.buffer_offset,
+            "name": name,
+        }
+        # Arrays with items of different types, such as None and int, have no dtype
+        types = {type(v).__name__ for v in values}
+        if len(types) == 1:
+            record["dtype"] = types.pop()
+        record["count"] = len(values)
+        record["values"] = values
+        return record
+
+    def add_box(self, box, parent, parent_path):
+        """write the record for `box` followed by its arrays and children"""
+        path = f"{parent_path}/{box.boxtype}" if parent_path else box.boxtype
+        fields = {}
+        arrays = []
+        children = []
+        for field in box.generate_fields():
+            if isinstance(field, Box):
+                children.append(field)
+                continue
+            name, value = field[0], plain_value(field[1])
+            display_value = resolve_display_value(field[2] if len(field) == 3 else None)
+            if (
+                isinstance(value, list)
+                and len(value) > NdjsonRenderer.ARRAY_RECORD_THRESHOLD
+            ):
+                arrays.append((name, value))
+                continue
+            if display_value is not None:
+                value = {"raw value": value, "decoded": display_value}
+            self._add_field(fields, name, value)
+
+        self._write(
+            {
+                "type": "box",
+                "file": self.mp4_path,
+                "path": path,
+                "offset": box.buffer_offset,
+                "parent": None if parent is None else parent.buffer_offset,
+                "size": box.size,
+                "fourcc": box.boxtype,
+                "description": getboxdesc(box.boxtype),
+                "fields": fields,
+            }
+        )
+        for name, values in arrays:
+            self._write(self._array_record(box, path, name, values))
+        for child in children + box.children:
+            self.add_box(child, box, path)
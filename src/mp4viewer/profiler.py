@@ -0,0 +1,204 @@
+""" Per box type timing of the parser, for --profile """
+
+import sys
+import json
+import time
+import functools
+import contextlib
+from collections import Counter, defaultdict
+
+from mp4viewer.datasource import DataBuffer
+from mp4viewer.isobmff.box import Box
+
+# DataBuffer methods whose calls are counted; calls made from within another counted method
+# (e.g. readint from readint32) are not counted again, except for readmore which does the I/O
+COUNTED_METHODS = (
+    "readbyte",
+    "readint16",
+    "readint32",
+    "readint64",
+    "readint",
+    "readbits",
+    "readbytes",
+    "readstr",
+    "read_cstring",
+    "peekint",
+    "peekstr",
+    "peekbits",
+    "skipbytes",
+    "seekto",
+    "readmore",
+)
+
+
+class BoxStats:
+    """Totals for a box type"""
+
+    # pylint: disable=too-few-public-methods
+    __slots__ = ("count", "bytes", "inclusive", "exclusive", "calls")
+
+    def __init__(self):
+        self.count = 0
+        self.bytes = 0
+        # seconds, including and excluding the time spent in child boxes
+        self.inclusive = 0.0
+        self.exclusive = 0.0
+        self.calls = Counter()
+
+
+class _Frame:
+    """A box that is being parsed"""
+
+    # pylint: disable=too-few-public-methods
+    __slots__ = ("box", "child_time", "calls")
+
+    def __init__(self, box):
+        self.box = box
+        self.child_time = 0.0
+        self.calls = Counter()
+
+
+def _box_path(box):
+    path = []
+    while box is not None:
+        path.append(getattr(box, "boxtype", "????"))
+        box = box.parent
+    return ";".join(reversed(path))
+
+
+class ParseProfiler:
+    """
+    Context manager that instruments Box.__init__ and the DataBuffer read methods while it is
+    active, and collects the time, bytes, instance counts and DataBuffer calls of each box
+    type. phase() times the other stages of a run, like building the tree and rendering.
+    """
+
+    def __init__(self):
+        self.stats = defaultdict(BoxStats)
+        # exclusive seconds of each path of box types, for flamegraphs
+        self.stacks = Counter()
+        self.phases = Counter()
+        self.calls_outside_boxes = Counter()
+        self._stack = []
+        self._depth = 0
+        self._saved = {}
+
+    def __enter__(self):
+        self._saved = {"__init__": Box.__init__}
+        Box.__init__ = self._wrap_init(Box.__init__)
+        for name in COUNTED_METHODS:
+            self._saved[name] = getattr(DataBuffer, name)
+            setattr(DataBuffer, name, self._wrap_method(name, self._saved[name]))
+        return self
+
+    def __exit__(self, *args):
+        Box.__init__ = self._saved.pop("__init__")
+        for name, method in self._saved.items():
+            setattr(DataBuffer, name, method)
+        self._saved = {}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Add the time spent in the with block to the named phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - start
+
+    def _wrap_init(self, init):
+        @functools.wraps(init)
+        def wrapper(box, parser, parent=None, is_container=False):
+            frame = _Frame(box)
+            self._stack.append(frame)
+            start = time.perf_counter()
+            try:
+                init(box, parser, parent, is_container)
+            finally:
+                elapsed = time.perf_counter() - start
+                self._stack.pop()
+                self._add_box(frame, elapsed)
+                if self._stack:
+                    self._stack[-1].child_time += elapsed
+
+        return wrapper
+
+    def _add_box(self, frame, elapsed):
+        box = frame.box
+        stats = self.stats[getattr(box, "boxtype", "????")]
+        stats.count += 1
+        stats.bytes += getattr(box, "size", 0)
+        stats.inclusive += elapsed
+        stats.exclusive += elapsed - frame.child_time
+        stats.calls.update(frame.calls)
+        self.stacks[_box_path(box)] += elapsed - frame.child_time
+
+    def _wrap_method(self, name, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            if self._depth == 0 or name == "readmore":
+                calls = (
+                    self._stack[-1].calls if self._stack else self.calls_outside_boxes
+                )
+                calls[name] += 1
+            self._depth += 1
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._depth -= 1
+
+        return wrapper
+
+    def to_dict(self):
+        """The report as a json serialisable dict"""
+        return {
+            "boxes": {
+                fourcc: {
+                    "count": s.count,
+                    "bytes": s.bytes,
+                    "inclusive_seconds": s.inclusive,
+                    "exclusive_seconds": s.exclusive,
+                    "databuffer_calls": dict(s.calls),
+                }
+                for fourcc, s in self.stats.items()
+            },
+            "calls_outside_boxes": dict(self.calls_outside_boxes),
+            "phases": dict(self.phases),
+        }
+
+    def write_table(self, output):
+        """Write the boxes sorted by the time spent in them, followed by the phases"""
+        output.write(
+            f"{'fourcc':<8}{'count':>10}{'bytes':>14}{'incl s':>10}{'excl s':>10}"
+            f"{'calls':>12}  top calls\n"
+        )
+        rows = sorted(self.stats.items(), key=lambda item: -item[1].exclusive)
+        for fourcc, s in rows:
+            top = ", ".join(f"{n}={c}" for n, c in s.calls.most_common(3))
+            output.write(
+                f"{fourcc:<8}{s.count:>10}{s.bytes:>14}{s.inclusive:>10.3f}"
+                f"{s.exclusive:>10.3f}{sum(s.calls.values()):>12}  {top}\n"
+            )
+        for name, seconds in self.phases.items():
+            output.write(f"{name + ' total':<32}{seconds:>10.3f}\n")
+
+    def write_collapsed(self, output):
+        """Write the exclusive time of each stack of box types in microseconds, in the
+        collapsed stack format read by flamegraph.pl and speedscope"""
+        for path, seconds in sorted(self.stacks.items()):
+            output.write(f"{path} {round(seconds * 1e6)}\n")
+        # The phases other than parsing are shown as stacks of their own
+        for name, seconds in self.phases.items():
+            if name != "parse":
+                output.write(f"[{name}] {round(seconds * 1e6)}\n")
+
+    def write_report(self, report_format="table", output=None):
+        """Write the report as a table, json or collapsed stacks"""
+        output = sys.stderr if output is None else output
+        if report_format == "json":
+            json.dump(self.to_dict(), output, indent=2)
+            output.write("\n")
+        elif report_format == "collapsed":
+            self.write_collapsed(output)
+        else:
+            self.write_table(output)
@@ -0,0 +1,105 @@
+""" Export the per track sample tables to column files """
+
+import os
+import csv
+import sys
+import struct
+import argparse
+
+from mp4viewer.isobmff.parser import parse_file
+from mp4viewer.isobmff.samples import SampleTable, get_sample_tables
+
+# numpy dtype descriptions for the array typecodes used by SampleTable
+_NPY_DTYPES = {
+    "q": ("<" if sys.byteorder == "little" else ">") + "i8",
+    "B": "|u1",
+}
+
+
+def write_npy(values, path):
+    """Write an array as a one dimensional .npy (version 1.0) file"""
+    header = (
+        f"{{'descr': '{_NPY_DTYPES[values.typecode]}', 'fortran_order': False, "
+        f"'shape': ({len(values)},), }}"
+    )
+    # magic, version and header length take 10 bytes; the data should be 64 byte aligned
+    padding = -(10 + len(header) + 1) % 64
+    header = header + " " * padding + "\n"
+    with open(path, "wb") as fd:
+        fd.write(b"\x93NUMPY\x01\x00")
+        fd.write(struct.pack("<H", len(header)))
+        fd.write(header.encode("latin1"))
+        values.tofile(fd)
+
+
+def write_csv(table, path):
+    """Write all the columns of the table in to a csv file"""
+    with open(path, "w", encoding="utf-8", newline="") as fd:
+        writer = csv.writer(fd)
+        writer.writerow(SampleTable.COLUMNS)
+        writer.writerows(zip(*[table.column(name) for name in SampleTable.COLUMNS]))
+
+
+def export_sample_tables(tables, output_dir, prefix, output_format="csv"):
+    """
+    Write each of the sample tables to `output_dir`.
+    csv creates one file per track; npy creates one file per column of each track.
+    Returns the list of files written.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for track_id, table in sorted(tables.items()):
+        base = os.path.join(output_dir, f"{prefix}.track{track_id}")
+        if output_format == "csv":
+            paths.append(f"{base}.csv")
+            write_csv(table, paths[-1])
+        elif output_format == "npy":
+            for name in SampleTable.COLUMNS:
+                paths.append(f"{base}.{name}.npy")
+                write_npy(table.column(name), paths[-1])
+        else:
+            raise ValueError(f"Unknown sample table format {output_format}")
+    return paths
+
+
+def add_format_argument(parser):
+    """Add the -f option of the commands that export sample tables"""
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=["csv", "npy"],
+        default="csv",
+        dest="output_format",
+        help="csv writes one file per track, npy writes one numpy array file per column",
+    )
+
+
+def main(argv):
+    """the `samples` command"""
+    parser = argparse.ArgumentParser(
+        prog="mp4viewer samples",
+        description="Export the sample table of each track (index, dts, cts, size, offset, "
+        "sync and chunk) from the stbl and trun boxes of an mp4 file.",
+    )
+    parser.add_argument(
+        "-d",
+        "--output-dir",
+        default=".",
+        help="Directory where the column files are written; defaults to $PWD",
+    )
+    add_format_argument(parser)
+    parser.add_argument(
+        "--debug", action="store_true", help="Used for internal debugging"
+    )
+    parser.add_argument("input_file", help="Location of the ISO bmff file (mp4)")
+    args = parser.parse_args(argv)
+
+    tables = get_sample_tables(parse_file(args.input_file, args.debug))
+    prefix = os.path.basename(args.input_file)
+    export_sample_tables(tables, args.output_dir, prefix, args.output_format)
+    for track_id, table in sorted(tables.items()):
+        print(
+            f"track {track_id} ({table.handler}): {len(table)} samples, "
+            f"timescale {table.timescale}"
+        )
+    return 0
@@ -0,0 +1,176 @@
+""" Parse the media segments of a DASH/CMAF stream in to one timeline per track """
+
+import os
+import re
+import glob
+import argparse
+from collections import namedtuple
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+from mp4viewer.isobmff.parser import parse_file
+from mp4viewer.isobmff.samples import (
+    SampleTable,
+    get_sample_tables,
+    get_track_contexts,
+)
+from mp4viewer.isobmff.utils import error_print, positive_int
+from mp4viewer.sample_export import add_format_argument, export_sample_tables
+
+# Where the samples and fragments of a media segment are in the SampleTable of a track
+SegmentSamples = namedtuple(
+    "SegmentSamples",
+    ["path", "first_sample", "sample_count", "first_fragment", "fragment_count"],
+)
+
+
+def _natural_key(path):
+    """Sort key that puts seg-2.m4s before seg-10.m4s"""
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", path)]
+
+
+def expand_segment_paths(patterns):
+    """
+    Expand the glob patterns in the list of segment paths. The matches of each pattern are
+    sorted by the numbers in their names; paths without wildcards are kept as they are.
+    Raises FileNotFoundError if a pattern matches nothing.
+    """
+    paths = []
+    for pattern in patterns:
+        if not any(c in pattern for c in "*?["):
+            paths.append(pattern)
+            continue
+        matches = sorted(glob.glob(pattern), key=_natural_key)
+        if not matches:
+            raise FileNotFoundError(f"No segments match {pattern}")
+        paths.extend(matches)
+    return paths
+
+
+def parse_segment(path, contexts, debug=False):
+    """
+    Parse a media segment and return the dict of track id -> SampleTable of its samples.
+    `contexts` are the TrackContexts of the init segment, which resolve the trex defaults.
+    """
+    return get_sample_tables(parse_file(path, debug), contexts)
+
+
+class SegmentTimeline:
+    """
+    The SampleTable of each track of an init segment, continued by each of its media
+    segments in order. The sample offsets are relative to the segment of the sample;
+    `segments` has the list of SegmentSamples of each track.
+    """
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, contexts):
+        self.contexts = contexts
+        self.tables = {
+            track_id: SampleTable(track_id, context.timescale, context.handler)
+            for track_id, context in contexts.items()
+        }
+        self.segments = {track_id: [] for track_id in contexts}
+
+    def add_segment(self, path, tables):
+        """Append the sample tables of the next media segment, as returned by parse_segment"""
+        for track_id, table in tables.items():
+            if track_id not in self.tables:
+                self.tables[track_id] = SampleTable(
+                    track_id, table.timescale, table.handler
+                )
+                self.segments[track_id] = []
+            timeline = self.tables[track_id]
+            self.segments[track_id].append(
+                SegmentSamples(
+                    path,
+                    len(timeline),
+                    len(table),
+                    len(timeline.fragments),
+                    len(table.fragments),
+                )
+            )
+            timeline.extend(table)
+
+
+def load_segments(init_path, segment_paths, jobs=None, debug=False):
+    """
+    Parse the init segment, then parse the media segments in a process pool with the track
+    contexts of the init segment, and merge their samples in to a SegmentTimeline in the
+    order of `segment_paths`. `jobs` is the number of processes; 1 parses in this process.
+    """
+    contexts = get_track_contexts(parse_file(init_path, debug))
+    timeline = SegmentTimeline(contexts)
+    worker = partial(parse_segment, contexts=contexts, debug=debug)
+    if jobs == 1:
+        for path in segment_paths:
+            timeline.add_segment(path, worker(path))
+        return timeline
+    # Segments are small, so each process is sent several of them at a time
+    chunksize = max(1, len(segment_paths) // (4 * (jobs or os.cpu_count() or 1)))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for path, tables in zip(
+            segment_paths, executor.map(worker, segment_paths, chunksize=chunksize)
+        ):
+            timeline.add_segment(path, tables)
+    return timeline
+
+
+def main(argv):
+    """the `segments` command"""
+    parser = argparse.ArgumentParser(
+        prog="mp4viewer segments",
+        description="Parse the media segments of a DASH/CMAF stream with the track "
+        "defaults and timescales of its init segment, and join their samples in to one "
+        "timeline per track.",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=positive_int,
+        help="Number of worker processes; defaults to the number of cpus",
+    )
+    parser.add_argument(
+        "-d",
+        "--output-dir",
+        help="Export the sample table of each track to this directory, as the samples "
+        "command does. The offsets are relative to the segment of each sample.",
+    )
+    add_format_argument(parser)
+    parser.add_argument(
+        "--debug", action="store_true", help="Used for internal debugging"
+    )
+    parser.add_argument("init_segment", help="The init segment (ftyp and moov)")
+    parser.add_argument(
+        "segments",
+        nargs="+",
+        help="Media segments in timeline order, or glob patterns such as 'seg-*.m4s' "
+        "whose matches are sorted by the numbers in their names",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        paths = expand_segment_paths(args.segments)
+        timeline = load_segments(args.init_segment, paths, args.jobs, args.debug)
+        if args.output_dir:
+            prefix = os.path.basename(args.init_segment)
+            export_sample_tables(
+                timeline.tables, args.output_dir, prefix, args.output_format
+            )
+    except OSError as e:
+        error_print(str(e))
+        return 1
+    for track_id, table in sorted(timeline.tables.items()):
+        start = table.dts[0] if len(table) else 0
+        end = table.next_dts
+        span = (
+            f", {start / table.timescale:.3f} s to {end / table.timescale:.3f} s"
+            if table.timescale
+            else ""
+        )
+        print(
+            f"track {track_id} ({table.handler}): {len(table)} samples in "
+            f"{len(timeline.segments[track_id])} segments "
+            f"({len(table.fragments)} fragments), timescale {table.timescale}{span}"
+        )
+    return 0
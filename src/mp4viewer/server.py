@@ -0,0 +1,291 @@
+""" Local http service to inspect mp4 files without starting the cli for each query """
+
+import os
+import re
+import json
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from mp4viewer.tree import plain_value, resolve_display_value
+from mp4viewer.isobmff.parser import parse_file, getboxdesc
+from mp4viewer.isobmff.samples import SampleTable, get_sample_tables
+from mp4viewer.isobmff.utils import positive_int
+
+# /files/{path}/tree, /files/{path}/box/{offset} and /files/{path}/track/{id}/samples
+ROUTE = re.compile(
+    r"^/files/(?P<path>.+?)/(?:(?P<tree>tree)|box/(?P<offset>\d+)|"
+    r"track/(?P<track_id>\d+)/samples)$"
+)
+
+# Number of samples returned when the `to` parameter is not given
+DEFAULT_SAMPLE_COUNT = 1000
+
+
+class HttpError(Exception):
+    """Error that is sent to the client with the given status code"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _json_default(value):
+    if isinstance(value, bytes):
+        return value.hex()
+    try:
+        return list(value)
+    except TypeError:
+        return str(value)
+
+
+class ParsedFile:
+    """The boxes of a file, and its sample tables which are built on first use"""
+
+    def __init__(self, path, debug=False):
+        self.path = path
+        self.boxes = parse_file(path, debug)
+        self._tables = None
+        self._lock = threading.Lock()
+
+    def sample_tables(self):
+        """dict of track_id to SampleTable"""
+        with self._lock:
+            if self._tables is None:
+                self._tables = get_sample_tables(self.boxes)
+            return self._tables
+
+    def find_box(self, offset, boxes=None):
+        """Return the box that starts at `offset` of the file, or None"""
+        for box in self.boxes if boxes is None else boxes:
+            if box.buffer_offset == offset:
+                return box
+            if box.buffer_offset < offset < box.buffer_offset + box.size:
+                found = self.find_box(offset, box.split_fields()[1])
+                if found is not None:
+                    return found
+        return None
+
+
+class FileCache:
+    """
+    LRU cache of parsed files shared by all requests.
+    Files are parsed in a thread pool; concurrent requests for a file wait for the same parse.
+    Entries are replaced when the size or modification time of the file changes.
+    """
+
+    def __init__(self, max_files=8, jobs=None, debug=False):
+        self.max_files = max_files
+        self.debug = debug
+        self.executor = ThreadPoolExecutor(max_workers=jobs)
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        """Return the ParsedFile for the path, parsing it if required"""
+        stat = os.stat(path)
+        key = (stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is None or entry[0] != key:
+                entry = (key, self.executor.submit(ParsedFile, path, self.debug))
+                self.entries[path] = entry
+            self.entries.move_to_end(path)
+            while len(self.entries) > self.max_files:
+                self.entries.popitem(last=False)
+        try:
+            return entry[1].result()
+        except Exception:
+            # Parse the file again on the next request instead of raising the same error
+            with self.lock:
+                if self.entries.get(path) is entry:
+                    del self.entries[path]
+            raise
+
+    def close(self):
+        """Stop the parsing threads"""
+        self.executor.shutdown(wait=False)
+
+
+def box_summary(box, depth):
+    """The box and `depth` levels of its descendants, without their fields"""
+    children = box.split_fields()[1]
+    summary = {
+        "fourcc": box.boxtype,
+        "description": getboxdesc(box.boxtype),
+        "offset": box.buffer_offset,
+        "size": box.size,
+        "child_count": len(children),
+    }
+    if depth > 1:
+        summary["children"] = [box_summary(child, depth - 1) for child in children]
+    return summary
+
+
+def box_details(box):
+    """The fields of the box and a summary of its children"""
+    fields, children = box.split_fields()
+    details = box_summary(box, 1)
+    details["fields"] = []
+    for field in fields:
+        record = {"name": field[0], "value": plain_value(field[1])}
+        if len(field) == 3:
+            record["display"] = resolve_display_value(field[2])
+        details["fields"].append(record)
+    details["children"] = [box_summary(child, 1) for child in children]
+    return details
+
+
+def sample_rows(table, start, end):
+    """The samples of the table in the range [start, end)"""
+    end = min(end, len(table))
+    columns = [table.column(name) for name in SampleTable.COLUMNS[1:]]
+    return {
+        "track_id": table.track_id,
+        "handler": table.handler,
+        "timescale": table.timescale,
+        "sample_count": len(table),
+        "from": start,
+        "to": max(start, end),
+        "columns": list(SampleTable.COLUMNS),
+        "samples": [
+            [index] + [column[index] for column in columns]
+            for index in range(start, end)
+        ],
+    }
+
+
+def _int_param(query, name, default):
+    """A non negative integer parameter of the query"""
+    try:
+        value = int(query[name][0]) if name in query else default
+    except ValueError as e:
+        raise HttpError(400, f"{name} should be an integer") from e
+    if value < 0:
+        raise HttpError(400, f"{name} should not be negative")
+    return value
+
+
+class InspectionHandler(BaseHTTPRequestHandler):
+    """Handles the GET requests; the server holds the root directory and the file cache"""
+
+    def _send_json(self, status, obj):
+        body = json.dumps(obj, default=_json_default).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _resolve_path(self, path):
+        """Path of the file in the served directory; files outside it are not served"""
+        root = os.path.realpath(self.server.root)
+        full_path = os.path.realpath(os.path.join(root, unquote(path)))
+        if not full_path.startswith(root + os.sep) or not os.path.isfile(full_path):
+            raise HttpError(404, f"No such file: {path}")
+        return full_path
+
+    def _handle(self, match, query):
+        parsed = self.server.cache.get(self._resolve_path(match["path"]))
+        if match["tree"]:
+            depth = _int_param(query, "depth", 1)
+            return [box_summary(box, depth) for box in parsed.boxes]
+        if match["offset"]:
+            box = parsed.find_box(int(match["offset"]))
+            if box is None:
+                raise HttpError(404, f"No box at offset {match['offset']}")
+            return box_details(box)
+        table = parsed.sample_tables().get(int(match["track_id"]))
+        if table is None:
+            raise HttpError(404, f"No track with id {match['track_id']}")
+        start = _int_param(query, "from", 0)
+        return sample_rows(
+            table, start, _int_param(query, "to", start + DEFAULT_SAMPLE_COUNT)
+        )
+
+    def do_GET(self):
+        # pylint: disable=invalid-name,missing-function-docstring
+        url = urlsplit(self.path)
+        match = ROUTE.match(url.path)
+        try:
+            if match is None:
+                raise HttpError(404, f"Unknown path {url.path}")
+            self._send_json(200, self._handle(match, parse_qs(url.query)))
+        except HttpError as e:
+            self._send_json(e.status, {"error": str(e)})
+        except Exception as e:  # pylint: disable=broad-except
+            # e.g. a file that is not an mp4 file, or one that was removed
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def log_message(self, format, *args):
+        # pylint: disable=redefined-builtin
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(root, host="127.0.0.1", port=8000, cache=None, verbose=False):
+    """Create the server; call serve_forever() on it to handle requests"""
+    server = ThreadingHTTPServer((host, port), InspectionHandler)
+    server.root = root
+    server.cache = FileCache() if cache is None else cache
+    server.verbose = verbose
+    return server
+
+
+def main(argv):
+    """the `serve` command"""
+    parser = argparse.ArgumentParser(
+        prog="mp4viewer serve",
+        description="Serve the boxes and sample tables of the mp4 files in a directory over "
+        "http. Parsed files are cached, so repeated queries do not parse the file again. "
+        "Endpoints: /files/{path}/tree?depth=N, /files/{path}/box/{offset} and "
+        "/files/{path}/track/{id}/samples?from=&to=",
+    )
+    parser.add_argument(
+        "--host", default="127.0.0.1", help="Address to listen on; 127.0.0.1 by default"
+    )
+    parser.add_argument(
+        "-p",
+        "--port",
+        type=int,
+        default=8000,
+        help="Port to listen on; 8000 by default",
+    )
+    parser.add_argument(
+        "-r",
+        "--root",
+        default=".",
+        help="Directory from which files are served; the current directory by default",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=positive_int,
+        default=8,
+        help="Number of parsed files kept in memory; 8 by default",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=positive_int,
+        help="Number of parsing threads; defaults to the ThreadPoolExecutor default",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log requests")
+    parser.add_argument(
+        "--debug", action="store_true", help="Used for internal debugging"
+    )
+    args = parser.parse_args(argv)
+
+    cache = FileCache(args.cache_size, args.jobs, args.debug)
+    server = make_server(args.root, args.host, args.port, cache, args.verbose)
+    print(f"Serving {args.root} on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        cache.close()
+    return 0
@@ -0,0 +1,218 @@
+""" Catalogue the boxes and sample tables of mp4 files in a sqlite database """
+
+import os
+import json
+import sqlite3
+import argparse
+from itertools import repeat
+
+from mp4viewer.tree import Attr, ArrayField
+from mp4viewer.isobmff.parser import parse_file
+from mp4viewer.isobmff.samples import get_sample_tables
+from mp4viewer.isobmff.utils import error_print
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, box_count INTEGER);
+CREATE TABLE IF NOT EXISTS boxes (
+    file TEXT, id INTEGER PRIMARY KEY, parent INTEGER, fourcc TEXT, offset INTEGER, size INTEGER
+);
+CREATE TABLE IF NOT EXISTS fields (box_id INTEGER, name TEXT, value);
+CREATE TABLE IF NOT EXISTS tracks (
+    file TEXT, track_id INTEGER, handler TEXT, timescale INTEGER, sample_count INTEGER
+);
+CREATE TABLE IF NOT EXISTS samples (
+    file TEXT, track_id INTEGER, sample_index INTEGER, dts INTEGER, cts INTEGER,
+    size INTEGER, offset INTEGER, sync INTEGER, chunk INTEGER
+);
+"""
+
+# Dropped before loading at least BULK_LOAD_FILES files and created after the data is
+# loaded, as maintaining them during bulk inserts is slower
+BULK_LOAD_FILES = 8
+INDEXES = {
+    "boxes_file": "boxes (file)",
+    "boxes_fourcc": "boxes (fourcc)",
+    "boxes_parent": "boxes (parent)",
+    "fields_box_id": "fields (box_id)",
+    "fields_name": "fields (name)",
+    "tracks_file": "tracks (file, track_id)",
+    "samples_file_track": "samples (file, track_id, sample_index)",
+}
+
+
+def _sql_value(value):
+    """Convert a field value to something sqlite can store"""
+    if isinstance(value, Attr):
+        value = value.value
+    if isinstance(value, ArrayField):
+        value = list(value.items)
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, int):
+        # sqlite integers are signed 64 bit
+        return value if -(1 << 63) <= value < (1 << 63) else str(value)
+    if isinstance(value, (str, float)) or value is None:
+        return value
+    return json.dumps(
+        value, default=lambda v: v.value if isinstance(v, Attr) else str(v)
+    )
+
+
+class SqliteCatalogue:
+    """
+    Writes the boxes, fields and sample tables of mp4 files in to a sqlite database.
+    Files are stored with their absolute paths, so that a.mp4 and ./a.mp4 are the same file.
+    """
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.executescript(SCHEMA)
+        row = self.conn.execute("SELECT MAX(id) FROM boxes").fetchone()
+        self.next_box_id = (row[0] or 0) + 1
+
+    def close(self):
+        """close the database"""
+        self.conn.close()
+
+    def has_file(self, path):
+        """Return true if the file is already in the catalogue"""
+        path = os.path.abspath(path)
+        cursor = self.conn.execute("SELECT 1 FROM files WHERE path = ?", (path,))
+        return cursor.fetchone() is not None
+
+    def drop_indexes(self):
+        """Drop the indexes before a bulk load"""
+        for name in INDEXES:
+            self.conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+    def create_indexes(self):
+        """Create the indexes after loading"""
+        with self.conn:
+            for name, columns in INDEXES.items():
+                self.conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {columns}")
+
+    def _delete_rows(self, path):
+        self.conn.execute(
+            "DELETE FROM fields WHERE box_id IN (SELECT id FROM boxes WHERE file = ?)",
+            (path,),
+        )
+        for table in ("boxes", "tracks", "samples"):
+            self.conn.execute(f"DELETE FROM {table} WHERE file = ?", (path,))
+        self.conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def remove_file(self, path):
+        """Delete all rows of a file"""
+        with self.conn:
+            self._delete_rows(os.path.abspath(path))
+
+    def _collect_box(self, box, parent_id, box_rows, field_rows):
+        box_id = self.next_box_id
+        self.next_box_id += 1
+        box_rows.append((box_id, parent_id, box.boxtype, box.buffer_offset, box.size))
+        fields, children = box.split_fields()
+        for field in fields:
+            field_rows.append((box_id, field[0], _sql_value(field[1])))
+        for child in children:
+            self._collect_box(child, box_id, box_rows, field_rows)
+
+    def add_file(self, path, boxes, replace=False):
+        """
+        Insert the boxes of a file and its sample tables in a single transaction. If
+        `replace` is set, the rows of an earlier copy of the file are deleted in the same
+        transaction, so that they are kept if the insert fails.
+        """
+        path = os.path.abspath(path)
+        box_rows = []
+        field_rows = []
+        for box in boxes:
+            self._collect_box(box, None, box_rows, field_rows)
+        tables = get_sample_tables(boxes)
+        with self.conn:
+            if replace:
+                self._delete_rows(path)
+            self.conn.execute(
+                "INSERT INTO files VALUES (?, ?, ?)",
+                (path, os.path.getsize(path), len(box_rows)),
+            )
+            self.conn.executemany(
+                "INSERT INTO boxes VALUES (?, ?, ?, ?, ?, ?)",
+                ((path,) + row for row in box_rows),
+            )
+            self.conn.executemany("INSERT INTO fields VALUES (?, ?, ?)", field_rows)
+            for track_id, table in tables.items():
+                self.conn.execute(
+                    "INSERT INTO tracks VALUES (?, ?, ?, ?, ?)",
+                    (path, track_id, table.handler, table.timescale, len(table)),
+                )
+                self.conn.executemany(
+                    "INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    zip(
+                        repeat(path),
+                        repeat(track_id),
+                        range(len(table)),
+                        table.dts,
+                        table.cts,
+                        table.size,
+                        table.offset,
+                        table.sync,
+                        table.chunk,
+                    ),
+                )
+
+    def add_files(self, paths, replace=False, debug=False):
+        """
+        Parse the files and add them to the catalogue. Files that are already in it are
+        replaced if `replace` is set, and skipped otherwise. The indexes are only dropped
+        for bulk loads of files that are not in the catalogue yet, as the deletes of the
+        replaced files need them; they are created again even if a file fails to load.
+        Returns the list of the paths that were skipped.
+        """
+        skipped = []
+        new_paths = {}
+        for path in dict.fromkeys(os.path.abspath(path) for path in paths):
+            if self.has_file(path) and not replace:
+                skipped.append(path)
+            else:
+                new_paths[path] = self.has_file(path)
+        if len(new_paths) >= BULK_LOAD_FILES and not any(new_paths.values()):
+            self.drop_indexes()
+        try:
+            for path, replaced in new_paths.items():
+                self.add_file(path, parse_file(path, debug), replaced)
+        finally:
+            self.create_indexes()
+        return skipped
+
+
+def main(argv):
+    """the `catalog` command"""
+    parser = argparse.ArgumentParser(
+        prog="mp4viewer catalog",
+        description="Add the boxes, fields and sample tables of mp4 files to a sqlite "
+        "database so that they can be queried across files.",
+    )
+    parser.add_argument(
+        "--replace",
+        action="store_true",
+        help="Replace files that are already in the database; they are skipped by default",
+    )
+    parser.add_argument(
+        "--debug", action="store_true", help="Used for internal debugging"
+    )
+    parser.add_argument("db_path", help="Location of the sqlite database")
+    parser.add_argument("input_files", nargs="+", help="ISO bmff files (mp4)")
+    args = parser.parse_args(argv)
+
+    catalogue = SqliteCatalogue(args.db_path)
+    try:
+        skipped = catalogue.add_files(args.input_files, args.replace, args.debug)
+    except OSError as e:
+        error_print(str(e))
+        return 1
+    finally:
+        catalogue.close()
+    for path in skipped:
+        error_print(f"Skipping {path}: already in {args.db_path}")
+    return 0
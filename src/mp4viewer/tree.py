@@ -1,18 +1,155 @@
 """ Defines the tree model used to represent the boxes """
 
-from dataclasses import dataclass
+
+def resolve_display_value(display_value):
+    """
+    Display values can be callables that are evaluated only when the value is displayed.
+    Returns the actual display value.
+    """
+    return display_value() if callable(display_value) else display_value
 
 
-@dataclass
 class Attr:
-    """An attribute of the tree"""
+    """
+    An attribute of the tree.
+    `display_value` can be a callable that returns the display value; it is called when the
+    display value is accessed for the first time.
+    """
+
+    __slots__ = ("name", "value", "_display_value")
 
     def __init__(self, name: str, value, display_value=None):
         if not isinstance(name, str):
             raise TypeError("name should be string")
         self.name = name
         self.value = value
-        self.display_value = display_value
+        self._display_value = display_value
+
+    @property
+    def display_value(self):
+        """The display value; deferred values are resolved and cached on first access"""
+        if callable(self._display_value):
+            self._display_value = self._display_value()
+        return self._display_value
+
+    def __repr__(self):
+        return f"Attr({self.name!r}, {self.value!r})"
+
+
+class ArrayField:
+    """
+    The value of an array field whose items are formatted only when they are displayed.
+    Boxes with large tables yield these from generate_fields(), so that the renderers do work
+    proportional to the part of the table that is actually shown.
+    If `item_name` is set, each displayed item is shown as an attribute of its own.
+    """
+
+    __slots__ = ("items", "formatter", "item_name")
+
+    def __init__(self, items, formatter=str, item_name=None):
+        self.items = items
+        self.formatter = formatter
+        self.item_name = item_name
+
+    def __len__(self):
+        return len(self.items)
+
+    def format_items(self, start, end):
+        """Return the formatted items in the range [start, end)"""
+        return [self.formatter(self.items[i]) for i in range(start, end)]
+
+
+class ArrayPage:
+    """
+    A range of the items of a long array (a list or an ArrayField), which the interactive
+    renderers show as a row that expands in to the items, or in to sub-pages if there are
+    too many of them
+    """
+
+    __slots__ = ("values", "start", "end")
+
+    def __init__(self, values, start=0, end=None):
+        self.values = values
+        self.start = start
+        self.end = len(values) if end is None else end
+
+    def __len__(self):
+        return self.end - self.start
+
+    def items(self):
+        """(label, formatted item) of each item of the page"""
+        if isinstance(self.values, ArrayField):
+            items = self.values.format_items(self.start, self.end)
+            if self.values.item_name is not None:
+                name = self.values.item_name
+                return [
+                    (f"{name} {i}", item)
+                    for i, item in enumerate(items, self.start + 1)
+                ]
+        else:
+            items = [str(self.values[i]) for i in range(self.start, self.end)]
+        return [(f"[{i}]", item) for i, item in enumerate(items, self.start)]
+
+    def pages(self, page_size):
+        """
+        The sub-pages of the page, each of page_size ** n items, so that there are no more
+        than page_size of them. Returns an empty list if the page has no more than page_size
+        items, which are shown as they are.
+        """
+        step = 1
+        while len(self) > step * page_size:
+            step *= page_size
+        if step == 1:
+            return []
+        return [
+            ArrayPage(self.values, start, min(start + step, self.end))
+            for start in range(self.start, self.end, step)
+        ]
+
+
+class ArrayWindow:
+    # pylint: disable=too-few-public-methods
+    """
+    Selects the items of long arrays that are displayed.
+    By default, the first `head` and the last `tail` items are shown. If `start` is set,
+    `count` items (or all the remaining items if count is None) from `start` are shown instead.
+    Arrays with no more than `threshold` items are always shown in full.
+    """
+
+    __slots__ = ("head", "tail", "start", "count", "threshold")
+
+    def __init__(self, head=3, tail=3, start=None, count=None, threshold=16):
+        self.head = head
+        self.tail = tail
+        self.start = start
+        self.count = count
+        self.threshold = threshold
+
+    def ranges(self, length):
+        """Return the list of [start, end) ranges of an array of `length` items to display"""
+        if length <= self.threshold:
+            return [(0, length)]
+        if self.start is not None:
+            start = min(self.start, length)
+            end = length if self.count is None else min(length, start + self.count)
+            return [(start, end)]
+        if length <= self.head + self.tail:
+            return [(0, length)]
+        head_and_tail = [(0, self.head), (length - self.tail, length)]
+        return [(start, end) for start, end in head_and_tail if end > start]
+
+
+def plain_value(value):
+    """Field value with the display helpers (Attr, ArrayField) replaced by raw values"""
+    if isinstance(value, ArrayField):
+        value = value.items
+    if isinstance(value, Attr):
+        return value.value
+    if isinstance(value, dict):
+        return {k: plain_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [plain_value(v) for v in value]
+    return value
 
 
 class Tree:
@@ -21,6 +158,8 @@ class Tree:
     TREE_TYPE_ATOM = 0
     TREE_TYPE_DICT = 1
 
+    __slots__ = ("name", "desc", "tree_type", "attrs", "children")
+
     def __init__(self, name, desc=None, tree_type=TREE_TYPE_ATOM):
         self.name = name
         self.desc = desc
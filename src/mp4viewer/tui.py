@@ -0,0 +1,261 @@
+""" curses based terminal renderer """
+
+import io
+import os
+import curses
+import contextlib
+
+from mp4viewer.tree import Attr, ArrayField, ArrayPage, resolve_display_value
+from mp4viewer.datasource import DataBuffer, MmapSource
+from mp4viewer.isobmff.parser import IsobmffParser, getboxdesc
+from mp4viewer.isobmff.utils import error_print
+
+
+class _Row:
+    """A line of the browser; `loader` returns the child rows when it is expanded"""
+
+    # pylint: disable=too-few-public-methods
+    __slots__ = ("text", "loader", "children", "expanded", "depth")
+
+    def __init__(self, text, loader=None):
+        self.text = text
+        self.loader = loader
+        self.children = None
+        self.expanded = False
+        self.depth = 0
+
+
+def _format_value(value, display_value):
+    display_value = resolve_display_value(display_value)
+    if display_value is None:
+        return str(value)
+    return f"{display_value} ({value})"
+
+
+def _page_rows(page):
+    """Rows for the items of the ArrayPage, or for its sub-pages if there are too many items"""
+    pages = page.pages(BoxBrowser.PAGE_SIZE)
+    if not pages:
+        return [_Row(f"{label}: {item}") for label, item in page.items()]
+    return [
+        _Row(
+            f"[{sub.start} - {sub.end - 1}]: {len(sub)} items",
+            lambda sub=sub: _page_rows(sub),
+        )
+        for sub in pages
+    ]
+
+
+def _dict_rows(item):
+    rows = []
+    for key, value in item.items():
+        if isinstance(value, Attr):
+            rows.append(
+                _Row(f"{key}: {_format_value(value.value, value.display_value)}")
+            )
+        else:
+            rows.append(_Row(f"{key}: {value}"))
+    return rows
+
+
+def _field_row(name, value, display_value=None):
+    """Row for a field yielded by generate_fields()"""
+    if isinstance(value, list) and len(value) > 0 and isinstance(value[0], dict):
+        return _Row(
+            f"{name}: [{len(value)} entries]",
+            lambda: [
+                _Row(f"{name} {index}", lambda item=item: _dict_rows(item))
+                for index, item in enumerate(value, 1)
+            ],
+        )
+    if isinstance(value, ArrayField) and len(value) <= BoxBrowser.INLINE_ITEMS:
+        value = value.format_items(0, len(value))
+    if isinstance(value, (list, ArrayField)) and len(value) > BoxBrowser.INLINE_ITEMS:
+        return _Row(
+            f"{name}: [{len(value)} items]",
+            lambda: _page_rows(ArrayPage(value)),
+        )
+    return _Row(f"{name}: {_format_value(value, display_value)}")
+
+
+def _visible_descendants(row):
+    """The children of the row, followed by the descendants of the expanded ones"""
+    for child in row.children:
+        child.depth = row.depth + 1
+        yield child
+        if child.expanded:
+            yield from _visible_descendants(child)
+
+
+def _box_row(box):
+    """Row for a parsed box; its fields are formatted when it is expanded"""
+
+    def load():
+        fields, children = box.split_fields()
+        rows = [_field_row(*field) for field in fields]
+        return rows + [_box_row(child) for child in children]
+
+    return _Row(f"{box.boxtype} ({getboxdesc(box.boxtype)})", load)
+
+
+class BoxBrowser:
+    """
+    The rows shown by the terminal renderer.
+    Only the headers of the top level boxes are read up front; a top level box is parsed when
+    it is expanded for the first time, and long arrays are shown as pages of items.
+    """
+
+    # Maximum number of items (or sub-pages) shown under a row of a long array
+    PAGE_SIZE = 100
+
+    # Arrays with no more than these many items are shown in a single row
+    INLINE_ITEMS = 16
+
+    def __init__(self, buf, debug=False):
+        self.parser = IsobmffParser(buf, debug)
+        self.errors = io.StringIO()
+        with contextlib.redirect_stderr(self.errors):
+            self.rows = [
+                _Row(
+                    f"{header.boxtype} ({getboxdesc(header.boxtype)}) "
+                    f"{header.size} bytes at {header.buffer_offset}",
+                    lambda offset=header.buffer_offset: self._parse_at(offset),
+                )
+                for header in self.parser.iterboxheaders()
+            ]
+
+    def _parse_at(self, offset):
+        box = self.parser.parse_box_at(offset)
+        return _box_row(box).loader()
+
+    def last_error(self):
+        """The last line of the errors printed by the parser, if any"""
+        lines = self.errors.getvalue().strip().splitlines()
+        return lines[-1] if lines else None
+
+    def expand(self, index):
+        """Show the children of the row at index"""
+        row = self.rows[index]
+        if row.loader is None or row.expanded:
+            return
+        if row.children is None:
+            with contextlib.redirect_stderr(self.errors):
+                try:
+                    row.children = row.loader()
+                except Exception as e:  # pylint: disable=broad-except
+                    # e.g. a truncated box; the row is left as it is
+                    self.errors.write(f"Failed to parse {row.text}: {e}\n")
+                    return
+        row.expanded = True
+        self.rows[index + 1 : index + 1] = list(_visible_descendants(row))
+
+    def collapse(self, index):
+        """Hide the descendants of the row at index"""
+        row = self.rows[index]
+        if not row.expanded:
+            return
+        end = index + 1
+        while end < len(self.rows) and self.rows[end].depth > row.depth:
+            end += 1
+        del self.rows[index + 1 : end]
+        row.expanded = False
+
+    def parent_index(self, index):
+        """Index of the parent of the row at index, or the index itself for top level rows"""
+        depth = self.rows[index].depth
+        while index > 0 and self.rows[index].depth >= depth > 0:
+            index -= 1
+        return index
+
+
+class TuiRenderer:
+    """
+    Interactive terminal browser.
+    The file is memory mapped, so that only the parts of it that are actually viewed are read.
+    """
+
+    # pylint: disable=too-few-public-methods
+    HELP = "arrows/hjkl: move, enter: expand/collapse, PgUp/PgDn, q: quit"
+
+    def __init__(self):
+        self.browser = None
+        self.cursor = 0
+        self.top = 0
+        self.title = ""
+
+    def render_file(self, path, debug=False):
+        """Browse the file until the user quits"""
+        self.title = path
+        with open(path, "rb") as fd:
+            # an empty file cannot be memory mapped, and has nothing to browse
+            if os.fstat(fd.fileno()).st_size == 0:
+                error_print(f"{path} is empty")
+                return
+            source = MmapSource(fd)
+            try:
+                self.browser = BoxBrowser(DataBuffer(source), debug)
+                curses.wrapper(self._run)
+            finally:
+                source.close()
+
+    def _draw(self, screen):
+        height, width = screen.getmaxyx()
+        rows = self.browser.rows
+        page = max(height - 1, 1)
+        if self.cursor < self.top:
+            self.top = self.cursor
+        elif self.cursor >= self.top + page:
+            self.top = self.cursor - page + 1
+        screen.erase()
+        for line, row in enumerate(rows[self.top : self.top + page]):
+            marker = " "
+            if row.loader is not None:
+                marker = "-" if row.expanded else "+"
+            text = f"{'  ' * row.depth}{marker} {row.text}"
+            attr = curses.A_REVERSE if self.top + line == self.cursor else 0
+            if row.depth == 0:
+                attr |= curses.A_BOLD
+            screen.addnstr(line, 0, text, width - 1, attr)
+        status = self.browser.last_error() or f"{self.title}  |  {self.HELP}"
+        screen.addnstr(height - 1, 0, status, width - 1, curses.A_DIM)
+        screen.refresh()
+        return page
+
+    def _toggle(self):
+        if self.browser.rows[self.cursor].expanded:
+            self.browser.collapse(self.cursor)
+        else:
+            self.browser.expand(self.cursor)
+
+    def _left(self):
+        if self.browser.rows[self.cursor].expanded:
+            self.browser.collapse(self.cursor)
+        else:
+            self.cursor = self.browser.parent_index(self.cursor)
+
+    def _run(self, screen):
+        curses.curs_set(0)
+        while self.browser.rows:
+            page = self._draw(screen)
+            key = screen.getch()
+            last = len(self.browser.rows) - 1
+            moves = {
+                curses.KEY_UP: -1,
+                ord("k"): -1,
+                curses.KEY_DOWN: 1,
+                ord("j"): 1,
+                curses.KEY_PPAGE: -page,
+                curses.KEY_NPAGE: page,
+                curses.KEY_HOME: -last,
+                curses.KEY_END: last,
+            }
+            if key in (ord("q"), 27):
+                break
+            if key in moves:
+                self.cursor = min(max(self.cursor + moves[key], 0), last)
+            elif key in (curses.KEY_RIGHT, ord("l")):
+                self.browser.expand(self.cursor)
+            elif key in (curses.KEY_LEFT, ord("h")):
+                self._left()
+            elif key in (curses.KEY_ENTER, 10, 13, ord(" ")):
+                self._toggle()
@@ -0,0 +1,71 @@
+"""Builders for the bytes of the boxes used by the tests"""
+
+import struct
+
+
+def box(fourcc, payload=b""):
+    """Bytes of a box with a 32 bit size"""
+    return struct.pack(">I", 8 + len(payload)) + fourcc.encode() + payload
+
+
+def full_box(fourcc, payload=b"", version=0, flags=0):
+    """Bytes of a full box"""
+    return box(fourcc, struct.pack(">I", version << 24 | flags) + payload)
+
+
+def tkhd(track_id):
+    """Track header with the given track id and zeros for the other fields"""
+    return full_box(
+        "tkhd", struct.pack(">III", 0, 0, track_id) + bytes(4 + 4 + 8 + 8 + 36 + 8)
+    )
+
+
+def mdia(timescale, handler, stbl=b""):
+    """Media box with a mdhd, a hdlr and a minf holding `stbl`"""
+    mdhd = full_box("mdhd", struct.pack(">IIIIHH", 0, 0, timescale, 0, 0, 0))
+    hdlr = full_box("hdlr", bytes(4) + handler.encode() + bytes(12) + b"\0")
+    return box("mdia", mdhd + hdlr + box("minf", stbl))
+
+
+def table(fourcc, entries, fmt):
+    """Full box with an entry count followed by the entries packed with `fmt`"""
+    payload = struct.pack(">I", len(entries))
+    for entry in entries:
+        payload += struct.pack(fmt, *entry)
+    return full_box(fourcc, payload)
+
+
+def progressive_moov():
+    """moov with a video track of 5 samples in 2 chunks (3 + 2); samples 1 and 4 are sync"""
+    stbl = box(
+        "stbl",
+        table("stts", [(5, 100)], ">II")
+        + table("ctts", [(1, 200), (4, 100)], ">II")
+        + full_box("stsz", struct.pack(">II", 0, 5) + struct.pack(">5I", *range(1, 6)))
+        + table("stsc", [(1, 3, 1), (2, 2, 1)], ">III")
+        + table("stco", [(1000,), (2000,)], ">I")
+        + table("stss", [(1,), (4,)], ">I"),
+    )
+    return box("moov", box("trak", tkhd(1) + mdia(1000, "vide", stbl)))
+
+
+def fragmented_file():
+    """moov with an audio track and trex defaults, followed by a moof with one trun of 3 samples"""
+    trex = full_box("trex", struct.pack(">IIIII", 2, 1, 10, 50, 0x00010000))
+    moov = box(
+        "moov",
+        box("trak", tkhd(2) + mdia(90000, "soun")) + box("mvex", trex),
+    )
+    # data offset, first sample flags and sample sizes; durations come from trex
+    trun = full_box(
+        "trun",
+        struct.pack(">IiI", 3, 100, 0) + struct.pack(">3I", 7, 8, 9),
+        flags=0x000205,
+    )
+    tfhd = full_box("tfhd", struct.pack(">I", 2), flags=0x020000)
+    tfdt = full_box("tfdt", struct.pack(">I", 5000))
+    moof = box(
+        "moof",
+        full_box("mfhd", struct.pack(">I", 1)) + box("traf", tfhd + tfdt + trun),
+    )
+    return moov + moof
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Test the asyncio facade"""
+
+import asyncio
+
+import mp4viewer
+from mp4viewer.aio import AsyncParser
+from mp4viewer.isobmff.parser import parse_file
+from tests import builders
+
+
+def _write(tmp_path, count):
+    paths = []
+    for index in range(count):
+        path = tmp_path / f"{index}.mp4"
+        path.write_bytes(builders.fragmented_file())
+        paths.append(str(path))
+    return paths
+
+
+def test_aparse(tmp_path):
+    """the boxes match the synchronous parser; the skeleton has no fields"""
+    path = _write(tmp_path, 1)[0]
+    boxes = asyncio.run(mp4viewer.aparse(path))
+    expected = parse_file(path)
+    assert [b.boxtype for b in boxes] == [b.boxtype for b in expected]
+    trun = boxes[1].find_descendant("trun")
+    assert trun.sample_count == expected[1].find_descendant("trun").sample_count
+
+    skeleton = asyncio.run(mp4viewer.aparse(path, skeleton=True))
+    trun = skeleton[1].find_descendant("trun")
+    assert trun.size == expected[1].find_descendant("trun").size
+    assert not hasattr(trun, "sample_count")
+
+
+def test_limit_and_cancel(tmp_path):
+    """no more than `limit` files are parsed at a time, and cancelled parses stop"""
+    paths = _write(tmp_path, 6)
+
+    async def run():
+        running = 0
+        peak = 0
+        async with AsyncParser(limit=2) as parser:
+
+            async def inspect(path):
+                nonlocal running, peak
+                count = 0
+                async for _ in parser.iterboxes(path):
+                    if count == 0:
+                        running += 1
+                        peak = max(peak, running)
+                    count += 1
+                    await asyncio.sleep(0.01)
+                running -= 1
+                return count
+
+            counts = await asyncio.gather(*(inspect(path) for path in paths))
+            assert counts == [2] * len(paths)
+
+            task = asyncio.ensure_future(parser.parse(paths[0]))
+            await asyncio.sleep(0)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            assert task.cancelled()
+        return peak
+
+    assert asyncio.run(run()) == 2
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Test the pages of long arrays shown by the interactive renderers"""
+
+import argparse
+
+from mp4viewer.__main__ import gui_box_to_node
+from mp4viewer.isobmff.parser import parse_file
+from mp4viewer.tree import ArrayField, ArrayPage, ArrayWindow
+from tests import builders
+
+
+def test_pages():
+    """sub-pages of page_size ** n items, down to pages of items"""
+    page = ArrayPage(list(range(250)))
+    assert len(page) == 250
+    pages = page.pages(100)
+    assert [(p.start, p.end) for p in pages] == [(0, 100), (100, 200), (200, 250)]
+    assert not pages[2].pages(100)
+    assert pages[2].items()[0] == ("[200]", "200")
+    assert len(pages[2].items()) == 50
+
+    pages = ArrayPage(list(range(10001))).pages(100)
+    assert [(p.start, p.end) for p in pages] == [(0, 10000), (10000, 10001)]
+    assert len(pages[0].pages(100)) == 100
+    assert not ArrayPage([]).pages(100) and not ArrayPage([]).items()
+
+
+def test_array_field_items():
+    """ArrayField items are formatted, and named if the field has an item name"""
+    assert ArrayPage(ArrayField(list(range(5)), hex), 3).items() == [
+        ("[3]", "0x3"),
+        ("[4]", "0x4"),
+    ]
+    named = ArrayField(list(range(250)), item_name="Offset")
+    pages = ArrayPage(named).pages(100)
+    assert pages[1].items()[0] == ("Offset 101", "100")
+
+
+def _node(path, array_window):
+    args = argparse.Namespace(array_window=array_window)
+    return gui_box_to_node(str(path), args)(parse_file(str(path))[0])
+
+
+def test_gui_box_to_node(tmp_path):
+    """arrays shown in full are kept whole for the gui, which pages them"""
+    path = tmp_path / "saio.mp4"
+    path.write_bytes(builders.table("saio", [(i,) for i in range(250)], ">I"))
+    node = _node(path, None)
+    assert node.name == "saio"
+    offsets = [attr for attr in node.attrs if attr.name == "Offsets"]
+    assert len(offsets) == 1 and isinstance(offsets[0].value, ArrayField)
+    assert not any(attr.name.strip().startswith("Offset ") for attr in node.attrs)
+    assert len(ArrayPage(offsets[0].value).pages(100)) == 3
+
+    # truncated arrays are expanded as the other renderers do
+    node = _node(path, ArrayWindow(head=2, tail=1))
+    names = [attr.name.strip() for attr in node.attrs]
+    assert "Offset 1" in names and "Offset 250" in names and "Offsets" not in names
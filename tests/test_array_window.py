@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Test the items of long arrays that are shown"""
+
+import argparse
+
+import pytest
+
+from mp4viewer.__main__ import add_array_field, main, parse_array_window
+from mp4viewer.tree import ArrayField, ArrayWindow, Tree
+
+
+def _shown(value, window):
+    node = Tree("test")
+    add_array_field(node, "items", value, window)
+    return [(attr.name, attr.value) for attr in node.attrs]
+
+
+def test_ranges():
+    """head and tail, start and count, and the threshold"""
+    window = ArrayWindow(head=2, tail=3, threshold=4)
+    assert window.ranges(4) == [(0, 4)]
+    # shorter than head + tail
+    assert window.ranges(5) == [(0, 5)]
+    assert window.ranges(6) == [(0, 2), (3, 6)]
+    assert ArrayWindow(head=0, tail=2, threshold=0).ranges(5) == [(3, 5)]
+    assert ArrayWindow(start=3, count=2, threshold=0).ranges(10) == [(3, 5)]
+    assert ArrayWindow(start=8, threshold=0).ranges(10) == [(8, 10)]
+    assert ArrayWindow(start=8, count=5, threshold=0).ranges(10) == [(8, 10)]
+    # past the end
+    assert ArrayWindow(start=12, count=5, threshold=0).ranges(10) == [(10, 10)]
+
+
+def test_formatting():
+    """lists and ArrayFields, with the items that are left out marked by ..."""
+    items = list(range(10))
+    head_tail = ArrayWindow(head=2, tail=1, threshold=3)
+    assert _shown(items, head_tail) == [("items", "[0,1 ... 9] 10 items")]
+    assert _shown(items, None) == [("items", items)]
+    assert _shown(items[:3], head_tail) == [("items", [0, 1, 2])]
+    hex_items = ArrayField(items, hex)
+    window = ArrayWindow(start=4, count=2, threshold=3)
+    assert _shown(hex_items, window) == [("items", "[... 0x4,0x5 ...] 10 items")]
+    assert _shown(hex_items, ArrayWindow(start=8, threshold=3)) == [
+        ("items", "[... 0x8,0x9] 10 items")
+    ]
+    nothing = ArrayWindow(head=0, tail=0, threshold=3)
+    assert _shown(items, nothing) == [("items", "[...] 10 items")]
+    past_end = ArrayWindow(start=20, threshold=3)
+    assert _shown(hex_items, past_end) == [("items", "[...] 10 items")]
+
+
+def test_items():
+    """ArrayFields with an item name are shown as one attribute per item"""
+    entries = ArrayField(list(range(10)), hex, "entry")
+    assert _shown(entries, ArrayWindow(head=1, tail=1, threshold=3)) == [
+        ("  entry 1", "0x0"),
+        ("  ...", "8 items"),
+        ("  entry 10", "0x9"),
+    ]
+    assert _shown(entries, ArrayWindow(start=20, threshold=3)) == [
+        ("  ...", "10 items")
+    ]
+
+
+def test_arguments(capsys):
+    """negative sizes and windows are rejected"""
+    assert parse_array_window("3") == (3, None)
+    assert parse_array_window("3:0") == (3, 0)
+    for text in ["-1", "1:-2", "1:2:3", "x"]:
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_array_window(text)
+    for argv in [["--array-head", "-1"], ["--array-tail", "-2"]]:
+        with pytest.raises(SystemExit):
+            main(argv + ["tests/moov.atom"])
+    assert "should not be negative" in capsys.readouterr().err
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Test the digests of the boxes of several files"""
+
+import os
+import hashlib
+
+import pytest
+
+from mp4viewer.box_hash import find_duplicates, hash_files, main
+from tests import builders
+
+
+def test_open_files(tmp_path):
+    """more files than the descriptor limit allows to be open at once"""
+    resource = pytest.importorskip("resource")
+    if not os.path.isdir("/proc/self/fd"):
+        pytest.skip("the open files are counted from /proc/self/fd")
+    paths = []
+    for index in range(60):
+        paths.append(str(tmp_path / f"{index}.mp4"))
+        with open(paths[-1], "wb") as fd:
+            fd.write(builders.box("free", bytes([index])) + builders.progressive_moov())
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    # the files that are already open, and a few to spare
+    limit = len(os.listdir("/proc/self/fd")) + 24
+    resource.setrlimit(resource.RLIMIT_NOFILE, (limit, hard))
+    try:
+        results = hash_files(paths, ["free"], jobs=4)
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+    assert [result.file for result in results] == paths
+    assert len({result.digest for result in results}) == 60
+
+
+def test_duplicates(tmp_path, capsys):
+    """two files with the same moov and different free boxes"""
+    moov = builders.progressive_moov()
+    paths = [str(tmp_path / "a.mp4"), str(tmp_path / "b.mp4")]
+    for index, path in enumerate(paths):
+        with open(path, "wb") as fd:
+            fd.write(builders.box("free", bytes([index])) + moov)
+    results = hash_files(paths, algorithm="sha256")
+    assert [result.path for result in results[:3]] == ["free", "moov", "moov/trak"]
+    assert results[1].offset == 9 and results[1].size == len(moov)
+    assert results[1].digest == hashlib.sha256(moov).hexdigest()
+    groups = find_duplicates(results)
+    # the free boxes differ; the moov and all its descendants are the same
+    assert len(groups) == len(results) // 2 - 1
+    moov_group = [group for group in groups if group[0].fourcc == "moov"][0]
+    assert [result.file for result in moov_group] == paths
+
+    results = hash_files(paths, ["free", "stsz"])
+    assert [(r.file, r.fourcc) for r in results] == [
+        (paths[0], "free"),
+        (paths[0], "stsz"),
+        (paths[1], "free"),
+        (paths[1], "stsz"),
+    ]
+    assert [group[0].fourcc for group in find_duplicates(results)] == ["stsz"]
+
+    assert main(["--duplicates-only", "-t", "moov"] + paths) == 0
+    out = capsys.readouterr().out
+    assert out.startswith("\n2 identical moov boxes")
+    assert f"{paths[1]} @ 9 (moov)" in out
+
+
+@pytest.mark.parametrize("jobs", ["0", "-1", "x"])
+def test_invalid_jobs(tmp_path, capsys, jobs):
+    """the number of threads is checked by the argument parser"""
+    path = tmp_path / "a.mp4"
+    path.write_bytes(builders.progressive_moov())
+    with pytest.raises(SystemExit):
+        main(["-j", jobs, str(path)])
+    assert "--jobs" in capsys.readouterr().err
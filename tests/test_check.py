@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Test the timeline continuity and alignment checks"""
+
+from collections import Counter
+
+import pytest
+
+from benchmarks import synth
+from mp4viewer.check import Rendition, check_renditions, main
+from mp4viewer.isobmff.samples import Fragment, SampleTable
+
+
+def _rendition(fragments, sync=None):
+    """a track with one sample per (decode time, duration) fragment, in a timescale of 1000"""
+    table = SampleTable(1, 1000, "vide")
+    for index, (decode_time, duration) in enumerate(fragments):
+        table.dts.append(decode_time)
+        table.sync.append(1 if sync is None else sync[index])
+        table.fragments.append(
+            Fragment(0, index + 1, index, 1, decode_time, decode_time, duration)
+        )
+    return Rendition("test", {1: table}, {1: list(range(len(fragments)))})
+
+
+def test_continuity():
+    """gaps and overlaps beyond the tolerance, and the drift of the smaller differences"""
+    fragments = [(0, 100), (100, 100), (250, 100), (340, 100)]
+    # differences of 1 ms are within the tolerance, but they add up to 3 ms
+    fragments += [(441, 100), (542, 100), (643, 100)]
+    issues = check_renditions(
+        [_rendition(fragments, [1, 1, 1, 0, 1, 1, 1])], tolerance=1, max_drift=2
+    )
+    assert [(issue.kind, issue.fragment) for issue in issues] == [
+        ("gap", 2),
+        ("overlap", 3),
+        ("drift", 6),
+        ("non-sync-start", 3),
+    ]
+    assert issues[0].time == 0.25
+    assert issues[0].detail.startswith("50 ticks (50.000 ms) after")
+
+
+def test_empty_fragments():
+    """fragments without samples are not segments for the alignment checks"""
+    fragments = [(0, 100), (100, 100), (200, 100)]
+    reference = _rendition(fragments)
+    rendition = _rendition(fragments, [1, 0, 1])
+    table = rendition.tables[1]
+    # a sparse track, with an empty fragment in the middle and at the end
+    table.fragments.insert(1, Fragment(0, 0, 1, 0, 100, 100, 0))
+    table.fragments.append(Fragment(0, 0, 3, 0, 300, 300, 0))
+    rendition.boundaries[1] = [0, 1, 1, 2, 3]
+    issues = check_renditions([reference, rendition])
+    assert [(issue.kind, issue.time) for issue in issues] == [
+        ("non-sync-start", 0.1),
+        ("missing-keyframe", 0.1),
+    ]
+
+
+def test_alignment(tmp_path):
+    """segments of 10 samples and of 15 samples only align every 30 samples"""
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    synth.write_segments(str(tmp_path / "a"), 1, 6, 10, 100)
+    synth.write_segments(str(tmp_path / "b"), 1, 4, 15, 100)
+    argv = ["-j", "1"]
+    for name in "ab":
+        argv += [
+            "-s",
+            str(tmp_path / name / "init.mp4"),
+            str(tmp_path / name / "*.m4s"),
+        ]
+    assert main(argv[:5]) == 0
+    assert main(argv) == 1
+    synth.write_fragmented(str(tmp_path / "a.mp4"), 1, 6, 10, 100)
+    # the files go in front of the -s options, which take the paths that follow them
+    assert main([str(tmp_path / "a.mp4")] + argv[:5]) == 0
+
+
+def test_alignment_issues(tmp_path, capsys):
+    """the kinds of issues and the keyframe times of the misaligned segments"""
+    (tmp_path / "b").mkdir()
+    synth.write_fragmented(str(tmp_path / "a.mp4"), 1, 6, 10, 100)
+    synth.write_segments(str(tmp_path / "b"), 1, 4, 15, 100)
+    argv = [str(tmp_path / "a.mp4"), "-s", str(tmp_path / "b" / "init.mp4")]
+    assert main(argv + [str(tmp_path / "b" / "seg-*.m4s")]) == 1
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[-1] == "10 issues in 10 track fragments"
+    kinds = Counter(line.split(": ")[1] for line in lines[:-1])
+    # the segments are the reference, with keyframes at 0, 15, 30 and 45 samples
+    assert kinds == {
+        "segment-count": 1,
+        "misaligned-segment": 3,
+        "misaligned-keyframe": 4,
+        "missing-keyframe": 2,
+    }
+    assert lines[-2].endswith(
+        " at 1.500 s: missing-keyframe: " + argv[-1] + " has a keyframe at this time"
+    )
+
+
+def test_missing_files(tmp_path, capsys):
+    """files that cannot be read are reported instead of raised"""
+    synth.write_segments(str(tmp_path), 1, 2, 10, 100)
+    init = str(tmp_path / "init.mp4")
+    assert main(["-j", "1", "-s", init, str(tmp_path / "missing.m4s")]) == 1
+    assert "missing.m4s" in capsys.readouterr().err
+    assert main([str(tmp_path / "missing.mp4")]) == 1
+    assert "missing.mp4" in capsys.readouterr().err
+
+
+def test_invalid_jobs(tmp_path, capsys):
+    """the number of processes should be more than zero"""
+    synth.write_fragmented(str(tmp_path / "a.mp4"), 1, 2, 10, 100)
+    with pytest.raises(SystemExit):
+        main(["-j", "-1", str(tmp_path / "a.mp4")])
+    assert "--jobs" in capsys.readouterr().err
@@ -12,7 +12,12 @@ Use xxd to edit binary files. It lets you convert between binary and hexdump for
 # pylint: disable=too-many-statements
 
 
-from mp4viewer.datasource import DataBuffer, FileSource
+from mp4viewer.datasource import (
+    DataBuffer,
+    FileSource,
+    PositionalFileSource,
+    PositionalDataBuffer,
+)
 
 
 class DataBufferTest:
@@ -124,5 +129,24 @@ def test_datasource():
     print("Success")
 
 
+def test_positional_datasource():
+    """The same reads with pread, with another buffer reading the same descriptor"""
+    with open("tests/1.dat", "rb") as f:
+        source = PositionalFileSource(f)
+        dbt = DataBufferTest(f)
+        dbt.buf = PositionalDataBuffer(source)
+        f.seek(0)
+        other = PositionalDataBuffer(source, 36)
+        dbt.run()
+        assert other.current_position() == 36
+        assert other.readbyte() == 0xFF
+        assert other.readstr(3) == "mp4"
+        other.seekto(2)
+        assert other.readstr(2) == "ZZ"
+        # the buffers do not use the file position
+        assert f.tell() == 0
+
+
 if __name__ == "__main__":
     test_datasource()
+    test_positional_datasource()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Test the structural diff"""
+
+import io
+import struct
+from array import array
+
+from mp4viewer.diff import BoxTreeDiff, first_difference
+from mp4viewer.isobmff.parser import parse_file
+from mp4viewer.isobmff.samples import get_sample_tables
+from tests import builders
+
+
+def test_first_difference():
+    """binary search for the first differing item"""
+    a = array("q", range(1000))
+    b = array("q", range(1000))
+    assert first_difference(a, b) is None
+    b[617] = -1
+    assert first_difference(a, b) == 617
+    assert first_difference(a, b[:10]) == 10
+    assert first_difference([1, 2], [0, 2]) == 0
+
+
+def test_diff(tmp_path):
+    """only the differing branches and samples are reported"""
+    path_a = tmp_path / "a.mp4"
+    path_b = tmp_path / "b.mp4"
+    ftyp = builders.box("ftyp", b"isom" + struct.pack(">I", 1))
+    path_a.write_bytes(ftyp + builders.progressive_moov())
+    path_b.write_bytes(
+        ftyp
+        + builders.progressive_moov().replace(
+            builders.full_box("stss", struct.pack(">III", 2, 1, 4)),
+            builders.full_box("stss", struct.pack(">III", 2, 1, 3)),
+        )
+    )
+    boxes_a = parse_file(str(path_a))
+    boxes_b = parse_file(str(path_b))
+
+    output = io.StringIO()
+    diff = BoxTreeDiff(output)
+    diff.compare_lists(boxes_a, boxes_a)
+    diff.compare_sample_tables(get_sample_tables(boxes_a), get_sample_tables(boxes_a))
+    assert diff.difference_count == 0
+
+    diff.compare_lists(boxes_a, boxes_b)
+    diff.compare_sample_tables(get_sample_tables(boxes_a), get_sample_tables(boxes_b))
+    lines = output.getvalue().splitlines()
+    assert lines == [
+        "! moov/trak/mdia/minf/stbl/stss: sample numbers: "
+        "first difference at index 1: 4 != 3 (2 vs 2 items)",
+        "! track 1: sync differs from sample 2: 0 != 1",
+    ]
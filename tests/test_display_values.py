@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Test that the deferred display values of the fields are resolved by the renderers"""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from mp4viewer.__main__ import get_tree
+from mp4viewer.console import ConsoleRenderer
+from mp4viewer.json_renderer import JsonRenderer
+from mp4viewer.isobmff.parser import parse_file
+from mp4viewer.isobmff.utils import ctime_since_1904
+from mp4viewer.tree import Attr
+
+# creation and modification time of the mvhd and tkhd of moov.atom
+CREATION_TIME = 3531256179
+
+
+def _tree():
+    path = "tests/moov.atom"
+    return get_tree(path, parse_file(path), SimpleNamespace(array_window=None))
+
+
+def _attrs(tree, fourcc):
+    moov = tree.children[0]
+    node = moov.children[0] if fourcc == "mvhd" else moov.children[1].children[0]
+    assert node.name == fourcc
+    return {attr.name: attr for attr in node.attrs}
+
+
+def test_attr_slots():
+    """Attr has no instance dict"""
+    attr = Attr("duration", 5, lambda: "5 s")
+    with pytest.raises(AttributeError):
+        setattr(attr, "unknown", 1)
+    assert not hasattr(attr, "__dict__")
+
+
+@pytest.mark.parametrize("fourcc", ["mvhd", "tkhd"])
+def test_console(fourcc, capsys):
+    """dates and durations are formatted when the tree is printed"""
+    tree = _tree()
+    attrs = _attrs(tree, fourcc)
+    # not formatted until they are displayed
+    # pylint: disable-next=protected-access
+    assert callable(attrs["creation time"]._display_value)
+    renderer = ConsoleRenderer()
+    renderer.disable_colors()
+    renderer.render(tree)
+    out = capsys.readouterr().out
+    created = f"creation time: {CREATION_TIME} <{ctime_since_1904(CREATION_TIME)}>"
+    assert created in out
+    assert "duration: 5096 <00m 05s>" in out
+    assert attrs["duration"].display_value == "00m 05s"
+
+
+def test_json(tmp_path, capsys):
+    """the json output has the formatted values as strings"""
+    output_path = tmp_path / "moov.json"
+    JsonRenderer("tests/moov.atom", str(output_path)).render(_tree())
+    assert capsys.readouterr().out.strip() == str(output_path)
+    moov = json.loads(output_path.read_text())["children"][0]
+    mvhd = moov["children"][0]
+    tkhd = moov["children"][1]["children"][0]
+    for box in (mvhd, tkhd):
+        assert box["creation time"] == {
+            "raw value": CREATION_TIME,
+            "decoded": ctime_since_1904(CREATION_TIME),
+        }
+        assert box["duration"] == {"raw value": 5096, "decoded": "00m 05s"}
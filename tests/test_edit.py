@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Test patching boxes in place"""
+
+import os
+import shutil
+
+import pytest
+
+from mp4viewer.edit import BoxEditor
+from mp4viewer.isobmff.parser import parse_file
+from tests import builders
+
+MOOV_PATH = os.path.join(os.path.dirname(__file__), "moov.atom")
+
+
+def _changed_bytes(a, b):
+    return [i for i, (x, y) in enumerate(zip(a, b)) if x != y]
+
+
+def test_patch_fields(tmp_path):
+    """tkhd flags, mvhd timescale and elst entries of a copy of moov.atom"""
+    path = tmp_path / "moov.atom"
+    shutil.copy(MOOV_PATH, path)
+    original = path.read_bytes()
+    with BoxEditor(str(path)) as editor:
+        editor.set_track_flags(editor.find("tkhd")[0], enabled=False)
+        editor.set_timescale(editor.find("mvhd")[0], 600)
+        editor.set_edit(editor.find("elst")[0], 0, media_time=0xFFFFFFFF)
+        with pytest.raises(ValueError):
+            editor.set_edit(editor.find("elst")[0], 0, duration=1)
+
+    changed = path.read_bytes()
+    assert len(changed) == len(original)
+    # one flag byte, the low bytes of the timescale, and the media time
+    assert len(_changed_bytes(original, changed)) <= 1 + 2 + 4
+    moov = parse_file(str(path))[0]
+    assert moov.find_descendant("tkhd").flags == 0x000006
+    assert moov.find_child("mvhd").timescale == 600
+    assert moov.find_descendant("elst").entries[0]["media_time"] == 0xFFFFFFFF
+
+
+def test_language_and_resize(tmp_path):
+    """mdhd language, and a box that grows in to the free box after it"""
+    path = tmp_path / "a.mp4"
+    ftyp = builders.box("ftyp", b"isom" + bytes(4))
+    moov = builders.box(
+        "moov", builders.box("trak", builders.tkhd(1) + builders.mdia(1000, "soun"))
+    )
+    path.write_bytes(ftyp + builders.box("free", bytes(32)) + moov)
+    with BoxEditor(str(path)) as editor:
+        editor.set_language(editor.find("mdhd")[0], "eng")
+        editor.replace_box(
+            editor.find("ftyp")[0], builders.box("ftyp", b"isom" + bytes(12))
+        )
+        assert [b.boxtype for b in editor.boxes] == ["ftyp", "free", "moov"]
+        assert editor.boxes[1].size == 40 - 8
+        # the moov does not move
+        assert editor.boxes[2].buffer_offset == len(ftyp) + 40
+        with pytest.raises(ValueError):
+            editor.replace_box(editor.find("ftyp")[0], builders.box("ftyp", bytes(64)))
+    boxes = parse_file(str(path))
+    assert boxes[0].brands == ["\0\0\0\0", "\0\0\0\0"]
+    assert boxes[2].find_descendant("mdhd").language == 0x15C7
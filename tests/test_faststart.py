@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Test moving the moov in front of the mdat"""
+
+import struct
+
+from mp4viewer import faststart
+from mp4viewer.isobmff.parser import parse_file
+from mp4viewer.isobmff.samples import get_sample_tables
+from tests import builders
+
+
+def _moov_last_file():
+    """ftyp, mdat and a moov with a 3 sample track whose samples are in the mdat"""
+    ftyp = builders.box("ftyp", b"isom" + bytes(4))
+    samples = [b"first", b"second", b"third"]
+    mdat_start = len(ftyp) + 8
+    stbl = builders.box(
+        "stbl",
+        builders.table("stts", [(3, 10)], ">II")
+        + builders.full_box(
+            "stsz", struct.pack(">II", 0, 3) + struct.pack(">3I", 5, 6, 5)
+        )
+        + builders.table("stsc", [(1, 1, 1)], ">III")
+        + builders.table(
+            "stco", [(mdat_start,), (mdat_start + 5,), (mdat_start + 11,)], ">I"
+        ),
+    )
+    moov = builders.box(
+        "moov",
+        builders.box("trak", builders.tkhd(1) + builders.mdia(1000, "vide", stbl)),
+    )
+    return ftyp + builders.box("mdat", b"".join(samples)) + moov, samples
+
+
+def _check_samples(path, samples):
+    table = get_sample_tables(parse_file(str(path)))[1]
+    data = path.read_bytes()
+    for offset, size, sample in zip(table.offset, table.size, samples):
+        assert data[offset : offset + size] == sample
+
+
+def test_faststart(tmp_path):
+    """the moov moves in front of the mdat and the chunk offsets follow the samples"""
+    data, samples = _moov_last_file()
+    src = tmp_path / "in.mp4"
+    dst = tmp_path / "out.mp4"
+    src.write_bytes(data)
+    _check_samples(src, samples)
+    layout = faststart.faststart(str(src), str(dst))
+    assert not layout.is_faststart
+    assert [b.boxtype for b in parse_file(str(dst))] == ["ftyp", "moov", "mdat"]
+    assert dst.stat().st_size == src.stat().st_size
+    _check_samples(dst, samples)
+
+    # Running it again is a plain copy
+    again = tmp_path / "again.mp4"
+    assert faststart.faststart(str(dst), str(again)).is_faststart
+    assert again.read_bytes() == dst.read_bytes()
+
+
+def test_co64_upgrade(tmp_path, monkeypatch):
+    """stco is upgraded to co64 when the new offsets do not fit"""
+    data, samples = _moov_last_file()
+    src = tmp_path / "in.mp4"
+    dst = tmp_path / "out.mp4"
+    src.write_bytes(data)
+    # Every offset after the moov is too large for this limit
+    monkeypatch.setattr(faststart, "MAX_STCO_OFFSET", 100)
+    faststart.faststart(str(src), str(dst))
+    stbl = parse_file(str(dst))[1].find_descendant("stbl")
+    assert stbl.find_child("stco") is None
+    assert stbl.find_child("co64").entry_count == 3
+    assert dst.stat().st_size == src.stat().st_size + 3 * 4
+    _check_samples(dst, samples)
+
+
+def test_copy_fallback(tmp_path, monkeypatch):
+    """copies fall back to reads and writes when the kernel cannot copy"""
+
+    def unsupported(*args):
+        raise OSError(faststart.errno.EXDEV, "cross device")
+
+    monkeypatch.setattr(faststart, "_copy_file_range", unsupported)
+    monkeypatch.setattr(faststart, "_sendfile", unsupported)
+    src = tmp_path / "in.bin"
+    src.write_bytes(bytes(range(256)) * 10)
+    with open(src, "rb") as fd, open(tmp_path / "out.bin", "wb", buffering=0) as out:
+        faststart.copy_range(fd, out, 10, 1000)
+    assert (tmp_path / "out.bin").read_bytes() == src.read_bytes()[10:1010]
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Test the I/O counters of --io-stats"""
+
+import io
+import json
+
+from benchmarks import synth
+from mp4viewer.__main__ import main
+from mp4viewer.datasource import DataBuffer, FileSource, CountingSource, IOStats
+from mp4viewer.iostats import IORecorder
+
+
+def test_counting_source(tmp_path):
+    """reads, seeks, refills and resets of a DataBuffer"""
+    path = tmp_path / "data.bin"
+    path.write_bytes(bytes(range(256)) * 256)
+    trace = io.StringIO()
+    stats = IOStats(trace)
+    with open(path, "rb") as fd:
+        buf = DataBuffer(CountingSource(FileSource(fd), stats))
+        assert buf.stats is stats
+        buf.skipbytes(DataBuffer.CHUNK_SIZE - 2)
+        # the two unread bytes are copied to the new buffer
+        assert buf.readint32() == 0xFEFF0001
+        buf.skipbytes(20000)
+        buf.seekto(1000)
+        assert buf.readbyte() == 1000 % 256
+    assert stats.refills == 3
+    assert stats.tail_join_bytes == 2
+    assert stats.resets == 1
+    assert stats.reads == 3
+    assert stats.bytes_read == 3 * DataBuffer.CHUNK_SIZE
+    # the skip moves the source from the end of the second chunk to 16386 + 20000, and
+    # seekto moves it back to 1000
+    assert stats.seeks == 2
+    assert stats.seek_distance == (36386 - 2 * DataBuffer.CHUNK_SIZE) + (36386 - 1000)
+    assert trace.getvalue().splitlines()[:2] == [
+        "read 0 16384 16384",
+        "read 16384 16384 16384",
+    ]
+
+
+def test_boxes(tmp_path):
+    """the mdat is skipped with a seek rather than read"""
+    path = tmp_path / "progressive.mp4"
+    synth.write_progressive(str(path), 1, 1000, 1000)
+    recorder = IORecorder()
+    boxes = recorder.parse_file(str(path))
+    fourccs = [box.boxtype for box in boxes]
+    assert [fourcc for fourcc, _, _, _ in recorder.boxes] == fourccs
+    mdat = recorder.boxes[fourccs.index("mdat")][3]
+    assert mdat["seeks"] == 1
+    assert mdat["bytes_read"] < DataBuffer.CHUNK_SIZE
+    total = recorder.stats.snapshot()
+    assert total["bytes_read"] < 2 * DataBuffer.CHUNK_SIZE
+    assert sum(box[3]["reads"] for box in recorder.boxes) <= total["reads"]
+
+
+def test_option(tmp_path, capsys):
+    """--io-stats json report and --io-trace"""
+    path = tmp_path / "progressive.mp4"
+    synth.write_progressive(str(path), 1, 100, 100)
+    trace = tmp_path / "trace.txt"
+    argv = ["-o", "ndjson", "--io-stats", "--io-stats-format", "json"]
+    assert main(argv + ["--io-trace", str(trace), str(path)]) == 0
+    report = json.loads(capsys.readouterr().err)
+    assert [box["fourcc"] for box in report["boxes"]] == ["ftyp", "moov", "mdat"]
+    assert report["total"]["reads"] == len(
+        [line for line in trace.read_text().splitlines() if line.startswith("read")]
+    )
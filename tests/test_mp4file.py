@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Test the properties of mp4viewer.open"""
+
+import pytest
+
+import mp4viewer
+from mp4viewer.__main__ import main
+from mp4viewer.isobmff import summary
+from benchmarks import synth
+
+
+def test_progressive(tmp_path):
+    """tracks and duration from the moov, without the sample tables"""
+    path = tmp_path / "progressive.mp4"
+    synth.write_progressive(str(path), 2, 300, 100)
+    with mp4viewer.open(str(path)) as mp4:
+        assert not mp4.is_fragmented
+        assert mp4.is_faststart
+        assert mp4.fragments == []
+        assert [track.track_id for track in mp4.tracks] == [1, 2]
+        track = mp4.tracks[0]
+        assert (track.handler, track.codec) == ("vide", "avc1")
+        assert (track.width, track.height) == (1920, 1080)
+        assert track.timescale == synth.TIMESCALE
+        assert mp4.codecs == ["avc1", "avc1"]
+        assert mp4.duration == track.duration > 0
+        # the sample tables were skipped
+        stsz = track.trak.find_descendant("stsz")
+        assert stsz is not None and not hasattr(stsz, "entries")
+
+
+def test_fragmented(tmp_path):
+    """moof boxes are parsed only for the fragments"""
+    path = tmp_path / "fragmented.mp4"
+    synth.write_fragmented(str(path), 2, 3, 10, 100)
+    mp4 = mp4viewer.open(str(path))
+    try:
+        assert mp4.is_fragmented
+        assert "fragments" not in vars(mp4)
+        assert len(mp4.tracks) == 2
+        assert [moof.boxtype for moof in mp4.fragments] == ["moof"] * 3
+        truns = [moof.find_descendant("trun") for moof in mp4.fragments]
+        assert [trun.sample_count for trun in truns] == [10] * 3
+    finally:
+        mp4.close()
+
+
+@pytest.mark.parametrize(
+    "stz2_bits,sample_size", [(None, 1000), (4, 10), (8, 200), (16, 1000)]
+)
+def test_sample_table_sums(tmp_path, monkeypatch, stz2_bits, sample_size):
+    """the summary variants of stsz, stz2 and stts sum their entries across blocks"""
+    # small blocks, so that the entries span several of them
+    monkeypatch.setattr(summary, "BLOCK_SIZE", 16)
+    path = tmp_path / "progressive.mp4"
+    # an odd number of samples pads the last byte of 4 bit stz2 fields
+    synth.write_progressive(str(path), 1, 301, sample_size, stz2_bits)
+    with mp4viewer.open(str(path)) as mp4:
+        (track,) = mp4.tracks
+        assert track.sample_count == 301
+        assert track.sample_bytes == sum(
+            synth.sample_sizes(301, sample_size, stz2_bits)
+        )
+        stts = track.trak.find_descendant("stts")
+        assert stts.total_duration == 301 * synth.SAMPLE_DURATION
+        assert track.bitrate == track.sample_bytes * 8 / track.duration
+        assert track.trak.find_descendant("stco").size > 12
+
+
+def test_info(tmp_path, capsys):
+    """--info prints a line for each track"""
+    path = tmp_path / "progressive.mp4"
+    synth.write_progressive(str(path), 2, 300, 100)
+    assert main(["--info", str(path)]) == 0
+    out, err = capsys.readouterr()
+    assert err == ""
+    lines = out.splitlines()
+    assert lines[0] == f"File: {path}"
+    assert "  layout: progressive, faststart" in lines
+    assert lines[-2].startswith("  Track 1: vide avc1, 1920x1080, timescale 30000, ")
+    assert "300 samples" in lines[-1]
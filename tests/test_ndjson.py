@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Test the ndjson renderer"""
+
+import io
+import json
+
+from mp4viewer.datasource import DataBuffer, FileSource
+from mp4viewer.isobmff.parser import IsobmffParser
+from mp4viewer.ndjson_renderer import NdjsonRenderer
+from mp4viewer.tree import ArrayField, Attr
+
+
+def test_moov_records():
+    """one record per box, with paths and parent offsets"""
+    output = io.StringIO()
+    with open("tests/moov.atom", "rb") as fd:
+        parser = IsobmffParser(DataBuffer(FileSource(fd)))
+        NdjsonRenderer("moov.atom", output).render(parser.iterboxes())
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [r["path"] for r in records] == [
+        "moov",
+        "moov/mvhd",
+        "moov/trak",
+        "moov/trak/tkhd",
+        "moov/trak/edts",
+        "moov/trak/edts/elst",
+    ]
+    offsets = {r["path"]: r["offset"] for r in records}
+    for record in records:
+        assert record["type"] == "box"
+        if record["path"] == "moov":
+            assert record["parent"] is None
+        else:
+            parent_path = record["path"].rsplit("/", 1)[0]
+            assert record["parent"] == offsets[parent_path]
+    tkhd = records[3]
+    assert tkhd["size"] == 0x5C
+    assert tkhd["fields"]["track id"] == 1
+    assert tkhd["fields"]["duration"]["raw value"] == 5096
+
+
+class _ArrayBox:
+    """Stand-in for a parsed box that yields arrays of the given values"""
+
+    # pylint: disable=too-few-public-methods
+    boxtype = "test"
+    buffer_offset = 0
+    size = 8
+    children = []
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+
+    def generate_fields(self):
+        """the arrays as fields"""
+        yield from self.arrays.items()
+
+
+def test_array_records():
+    """the display helpers are unwrapped, and mixed arrays have no dtype"""
+    count = NdjsonRenderer.ARRAY_RECORD_THRESHOLD + 1
+    box = _ArrayBox(
+        {
+            "ints": ArrayField(list(range(count)), hex),
+            "attrs": [Attr("a", i) for i in range(count)],
+            "mixed": [None] + list(range(count)),
+            "short": [Attr("a", 1), {"k": Attr("b", 2)}],
+        }
+    )
+    output = io.StringIO()
+    NdjsonRenderer("test.mp4", output).render([box])
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert records[0]["fields"] == {"short": [1, {"k": 2}]}
+    arrays = {r["name"]: r for r in records[1:]}
+    assert arrays["ints"]["dtype"] == "int"
+    assert arrays["ints"]["values"] == list(range(count))
+    assert arrays["attrs"]["dtype"] == "int"
+    assert "dtype" not in arrays["mixed"] and arrays["mixed"]["count"] == count + 1
+
+
+if __name__ == "__main__":
+    test_moov_records()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Test the registration of box classes and parse callbacks"""
+
+import struct
+
+import pytest
+
+from mp4viewer.isobmff import plugins
+from mp4viewer.isobmff.box import Box
+from mp4viewer.isobmff.parser import parse_file, getboxdesc
+from tests import builders
+
+USERTYPE = "a5" * 16
+
+
+class AcmeBox(Box):
+    """a uuid box with a 32 bit counter"""
+
+    def parse(self, parse_ctx):
+        super().parse(parse_ctx)
+        self.counter = parse_ctx.buf.readint32()
+        self.consumed_bytes += 4
+
+    def generate_fields(self):
+        yield from super().generate_fields()
+        yield ("counter", self.counter)
+
+
+@pytest.fixture(name="registry")
+def _registry(monkeypatch):
+    """start each test with empty registries"""
+    monkeypatch.setattr(plugins, "boxes", {})
+    monkeypatch.setattr(plugins, "containers", set())
+    monkeypatch.setattr(plugins, "descriptions", {})
+    monkeypatch.setattr(plugins, "pre_parse_callbacks", [])
+    monkeypatch.setattr(plugins, "post_parse_callbacks", [])
+    return plugins
+
+
+def _write(tmp_path):
+    acme = builders.box("uuid", bytes.fromhex(USERTYPE) + struct.pack(">I", 42))
+    other = builders.box("uuid", bytes(16) + struct.pack(">I", 7))
+    path = tmp_path / "plugin.mp4"
+    path.write_bytes(builders.box("acme", acme + other) + builders.progressive_moov())
+    return str(path)
+
+
+def test_uuid_box_and_container(tmp_path, registry):
+    """registered uuid box inside a registered container"""
+    path = _write(tmp_path)
+    boxes = parse_file(path)
+    assert boxes[0].children == []
+
+    registry.register_box(f"uuid:{USERTYPE}", AcmeBox, "Acme counter")
+    registry.register_container("acme", "Acme container")
+    boxes = parse_file(path)
+    acme, other = boxes[0].children
+    assert isinstance(acme, AcmeBox) and acme.counter == 42
+    assert acme.usertype == USERTYPE
+    assert not isinstance(other, AcmeBox) and other.usertype == "00" * 16
+    assert getboxdesc("acme") == "Acme container"
+
+
+def test_callbacks(tmp_path, registry):
+    """a callback stops the parser once it has found the box it needs"""
+    found = []
+    fourccs = []
+
+    def post_parse(box):
+        if box.boxtype == "tkhd":
+            found.append(box)
+            raise plugins.StopParsing()
+
+    def pre_parse(fourcc, offset, parent):
+        fourccs.append((fourcc, offset, parent is None))
+        return plugins.SKIP_BOX if fourcc == "acme" else None
+
+    registry.register_container("acme")
+    registry.register_callbacks(pre_parse, post_parse)
+    boxes = parse_file(_write(tmp_path))
+    # the moov was not complete when the parser stopped
+    assert [box.boxtype for box in boxes] == ["acme"]
+    assert boxes[0].children == []
+    assert found[0].track_id == 1
+    assert fourccs[:3] == [
+        ("acme", 0, True),
+        ("moov", boxes[0].size, True),
+        ("trak", boxes[0].size + 8, False),
+    ]
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Test the per box type profile of --profile"""
+
+import io
+import os
+import json
+
+from mp4viewer.__main__ import main
+from mp4viewer.datasource import DataBuffer
+from mp4viewer.isobmff.box import Box
+from mp4viewer.isobmff.parser import parse_file
+from mp4viewer.profiler import ParseProfiler
+
+MOOV_PATH = os.path.join(os.path.dirname(__file__), "moov.atom")
+
+
+def test_profile_boxes():
+    """counts, bytes and calls are collected per box type, and the patches are undone"""
+    readint32 = DataBuffer.readint32
+    init = Box.__init__
+    with ParseProfiler() as profiler:
+        with profiler.phase("parse"):
+            boxes = parse_file(MOOV_PATH)
+    assert DataBuffer.readint32 is readint32
+    assert Box.__init__ is init
+
+    moov = profiler.stats["moov"]
+    assert moov.count == 1
+    assert moov.bytes == boxes[0].size == os.path.getsize(MOOV_PATH)
+    assert moov.inclusive >= moov.exclusive >= 0
+    traks = [box for box in boxes[0].children if box.boxtype == "trak"]
+    assert profiler.stats["trak"].count == len(traks)
+    assert profiler.stats["tkhd"].count == len(traks)
+    # version, flags and the fields of tkhd are read by the tkhd box itself
+    assert profiler.stats["tkhd"].calls["readint32"] > 0
+    assert profiler.phases["parse"] >= moov.inclusive
+
+    report = io.StringIO()
+    profiler.write_report("json", report)
+    assert json.loads(report.getvalue())["boxes"]["trak"]["count"] == len(traks)
+
+    report = io.StringIO()
+    profiler.write_report("collapsed", report)
+    stacks = [line.rsplit(" ", 1)[0] for line in report.getvalue().splitlines()]
+    assert "moov;trak;tkhd" in stacks
+
+
+def test_profile_option(tmp_path, capsys):
+    """--profile writes the report without changing the regular output"""
+    report = tmp_path / "profile.json"
+    args = ["-c", "off", "--profile", "--profile-format", "json"]
+    args += ["--profile-output", str(report)]
+    assert main(args + [MOOV_PATH]) == 0
+    profile = json.loads(report.read_text(encoding="utf-8"))
+    assert {"parse", "tree", "render"} <= set(profile["phases"])
+    assert profile["boxes"]["moov"]["count"] == 1
+    assert "moov" in capsys.readouterr().out
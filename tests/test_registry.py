@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""Test that the lazy registry matches the box classes of the modules"""
+
+import importlib
+
+from mp4viewer.isobmff import registry
+
+
+def test_registry_matches_boxmaps():
+    """the fourccs of each module are those of its boxmap, and resolve to its classes"""
+    lazy = registry.LazyBoxMap(registry.MODULE_FOURCCS)
+    for name, fourccs in registry.MODULE_FOURCCS.items():
+        boxmap = importlib.import_module(f"mp4viewer.isobmff.{name}").boxmap
+        assert sorted(fourccs) == sorted(boxmap), name
+        for fourcc, cls in boxmap.items():
+            assert lazy[fourcc] is cls, fourcc
+    assert len(lazy) == sum(len(f) for f in registry.MODULE_FOURCCS.values())
+    assert "xxxx" not in lazy and lazy.get("xxxx") is None
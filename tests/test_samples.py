@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Test the sample tables built from stbl and trun boxes"""
+
+import struct
+
+from mp4viewer.isobmff.parser import parse_file
+from mp4viewer.isobmff.samples import get_sample_tables
+from mp4viewer.sample_export import export_sample_tables
+from tests import builders
+
+
+def test_stbl_samples(tmp_path):
+    """dts, cts, offsets, chunks and sync flags from the sample table boxes"""
+    path = tmp_path / "progressive.mp4"
+    path.write_bytes(builders.progressive_moov())
+    tables = get_sample_tables(parse_file(str(path)))
+    assert list(tables) == [1]
+    table = tables[1]
+    assert table.timescale == 1000
+    assert table.handler == "vide"
+    assert len(table) == 5
+    assert list(table.dts) == [0, 100, 200, 300, 400]
+    assert list(table.cts) == [200, 200, 300, 400, 500]
+    assert list(table.size) == [1, 2, 3, 4, 5]
+    assert list(table.offset) == [1000, 1001, 1003, 2000, 2004]
+    assert list(table.chunk) == [0, 0, 0, 1, 1]
+    assert list(table.sync) == [1, 0, 0, 1, 0]
+    assert table.next_dts == 500
+
+
+def test_trun_samples(tmp_path):
+    """defaults from trex, tfdt and data offsets relative to the moof"""
+    path = tmp_path / "fragmented.mp4"
+    path.write_bytes(builders.fragmented_file())
+    boxes = parse_file(str(path))
+    moof_offset = boxes[1].buffer_offset
+    table = get_sample_tables(boxes)[2]
+    assert table.timescale == 90000
+    assert list(table.dts) == [5000, 5010, 5020]
+    assert list(table.size) == [7, 8, 9]
+    assert list(table.offset) == [moof_offset + 100 + i for i in (0, 7, 15)]
+    assert list(table.sync) == [1, 0, 0]
+    assert len(table.fragments) == 1
+    fragment = table.fragments[0]
+    assert fragment.tfdt == 5000
+    assert fragment.duration == 30
+    assert fragment.sample_count == 3
+
+
+def test_export(tmp_path):
+    """csv and npy files"""
+    path = tmp_path / "progressive.mp4"
+    path.write_bytes(builders.progressive_moov())
+    tables = get_sample_tables(parse_file(str(path)))
+    paths = export_sample_tables(tables, str(tmp_path), "out", "csv")
+    lines = (tmp_path / "out.track1.csv").read_text().splitlines()
+    assert paths == [str(tmp_path / "out.track1.csv")]
+    assert lines[0] == "index,dts,cts,size,offset,sync,chunk"
+    assert lines[4] == "3,300,400,4,2000,1,1"
+    paths = export_sample_tables(tables, str(tmp_path), "out", "npy")
+    assert len(paths) == 7
+    data = (tmp_path / "out.track1.size.npy").read_bytes()
+    assert data.startswith(b"\x93NUMPY")
+    assert len(data) == 128 + 5 * 8
+    assert struct.unpack("<5q", data[128:]) == (1, 2, 3, 4, 5)
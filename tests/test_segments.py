@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Test the timeline of an init segment and its media segments"""
+
+import struct
+
+import pytest
+
+from benchmarks import synth
+from mp4viewer.isobmff.parser import parse_file
+from mp4viewer.isobmff.samples import get_sample_tables
+from mp4viewer.segments import expand_segment_paths, load_segments, main
+from tests import builders
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_timeline(tmp_path, jobs):
+    """the segments make the same timeline as a fragmented file"""
+    paths = synth.write_segments(str(tmp_path), 2, 5, 10, 100)
+    timeline = load_segments(str(tmp_path / "init.mp4"), paths, jobs)
+    synth.write_fragmented(str(tmp_path / "whole.mp4"), 2, 5, 10, 100)
+    expected = get_sample_tables(parse_file(str(tmp_path / "whole.mp4")))
+    assert sorted(timeline.tables) == [1, 2]
+    for track_id, table in timeline.tables.items():
+        assert table.timescale == synth.TIMESCALE
+        for name in ("dts", "cts", "size", "sync", "chunk"):
+            assert table.column(name) == expected[track_id].column(name)
+        assert [f.decode_time for f in table.fragments] == [
+            f.decode_time for f in expected[track_id].fragments
+        ]
+        segment = timeline.segments[track_id][3]
+        assert segment.path == paths[3]
+        assert (segment.first_sample, segment.sample_count) == (30, 10)
+        assert (segment.first_fragment, segment.fragment_count) == (3, 1)
+
+
+def test_segment_without_tfdt(tmp_path):
+    """a segment without tfdt continues from the end of the previous one"""
+    paths = synth.write_segments(str(tmp_path), 1, 2, 10, 100)
+    # trex default duration, and three samples with sizes from the trun
+    trun = builders.full_box("trun", struct.pack(">I3I", 3, 7, 8, 9), flags=0x000200)
+    tfhd = builders.full_box("tfhd", struct.pack(">I", 1), flags=0x020000)
+    moof = builders.box(
+        "moof",
+        builders.full_box("mfhd", struct.pack(">I", 3))
+        + builders.box("traf", tfhd + trun),
+    )
+    paths.append(str(tmp_path / "seg-3.m4s"))
+    with open(paths[-1], "wb") as fd:
+        fd.write(moof)
+    table = load_segments(str(tmp_path / "init.mp4"), paths, 1).tables[1]
+    assert len(table) == 23
+    assert list(table.dts[19:]) == [i * synth.SAMPLE_DURATION for i in range(19, 23)]
+    assert table.fragments[-1].tfdt is None
+    assert table.fragments[-1].decode_time == 20 * synth.SAMPLE_DURATION
+    assert table.next_dts == 23 * synth.SAMPLE_DURATION
+
+
+def test_command(tmp_path, capsys):
+    """glob patterns are sorted by the numbers in the names"""
+    synth.write_segments(str(tmp_path), 1, 12, 10, 100)
+    pattern = str(tmp_path / "seg-*.m4s")
+    paths = expand_segment_paths([pattern])
+    assert [p.rsplit("-", 1)[1] for p in paths[:3]] == ["1.m4s", "2.m4s", "3.m4s"]
+    assert main(["-j", "1", str(tmp_path / "init.mp4"), pattern]) == 0
+    out = capsys.readouterr().out
+    assert out.startswith("track 1 (vide): 120 samples in 12 segments (12 fragments)")
+    assert main([str(tmp_path / "init.mp4"), str(tmp_path / "none-*.m4s")]) == 1
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_missing_segment(tmp_path, capsys, jobs):
+    """files that cannot be read are reported instead of raised"""
+    synth.write_segments(str(tmp_path), 1, 2, 10, 100)
+    init = str(tmp_path / "init.mp4")
+    assert main(["-j", jobs, init, str(tmp_path / "missing.m4s")]) == 1
+    assert "missing.m4s" in capsys.readouterr().err
+    assert main(["-j", jobs, str(tmp_path / "missing.mp4"), init]) == 1
+
+
+def test_invalid_jobs(tmp_path, capsys):
+    """the number of processes should be more than zero"""
+    synth.write_segments(str(tmp_path), 1, 2, 10, 100)
+    with pytest.raises(SystemExit):
+        main(["-j", "0", str(tmp_path / "init.mp4"), str(tmp_path / "seg-1.m4s")])
+    assert "--jobs" in capsys.readouterr().err
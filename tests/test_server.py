@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Test the http inspection service"""
+
+import json
+import struct
+import threading
+import urllib.request
+from urllib.error import HTTPError
+
+import pytest
+
+from mp4viewer.server import FileCache, main, make_server
+from tests import builders
+
+
+def _get(server, path):
+    url = f"http://127.0.0.1:{server.server_port}{path}"
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.status, json.loads(response.read())
+    except HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_endpoints(tmp_path):
+    """tree, box and samples endpoints share a single parse of the file"""
+    (tmp_path / "a.mp4").write_bytes(builders.progressive_moov())
+    cache = FileCache(max_files=1)
+    server = make_server(str(tmp_path), port=0, cache=cache)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        status, tree = _get(server, "/files/a.mp4/tree?depth=2")
+        assert status == 200
+        assert tree[0]["fourcc"] == "moov"
+        assert tree[0]["children"][0]["fourcc"] == "trak"
+        assert "children" not in tree[0]["children"][0]
+
+        trak_offset = tree[0]["children"][0]["offset"]
+        status, trak = _get(server, f"/files/a.mp4/box/{trak_offset}")
+        assert status == 200
+        assert [c["fourcc"] for c in trak["children"]] == ["tkhd", "mdia"]
+
+        status, samples = _get(server, "/files/a.mp4/track/1/samples?from=1&to=3")
+        assert status == 200
+        assert samples["sample_count"] == 5
+        assert [row[0] for row in samples["samples"]] == [1, 2]
+        assert len(cache.entries) == 1
+
+        assert _get(server, "/files/a.mp4/track/7/samples")[0] == 404
+        assert _get(server, "/files/../a.mp4/tree")[0] == 404
+        assert _get(server, "/files/a.mp4/tree?depth=x")[0] == 400
+        status, error = _get(server, "/files/a.mp4/track/1/samples?from=-2")
+        assert status == 400 and error["error"] == "from should not be negative"
+        assert _get(server, "/files/a.mp4/track/1/samples?from=0&to=-1")[0] == 400
+    finally:
+        server.shutdown()
+        server.server_close()
+        cache.close()
+
+
+def test_errors(tmp_path):
+    """a file that fails to parse is a 500 error, and it is not kept in the cache"""
+    # a box type that is not valid utf-8
+    (tmp_path / "bad.mp4").write_bytes(
+        struct.pack(">I", 16) + bytes(range(252, 256)) + bytes(8)
+    )
+    cache = FileCache()
+    server = make_server(str(tmp_path), port=0, cache=cache)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        status, error = _get(server, "/files/bad.mp4/tree")
+        assert status == 500
+        assert error["error"].startswith("UnicodeDecodeError")
+        assert not cache.entries
+        assert _get(server, "/files/bad.mp4/tree")[0] == 500
+    finally:
+        server.shutdown()
+        server.server_close()
+        cache.close()
+
+
+@pytest.mark.parametrize("option", ["--cache-size", "--jobs"])
+def test_invalid_counts(capsys, option):
+    """the cache size and the number of threads should be more than zero"""
+    for value in ("0", "-2"):
+        with pytest.raises(SystemExit):
+            main([option, value])
+        assert option in capsys.readouterr().err
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Test the sqlite catalogue of boxes and sample tables"""
+
+import os
+import sqlite3
+
+from mp4viewer.isobmff.parser import parse_file
+from mp4viewer.sqlite_export import SqliteCatalogue, main
+from tests import builders
+
+
+def _rows(db_path, query, *params):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+
+
+def test_catalogue(tmp_path):
+    """add, replace and remove the rows of a file"""
+    path = tmp_path / "a.mp4"
+    path.write_bytes(builders.progressive_moov())
+    db_path = str(tmp_path / "catalog.db")
+    catalogue = SqliteCatalogue(db_path)
+    try:
+        catalogue.add_file(str(path), parse_file(str(path)))
+        assert catalogue.has_file(str(path))
+        # the sync samples and the track id from the tkhd fields
+        query = (
+            "SELECT s.sample_index, s.dts, f.value FROM samples s "
+            "JOIN boxes b ON b.file = s.file AND b.fourcc = 'tkhd' "
+            "JOIN fields f ON f.box_id = b.id AND f.name = 'track id' "
+            "WHERE s.sync = 1 ORDER BY s.sample_index"
+        )
+        assert catalogue.conn.execute(query).fetchall() == [(0, 0, 1), (3, 300, 1)]
+
+        assert catalogue.add_files([str(path)]) == [str(path)]
+        assert not catalogue.add_files([str(path)], replace=True)
+        counts = [
+            catalogue.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("files", "tracks", "samples")
+        ]
+        assert counts == [1, 1, 5]
+
+        catalogue.remove_file(str(path))
+        assert not catalogue.has_file(str(path))
+        for table in ("files", "boxes", "fields", "tracks", "samples"):
+            assert catalogue.conn.execute(f"SELECT * FROM {table}").fetchall() == []
+    finally:
+        catalogue.close()
+
+
+def test_command(tmp_path, monkeypatch):
+    """relative paths are the same file, and the indexes are kept for small updates"""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a.mp4").write_bytes(builders.progressive_moov())
+    assert main(["catalog.db", "a.mp4"]) == 0
+    assert main(["--replace", "catalog.db", "./a.mp4", "a.mp4"]) == 0
+    assert main(["catalog.db", "./a.mp4"]) == 0
+    assert _rows("catalog.db", "SELECT path FROM files") == [
+        (os.path.join(str(tmp_path), "a.mp4"),)
+    ]
+    indexes = _rows("catalog.db", "SELECT name FROM sqlite_master WHERE type = 'index'")
+    assert ("samples_file_track",) in indexes
+
+
+def test_failed_load(tmp_path, capsys):
+    """a file that fails to load keeps its old rows, and the indexes are created again"""
+    paths = [str(tmp_path / f"{i}.mp4") for i in range(8)]
+    for path in paths[:-1]:
+        with open(path, "wb") as fd:
+            fd.write(builders.progressive_moov())
+    db_path = str(tmp_path / "catalog.db")
+    assert main([db_path] + paths) == 1
+    assert "7.mp4" in capsys.readouterr().err
+    assert len(_rows(db_path, "SELECT path FROM files")) == 7
+    indexes = _rows(db_path, "SELECT name FROM sqlite_master WHERE type = 'index'")
+    assert ("samples_file_track",) in indexes
+
+    # the rows of a file are only deleted once its new copy is parsed
+    os.remove(paths[0])
+    assert main(["--replace", db_path, paths[0]]) == 1
+    assert _rows(db_path, "SELECT COUNT(*) FROM samples WHERE file = ?", paths[0]) == [
+        (5,)
+    ]
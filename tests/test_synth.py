@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Test the synthetic files and baselines of the benchmarks"""
+
+import io
+
+import pytest
+
+from benchmarks import synth, baseline
+from mp4viewer.isobmff.parser import parse_file
+from mp4viewer.isobmff.samples import get_sample_tables
+
+
+@pytest.mark.parametrize("stz2_bits", [None, 4, 8, 16])
+def test_progressive(tmp_path, stz2_bits):
+    """sample tables point to the end of the mdat"""
+    path = tmp_path / "progressive.mp4"
+    count = synth.write_progressive(str(path), 2, 101, 200, stz2_bits)
+    tables = get_sample_tables(parse_file(str(path)))
+    assert count == 202
+    assert sorted(tables) == [1, 2]
+    last = tables[2]
+    assert len(last) == 101
+    assert last.offset[-1] + last.size[-1] == path.stat().st_size
+    assert sum(last.sync) == 4
+
+
+def test_fragmented(tmp_path):
+    """trun data offsets and tfdt"""
+    path = tmp_path / "fragmented.mp4"
+    count = synth.write_fragmented(str(path), 2, 3, 10, 100)
+    tables = get_sample_tables(parse_file(str(path)))
+    assert count == 60
+    assert len(tables[1]) == 30
+    assert len(tables[1].fragments) == 3
+    assert tables[2].offset[-1] + tables[2].size[-1] == path.stat().st_size
+    assert list(tables[1].dts[:11:10]) == [0, 10 * synth.SAMPLE_DURATION]
+
+
+def test_baseline_compare():
+    """slowdowns within the noise or the tolerance are not regressions"""
+    base = {"results": [{"scenario": "stsz", "stage": "parse", "times": [1.0, 1.01]}]}
+    steady = [{"scenario": "stsz", "stage": "parse", "times": [1.05, 1.06]}]
+    slower = [{"scenario": "stsz", "stage": "parse", "times": [1.5, 1.51]}]
+    noisy = [{"scenario": "stsz", "stage": "parse", "times": [0.5, 2.5]}]
+    output = io.StringIO()
+    assert baseline.compare(base, steady, output=output) == 0
+    assert baseline.compare(base, slower, output=output) == 1
+    assert baseline.compare(base, noisy, output=output) == 0
+    assert "REGRESSION" in output.getvalue()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Test the header scan and lazy expansion used by the terminal browser"""
+
+import os
+
+from mp4viewer.datasource import DataBuffer, MmapSource
+from mp4viewer.isobmff.parser import IsobmffParser
+from mp4viewer.tui import BoxBrowser, TuiRenderer
+
+MOOV_PATH = os.path.join(os.path.dirname(__file__), "moov.atom")
+
+
+def test_header_scan():
+    """only the top level headers are read until a box is expanded"""
+    with open(MOOV_PATH, "rb") as fd:
+        source = MmapSource(fd)
+        headers = list(IsobmffParser(DataBuffer(source)).iterboxheaders())
+        assert [h.boxtype for h in headers] == ["moov"]
+        assert headers[0].size == len(source)
+        source.close()
+
+        source = MmapSource(fd)
+        browser = BoxBrowser(DataBuffer(source))
+        assert len(browser.rows) == 1
+        browser.expand(0)
+        children = [row.text.split()[0] for row in browser.rows[1:]]
+        assert "mvhd" in children and "trak" in children
+        trak = 1 + children.index("trak")
+        browser.expand(trak)
+        expanded_count = len(browser.rows)
+        assert browser.rows[trak + 1].depth == 2
+        assert browser.parent_index(trak + 1) == trak
+
+        # collapsing and expanding the parent keeps the expanded child
+        browser.collapse(0)
+        assert len(browser.rows) == 1
+        browser.expand(0)
+        assert len(browser.rows) == expanded_count
+        source.close()
+
+
+def test_truncated_box(tmp_path):
+    """a box that fails to parse is reported and left unexpanded"""
+    path = tmp_path / "truncated.mp4"
+    with open(MOOV_PATH, "rb") as fd:
+        path.write_bytes(fd.read()[:120])
+    with open(path, "rb") as fd:
+        source = MmapSource(fd)
+        browser = BoxBrowser(DataBuffer(source))
+        assert len(browser.rows) == 1
+        browser.expand(0)
+        assert len(browser.rows) == 1
+        assert not browser.rows[0].expanded and browser.rows[0].children is None
+        assert browser.last_error().startswith("Failed to parse moov (Movie container)")
+        source.close()
+
+
+def test_empty_file(tmp_path, capsys):
+    """an empty file is reported before the file is mapped or the screen is set up"""
+    path = tmp_path / "empty.mp4"
+    path.write_bytes(b"")
+    TuiRenderer().render_file(str(path))
+    assert "empty.mp4 is empty" in capsys.readouterr().err